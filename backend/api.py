@@ -2,10 +2,13 @@
 FastAPI Backend para Agente Pesquisador
 API REST para integração com frontend moderno (Next.js)
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+import asyncio
 import sys
 import os
 from datetime import datetime
@@ -14,13 +17,63 @@ from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.agent import ResearchAgent
+from src.cache import LLMCache, SearchCache
+from src.corpus import LocalCorpusSearch
+from src.pool import ClientPool
+from src.routing import ROUTING_PROFILES
+from src.search import normalize_query
+from backend.coalesce import SingleFlight
+from backend.jobs import JobManager, JobQueueFull, JobStore
+from backend.payload import CompressionMiddleware, dumps, shape_result
+
+def _known_routing_profile(value: Optional[str]) -> Optional[str]:
+    if value is not None and value not in ROUTING_PROFILES:
+        raise ValueError(f"perfil desconhecido (disponíveis: {', '.join(ROUTING_PROFILES)})")
+    return value
+
 
 # Modelos Pydantic
+class ResponseOptions(BaseModel):
+    include_full_state: bool = Field(default=True, description="Inclui full_state na resposta")
+    state_fields: Optional[List[str]] = Field(None, description="Campos de full_state a retornar (projeção)")
+    references_offset: int = Field(default=0, ge=0, description="Início da página de references")
+    references_limit: Optional[int] = Field(None, ge=1, description="Tamanho da página de references")
+    search_results_offset: int = Field(default=0, ge=0, description="Início da página de full_state.search_results")
+    search_results_limit: Optional[int] = Field(None, ge=1, description="Tamanho da página de full_state.search_results")
+
 class ResearchRequest(BaseModel):
     query: str = Field(..., min_length=1, description="Pergunta de pesquisa")
     max_iterations: int = Field(default=1, ge=1, le=3, description="Número máximo de iterações")
     anthropic_api_key: str = Field(..., min_length=1, description="Chave API Anthropic")
     tavily_api_key: Optional[str] = Field(None, description="Chave API Tavily (opcional)")
+    routing_profile: Optional[str] = Field(None, description="Perfil de modelos por nó (fast, balanced, quality)")
+    response: ResponseOptions = Field(default_factory=ResponseOptions, description="Formato da resposta")
+
+    _known_profile = field_validator("routing_profile")(_known_routing_profile)
+
+# Limite de perguntas por requisição de POST /research/batch
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 500))
+
+class BatchResearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, description="Perguntas de pesquisa do lote")
+    max_iterations: int = Field(default=1, ge=1, le=3, description="Número máximo de iterações")
+    anthropic_api_key: str = Field(..., min_length=1, description="Chave API Anthropic")
+    tavily_api_key: Optional[str] = Field(None, description="Chave API Tavily (opcional)")
+    routing_profile: Optional[str] = Field(None, description="Perfil de modelos por nó (fast, balanced, quality)")
+    concurrency: int = Field(default=4, ge=1, le=32, description="Pesquisas simultâneas")
+    search_concurrency: Optional[int] = Field(None, ge=1, le=64, description="Buscas simultâneas no lote inteiro")
+    response: ResponseOptions = Field(default_factory=ResponseOptions, description="Formato de cada resultado")
+
+    _known_profile = field_validator("routing_profile")(_known_routing_profile)
+
+    @field_validator("queries")
+    @classmethod
+    def _valid_queries(cls, queries: List[str]) -> List[str]:
+        if len(queries) > BATCH_MAX_QUERIES:
+            raise ValueError(f"no máximo {BATCH_MAX_QUERIES} perguntas por lote")
+        if any(not q.strip() for q in queries):
+            raise ValueError("perguntas vazias não são permitidas")
+        return queries
 
 class ResearchResponse(BaseModel):
     query: str
@@ -32,15 +85,99 @@ class ResearchResponse(BaseModel):
     iterations: int
     conflicts_detected: bool
     references: List[Dict[str, Any]]
-    full_state: Dict[str, Any]
+    thread_id: Optional[str] = None
+    timings: Optional[Dict[str, Any]] = None
+    pagination: Optional[Dict[str, Any]] = None
+    full_state: Optional[Dict[str, Any]] = None
+
+class RunResponse(ResearchResponse):
+    pending_nodes: List[str] = []
+
+class ResumeRequest(BaseModel):
+    anthropic_api_key: str = Field(..., min_length=1, description="Chave API Anthropic")
+    tavily_api_key: Optional[str] = Field(None, description="Chave API Tavily (opcional)")
+    routing_profile: Optional[str] = Field(None, description="Perfil de modelos por nó (fast, balanced, quality)")
+    response: ResponseOptions = Field(default_factory=ResponseOptions, description="Formato da resposta")
+
+    _known_profile = field_validator("routing_profile")(_known_routing_profile)
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    query: str
+    max_iterations: int
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
 
 class HealthResponse(BaseModel):
     status: str
     version: str
     timestamp: str
 
+# Cache de buscas compartilhado por todos os agentes do processo
+search_cache = SearchCache(
+    path=os.getenv("SEARCH_CACHE_PATH", os.path.join(".cache", "search_cache.db")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", 24 * 60 * 60))
+)
+
+# Cache de respostas do LLM (opt-in via LLM_CACHE_ENABLED; LLM_CACHE_PATH persiste em SQLite)
+llm_cache = (
+    LLMCache(path=os.getenv("LLM_CACHE_PATH") or None)
+    if os.getenv("LLM_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
+    else None
+)
+
+# CORPUS_DIR troca o Tavily por busca BM25 nos documentos locais do diretório
+# (índice em CORPUS_INDEX_PATH, padrão .cache/corpus/; reindexa só o que mudou)
+corpus = (
+    LocalCorpusSearch(os.environ["CORPUS_DIR"], index_dir=os.getenv("CORPUS_INDEX_PATH") or None)
+    if os.getenv("CORPUS_DIR")
+    else None
+)
+
+# Grafo compilado uma única vez; credenciais e max_iterations chegam por execução.
+# Clientes LLM/Tavily ficam num pool chaveado pelo hash das credenciais.
+# CHECKPOINT_PATH ativa checkpoints em SQLite (execuções retomáveis).
+# ROUTING_PROFILE define o perfil de modelos por nó padrão (cada requisição pode trocar).
+# Limites de taxa por API key: ANTHROPIC_REQUESTS_PER_MINUTE, ANTHROPIC_TOKENS_PER_MINUTE
+# e TAVILY_REQUESTS_PER_MINUTE (limitador compartilhado do processo, src/ratelimit.py).
+client_pool = ClientPool(idle_ttl=float(os.getenv("CLIENT_POOL_IDLE_TTL", 600)))
+agent = ResearchAgent(
+    search_cache=search_cache,
+    llm_cache=llm_cache,
+    client_pool=client_pool,
+    checkpoint_path=os.getenv("CHECKPOINT_PATH") or None,
+    routing=os.getenv("ROUTING_PROFILE") or None,
+    search_backend=corpus
+)
+
+# Requisições idênticas e simultâneas compartilham uma execução do grafo;
+# COALESCE_GRACE_SECONDS > 0 reaproveita também resultados recém-concluídos
+research_flights = SingleFlight(grace=float(os.getenv("COALESCE_GRACE_SECONDS", 0)))
+
+# Jobs de pesquisa em segundo plano (pool limitado, persistidos em SQLite)
+job_manager = JobManager(
+    agent,
+    JobStore(os.getenv("JOBS_DB_PATH", os.path.join(".cache", "jobs.db"))),
+    max_workers=int(os.getenv("JOBS_MAX_WORKERS", 4)),
+    max_pending=int(os.getenv("JOBS_MAX_PENDING", 100)),
+    client_pool=client_pool
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cancela os jobs ativos e fecha o índice do corpus local ao desligar o servidor"""
+    yield
+    await job_manager.shutdown()
+    if corpus is not None:
+        corpus.close()
+
 # Inicializa FastAPI
 app = FastAPI(
+    lifespan=lifespan,
     title="Agente Pesquisador API",
     description="API REST para pesquisa inteligente com validação de fontes",
     version="1.0.0",
@@ -62,6 +199,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compressão brotli/gzip negociada pelo Accept-Encoding (brotli se instalado)
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1000)))
+
 # Endpoints
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -81,6 +221,18 @@ async def health():
         "timestamp": datetime.now().isoformat()
     }
 
+def _coalescing_key(request: ResearchRequest, client_key: str) -> tuple:
+    """Identidade de uma execução: query normalizada, iterações, modelos e credenciais"""
+    model = agent.model_config(request.routing_profile)
+    return (
+        normalize_query(request.query),
+        request.max_iterations,
+        model["model"],
+        model["temperature"],
+        model["routing_profile"],
+        client_key
+    )
+
 @app.post("/research", response_model=ResearchResponse)
 async def research(request: ResearchRequest):
     """
@@ -90,23 +242,30 @@ async def research(request: ResearchRequest):
         request: Requisição com query e configurações
 
     Returns:
-        ResearchResponse com resultados completos
+        ResearchResponse no formato pedido em request.response (por padrão,
+        resultados completos)
     """
     try:
-        # Inicializa o agente
-        agent = ResearchAgent(
-            anthropic_api_key=request.anthropic_api_key,
-            tavily_api_key=request.tavily_api_key,
-            max_iterations=request.max_iterations
-        )
+        # Clientes do pool (reutilizados entre requisições com as mesmas credenciais),
+        # presos até o fim da execução
+        with agent.credentials(request.anthropic_api_key, request.tavily_api_key) as client_key:
+            # Executa a pesquisa (assíncrona: não bloqueia o event loop entre chamadas de rede).
+            # Requisições idênticas em andamento recebem o mesmo resultado.
+            result, shared = await research_flights.run(
+                _coalescing_key(request, client_key),
+                lambda: agent.aresearch(
+                    query=request.query,
+                    max_iterations=request.max_iterations,
+                    client_key=client_key,
+                    routing_profile=request.routing_profile
+                ),
+                reusable=lambda r: not r["full_state"].get("error")
+            )
+        if shared:
+            print(f"🔗 Requisição coalescida: {request.query}")
 
-        # Executa a pesquisa
-        result = agent.research(
-            query=request.query,
-            max_iterations=request.max_iterations
-        )
-
-        # Adiciona metadados
+        # Adiciona metadados (cópia: o resultado pode ser compartilhado)
+        result = dict(result)
         result['query'] = request.query
         result['timestamp'] = datetime.now().isoformat()
 
@@ -114,7 +273,7 @@ async def research(request: ResearchRequest):
         if 'references' not in result:
             result['references'] = []
 
-        return result
+        return shape_result(result, **request.response.model_dump())
 
     except Exception as e:
         import traceback
@@ -130,6 +289,174 @@ async def research(request: ResearchRequest):
             detail=f"Erro durante a pesquisa: {str(e)}\nTipo: {type(e).__name__}"
         )
 
+def _require_checkpoints():
+    if agent.checkpoints is None:
+        raise HTTPException(status_code=400, detail="Checkpoints desativados (defina CHECKPOINT_PATH)")
+
+@app.get("/research/runs/{thread_id}", response_model=RunResponse)
+async def get_research_run(
+    thread_id: str,
+    include_full_state: bool = True,
+    state_fields: Optional[List[str]] = Query(None),
+    references_offset: int = Query(0, ge=0),
+    references_limit: Optional[int] = Query(None, ge=1),
+    search_results_offset: int = Query(0, ge=0),
+    search_results_limit: Optional[int] = Query(None, ge=1)
+):
+    """
+    Carrega o estado salvo de uma execução sem reexecutar nada
+
+    pending_nodes lista os nós que faltam (vazio se a execução terminou).
+    As opções de formato (as de ResponseOptions) vêm na query string.
+    """
+    _require_checkpoints()
+    result = await agent.aget_run(thread_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    result['query'] = result['full_state'].get('query', '')
+    result['timestamp'] = datetime.now().isoformat()
+    return shape_result(
+        result,
+        include_full_state=include_full_state,
+        state_fields=state_fields,
+        references_offset=references_offset,
+        references_limit=references_limit,
+        search_results_offset=search_results_offset,
+        search_results_limit=search_results_limit
+    )
+
+@app.post("/research/runs/{thread_id}/resume", response_model=ResearchResponse)
+async def resume_research_run(thread_id: str, request: ResumeRequest):
+    """
+    Retoma uma execução interrompida a partir do último nó concluído
+
+    Buscas e validações já feitas não são repetidas; execuções finalizadas
+    apenas retornam o resultado salvo.
+    """
+    _require_checkpoints()
+    with agent.credentials(request.anthropic_api_key, request.tavily_api_key) as client_key:
+        result = await agent.aresume(thread_id, client_key=client_key, routing_profile=request.routing_profile)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Execução não encontrada")
+    result['query'] = result['full_state'].get('query', '')
+    result['timestamp'] = datetime.now().isoformat()
+    return shape_result(result, **request.response.model_dump())
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Formata um evento Server-Sent Events"""
+    payload = dumps(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+@app.post("/research/stream")
+async def research_stream(request: ResearchRequest):
+    """
+    Executa uma pesquisa transmitindo o progresso via Server-Sent Events
+
+    Eventos:
+        start: pesquisa iniciada
+        node: nó concluído, com suas mensagens e contagens parciais
+        claim: afirmação validada, assim que chega na resposta da validação
+        token: trecho do relatório final (synthesize_report)
+        done: resultado (mesmo formato de POST /research, conforme request.response)
+        error: erro durante a pesquisa
+    """
+    async def event_stream():
+        try:
+            # Clientes presos no pool enquanto o stream estiver aberto
+            with agent.credentials(request.anthropic_api_key, request.tavily_api_key) as client_key:
+                async for event in agent.astream_research(
+                    request.query, request.max_iterations, client_key, routing_profile=request.routing_profile
+                ):
+                    name = event.pop("event")
+                    if "result" in event:  # done, ou error com o resultado de erro
+                        event["result"]["query"] = request.query
+                        event["result"]["timestamp"] = datetime.now().isoformat()
+                        event["result"] = shape_result(event["result"], **request.response.model_dump())
+                    yield _sse(name, event)
+        except Exception as e:
+            print(f"\n❌ ERRO NO STREAMING: {e}")
+            yield _sse("error", {"error": str(e), "type": type(e).__name__})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/research/batch")
+async def research_batch(request: BatchResearchRequest):
+    """
+    Executa um lote de pesquisas e transmite os resultados em JSONL
+
+    Perguntas repetidas rodam uma vez e as buscas planejadas são
+    deduplicadas no lote inteiro (cada busca distinta roda uma única vez,
+    com um limite de concorrência comum). Cada linha é um evento:
+        result: {"event": "result", "index", "query", "result"} assim que
+            a pergunta termina (result no formato de POST /research)
+        summary: totais do lote (última linha)
+        error: erro que interrompeu o lote
+    """
+    options = request.response.model_dump()
+
+    async def lines():
+        try:
+            # Clientes presos no pool até a última pesquisa do lote
+            with agent.credentials(request.anthropic_api_key, request.tavily_api_key) as client_key:
+                async for event in agent.abatch_research(
+                    request.queries,
+                    request.max_iterations,
+                    client_key,
+                    routing_profile=request.routing_profile,
+                    concurrency=request.concurrency,
+                    search_concurrency=request.search_concurrency
+                ):
+                    if event["event"] == "result":
+                        result = dict(event["result"])
+                        result["query"] = event["query"]
+                        result["timestamp"] = datetime.now().isoformat()
+                        event["result"] = shape_result(result, **options)
+                    yield dumps(event) + "\n"
+        except Exception as e:
+            print(f"\n❌ ERRO NO LOTE: {e}")
+            yield dumps({"event": "error", "error": str(e), "type": type(e).__name__}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+@app.post("/research/jobs", response_model=JobResponse, status_code=202)
+async def create_research_job(request: ResearchRequest):
+    """
+    Enfileira uma pesquisa e retorna o job imediatamente
+
+    Acompanhe com GET /research/jobs/{job_id}; o resultado final tem o mesmo
+    formato de POST /research.
+    """
+    try:
+        # O JobManager prende o bundle antes de o bloco soltar (vale pela fila e pela execução)
+        with agent.credentials(request.anthropic_api_key, request.tavily_api_key) as client_key:
+            return job_manager.submit(request.query, request.max_iterations, client_key, request.routing_profile)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/research/jobs/{job_id}", response_model=JobResponse)
+async def get_research_job(job_id: str):
+    """
+    Retorna status, progresso (último nó concluído) e resultado de um job
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+@app.delete("/research/jobs/{job_id}", response_model=JobResponse)
+async def cancel_research_job(job_id: str):
+    """
+    Cancela um job em fila ou em execução (jobs finalizados são removidos)
+    """
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
 @app.get("/api/config")
 async def get_config():
     """
@@ -140,15 +467,66 @@ async def get_config():
         "min_iterations_allowed": 1,
         "default_iterations": 1,
         "tavily_optional": True,
+        "routing_profiles": list(ROUTING_PROFILES),
+        "default_routing_profile": agent.model_config()["routing_profile"],
+        "max_batch_queries": BATCH_MAX_QUERIES,
         "supported_features": [
             "research",
             "validation",
             "references",
             "confidence_scoring",
-            "conflict_detection"
-        ]
+            "conflict_detection",
+            "streaming",
+            "jobs",
+            "batch"
+        ] + (["checkpoints"] if agent.checkpoints else []) + (["corpus"] if corpus else [])
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Métricas no formato texto do Prometheus
+
+    Latência por nó, duração/tokens/custo/erros das chamadas ao LLM, buscas
+    web (ok, erro, cache) e acertos do cache do LLM, acumulados no processo.
+    """
+    return PlainTextResponse(agent.metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/cache")
+async def get_cache_stats():
+    """
+    Retorna os contadores dos caches (buscas e LLM, com hit rate por nó)
+    e da coalescência de requisições idênticas
+    """
+    return {
+        "search": search_cache.stats(),
+        "llm": llm_cache.stats() if llm_cache else None,
+        "coalescing": research_flights.stats()
+    }
+
+@app.get("/api/rate-limits")
+async def get_rate_limits():
+    """
+    Retorna os limites de taxa e os contadores por provedor e API key
+    (chamadas, esperas, novas tentativas e 429 recebidos)
+    """
+    return agent.nodes.rate_limiter.stats()
+
+@app.get("/api/corpus")
+async def get_corpus():
+    """Estatísticas do índice do corpus local (404 se CORPUS_DIR não estiver definido)"""
+    if corpus is None:
+        raise HTTPException(status_code=404, detail="Corpus local não configurado (CORPUS_DIR)")
+    return {"root": corpus.index.root, **corpus.index.stats()}
+
+@app.post("/api/corpus/reindex")
+async def reindex_corpus():
+    """Reindexa os arquivos novos, alterados e removidos do corpus local"""
+    if corpus is None:
+        raise HTTPException(status_code=404, detail="Corpus local não configurado (CORPUS_DIR)")
+    changes = await asyncio.to_thread(corpus.refresh)
+    return {"changes": changes, **corpus.index.stats()}
+
 if __name__ == "__main__":
     import uvicorn
 
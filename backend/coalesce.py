@@ -0,0 +1,88 @@
+"""
+Coalescência de Requisições - Requisições idênticas e simultâneas compartilham uma execução
+"""
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import time
+
+
+class SingleFlight:
+    """
+    Single-flight assíncrono
+
+    A primeira requisição de uma chave dispara a execução; as que chegam
+    enquanto ela roda aguardam o mesmo resultado. Com grace > 0, um resultado
+    recém-concluído ainda é reutilizado por grace segundos.
+
+    A execução é protegida com asyncio.shield: se o cliente que a disparou
+    desconectar, as demais requisições continuam recebendo o resultado.
+    """
+
+    def __init__(self, grace: float = 0.0, max_recent: int = 256):
+        self.grace = grace
+        self.max_recent = max_recent
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.grace_hits = 0
+
+    async def run(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        reusable: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Executa factory() uma única vez por chave entre as requisições concorrentes
+
+        Args:
+            key: Chave de coalescência
+            factory: Cria a corrotina da execução
+            reusable: Decide se o resultado pode ficar na janela de graça (padrão: sempre)
+
+        Returns:
+            Tupla (resultado, se foi compartilhado com outra requisição)
+        """
+        recent = self._recent.get(key)
+        if recent is not None:
+            if recent[0] > time.monotonic():
+                self.grace_hits += 1
+                return recent[1], True
+            del self._recent[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future), True
+
+        self.executions += 1
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f, reusable))
+        return await asyncio.shield(future), False
+
+    def _finish(self, key: Hashable, future: asyncio.Future, reusable: Optional[Callable[[Any], bool]]):
+        self._inflight.pop(key, None)
+        if self.grace <= 0 or future.cancelled() or future.exception() is not None:
+            return
+
+        result = future.result()
+        if reusable is not None and not reusable(result):
+            return
+
+        now = time.monotonic()
+        self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+        while len(self._recent) >= self.max_recent:
+            self._recent.pop(next(iter(self._recent)))
+        self._recent[key] = (now + self.grace, result)
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.executions + self.coalesced + self.grace_hits
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "grace_hits": self.grace_hits,
+            "in_flight": len(self._inflight),
+            "saved_rate": (self.coalesced + self.grace_hits) / requests if requests else 0.0
+        }
@@ -0,0 +1,310 @@
+"""
+Jobs de Pesquisa - Execução em segundo plano com pool limitado e persistência em SQLite
+"""
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from fastapi.encoders import jsonable_encoder
+from src.pool import ClientPool
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+
+# Estados possíveis de um job
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class JobQueueFull(Exception):
+    """Há jobs pendentes demais para aceitar um novo"""
+
+
+class JobStore:
+    """
+    Armazenamento dos jobs em SQLite
+
+    Progresso e resultado ficam serializados em JSON, de forma que jobs
+    concluídos sobrevivam a um reinício do worker e sejam lidos sem custo.
+    Jobs finalizados há mais de `retention` segundos são removidos.
+    """
+
+    def __init__(self, path: str, retention: float = 7 * 24 * 60 * 60):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                query TEXT NOT NULL,
+                max_iterations INTEGER NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def create(self, query: str, max_iterations: int) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+                (*ACTIVE_STATUSES, now - self.retention)
+            )
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, query, max_iterations, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, query, max_iterations, now, now)
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def update(
+        self,
+        job_id: str,
+        status: Optional[str] = None,
+        progress: Optional[Dict[str, Any]] = None,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ):
+        fields = {"updated_at": time.time()}
+        if status is not None:
+            fields["status"] = status
+        if progress is not None:
+            fields["progress"] = json.dumps(jsonable_encoder(progress), ensure_ascii=False)
+        if result is not None:
+            fields["result"] = json.dumps(jsonable_encoder(result), ensure_ascii=False)
+        if error is not None:
+            fields["error"] = error
+
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, query, max_iterations, progress, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job_id, status, query, max_iterations, progress, result, error, created_at, updated_at = row
+        return {
+            "job_id": job_id,
+            "status": status,
+            "query": query,
+            "max_iterations": max_iterations,
+            "progress": json.loads(progress) if progress else None,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": datetime.fromtimestamp(created_at).isoformat(),
+            "updated_at": datetime.fromtimestamp(updated_at).isoformat()
+        }
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def mark_interrupted(self) -> int:
+        """Marca como falhos os jobs que estavam ativos quando o processo anterior parou"""
+        with self._lock:
+            interrupted = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+                (FAILED, "Interrompido por reinício do worker", time.time(), *ACTIVE_STATUSES)
+            ).rowcount
+            self._conn.commit()
+        return interrupted
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    Executa pesquisas em segundo plano num pool limitado de workers
+
+    Cada job é uma task asyncio que espera uma vaga no semáforo (até
+    max_workers pesquisas simultâneas) e roda ResearchAgent.astream_research,
+    gravando o progresso a cada nó concluído. As credenciais ficam apenas em
+    memória (client_key do pool de clientes), nunca no SQLite; por isso jobs
+    ativos de um processo anterior são marcados como interrompidos na subida.
+    Com client_pool, o bundle das credenciais fica preso (pin) enquanto o job
+    existir, para não expirar enquanto ele espera na fila. As escritas no
+    JobStore rodam numa thread dedicada, fora do event loop.
+    """
+
+    def __init__(
+        self,
+        agent,
+        store: JobStore,
+        max_workers: int = 4,
+        max_pending: int = 100,
+        client_pool: Optional[ClientPool] = None
+    ):
+        self.agent = agent
+        self.client_pool = client_pool
+        self.store = store
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(max_workers)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Uma única thread: as escritas de um job chegam ao SQLite na ordem em que foram feitas
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-store")
+
+        interrupted = store.mark_interrupted()
+        if interrupted:
+            print(f"⚠️  {interrupted} jobs interrompidos pelo reinício do worker")
+
+    def submit(
+        self,
+        query: str,
+        max_iterations: int,
+        client_key: Optional[str] = None,
+        routing_profile: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Enfileira uma pesquisa e retorna o job imediatamente (requer event loop ativo)
+
+        Raises:
+            JobQueueFull: se já houver max_pending jobs ativos
+        """
+        if len(self._tasks) >= self.max_pending:
+            raise JobQueueFull(f"Limite de {self.max_pending} jobs pendentes atingido")
+
+        job = self.store.create(query, max_iterations)
+        job_id = job["job_id"]
+        pinned = client_key is not None and self.client_pool is not None and self.client_pool.pin(client_key)
+        task = asyncio.get_running_loop().create_task(self._run(job_id, query, max_iterations, client_key, routing_profile))
+        self._tasks[job_id] = task
+
+        def finished(_):
+            self._tasks.pop(job_id, None)
+            # No callback (e não no finally de _run): roda mesmo se o job for cancelado antes de começar
+            if pinned:
+                self.client_pool.release(client_key)
+
+        task.add_done_callback(finished)
+        return job
+
+    async def _store(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Roda uma operação do JobStore (SQLite) na thread de escrita, sem travar o event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, partial(fn, *args, **kwargs))
+
+    async def _run(
+        self,
+        job_id: str,
+        query: str,
+        max_iterations: int,
+        client_key: Optional[str],
+        routing_profile: Optional[str] = None
+    ):
+        try:
+            async with self._slots:
+                await self._store(self.store.update, job_id, status=RUNNING)
+                print(f"\n🧵 JOB {job_id}: iniciando pesquisa")
+
+                steps = 0
+                async for event in self.agent.astream_research(
+                    query, max_iterations, client_key, routing_profile=routing_profile
+                ):
+                    if event["event"] == "node":
+                        steps += 1
+                        await self._store(self.store.update, job_id, progress={
+                            "node": event["node"],
+                            "steps_completed": steps,
+                            "counts": event["counts"],
+                            "messages": event["messages"]
+                        })
+                    elif event["event"] == "done":
+                        result = event["result"]
+                        result["query"] = query
+                        result["timestamp"] = datetime.now().isoformat()
+                        await self._store(self.store.update, job_id, status=COMPLETED, result=result)
+                        print(f"✅ JOB {job_id}: concluído")
+                    elif event["event"] == "error":
+                        error = f"{event['type']}: {event['error']}"
+                        await self._store(self.store.update, job_id, status=FAILED, error=error)
+                        print(f"❌ JOB {job_id}: erro - {event['error']}")
+
+        except asyncio.CancelledError:
+            await self._store(self.store.update, job_id, status=CANCELLED)
+            print(f"🛑 JOB {job_id}: cancelado")
+            raise
+
+        except Exception as e:
+            await self._store(self.store.update, job_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+            print(f"❌ JOB {job_id}: erro - {e}")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancela um job ativo; jobs já finalizados são removidos do armazenamento
+
+        Returns:
+            Estado do job após o cancelamento (None se não existir)
+        """
+        job = await self._store(self.store.get, job_id)
+        if job is None:
+            return None
+
+        if job["status"] not in ACTIVE_STATUSES:
+            await self._store(self.store.delete, job_id)
+            return job
+
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        # Marca já, sem esperar a task processar o cancelamento
+        await self._store(self.store.update, job_id, status=CANCELLED)
+        return await self._store(self.store.get, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "active": len(self._tasks),
+            "by_status": self.store.counts()
+        }
+
+    async def shutdown(self):
+        """Cancela os jobs ativos e espera as tasks terminarem"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,201 @@
+"""
+Formato das Respostas - Projeção de full_state, paginação, JSON rápido e compressão
+
+O full_state de uma pesquisa carrega os handles de todas as fontes, todas as
+validações e o log de mensagens. Aqui o cliente escolhe o que recebe, e as
+respostas grandes saem comprimidas (brotli ou gzip).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from datetime import datetime
+import asyncio
+import gzip
+import json
+
+# Opcionais: orjson (serialização) e brotli (compressão "br")
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+
+def _default(obj: Any) -> Any:
+    """Objetos que o JSON não conhece: modelos Pydantic viram dicts"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def dumps(data: Any) -> str:
+    """Serializa em JSON (orjson quando instalado, senão json da biblioteca padrão)"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, default=_default, ensure_ascii=False)
+
+
+def _page(items: List[Any], offset: int, limit: Optional[int]) -> Tuple[List[Any], Dict[str, Any]]:
+    end = None if limit is None else offset + limit
+    return items[offset:end], {"offset": offset, "limit": limit, "total": len(items)}
+
+
+def shape_result(
+    result: Dict[str, Any],
+    include_full_state: bool = True,
+    state_fields: Optional[List[str]] = None,
+    references_offset: int = 0,
+    references_limit: Optional[int] = None,
+    search_results_offset: int = 0,
+    search_results_limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Aplica as opções de resposta a um resultado de pesquisa
+
+    Não altera `result` (pode ser compartilhado pela coalescência): devolve
+    uma cópia rasa com full_state omitido ou projetado e com references e
+    full_state.search_results paginados. Quando há paginação, "pagination"
+    traz offset, limit e total de cada lista.
+
+    Args:
+        result: Resultado de ResearchAgent.research/aresearch
+        include_full_state: Se False (e sem state_fields), omite full_state
+        state_fields: Campos de full_state a manter (implica incluir full_state)
+        references_offset / references_limit: Página de references
+        search_results_offset / search_results_limit: Página de full_state.search_results
+
+    Returns:
+        Cópia do resultado no formato pedido
+    """
+    shaped = dict(result)
+    pagination: Dict[str, Any] = {}
+
+    if references_offset or references_limit is not None:
+        shaped["references"], pagination["references"] = _page(
+            shaped.get("references") or [], references_offset, references_limit
+        )
+
+    full_state = shaped.get("full_state")
+    if full_state is None or (not include_full_state and state_fields is None):
+        shaped["full_state"] = None
+    else:
+        if state_fields is not None:
+            full_state = {field: full_state[field] for field in state_fields if field in full_state}
+        else:
+            full_state = dict(full_state)
+
+        if "search_results" in full_state and (search_results_offset or search_results_limit is not None):
+            full_state["search_results"], pagination["search_results"] = _page(
+                full_state["search_results"] or [], search_results_offset, search_results_limit
+            )
+        shaped["full_state"] = full_state
+
+    shaped["pagination"] = pagination or None
+    return shaped
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Escolhe a codificação a partir do Accept-Encoding (br > gzip, respeitando q=0)
+    """
+    offered: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            offered[name.strip()] = quality
+
+    def accepted(encoding: str) -> bool:
+        return offered.get(encoding, offered.get("*", 0.0)) > 0
+
+    if brotli is not None and accepted("br"):
+        return "br"
+    if accepted("gzip"):
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        # Qualidade 5: boa taxa sem o custo dos níveis altos do brotli
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respostas completas com brotli ou gzip
+
+    Só atua em respostas de corpo único (JSON das pesquisas, métricas);
+    respostas em streaming (SSE, JSONL) passam intactas para não atrasar
+    os eventos. Corpos acima de thread_minimum_size são comprimidos numa
+    thread para não bloquear o event loop.
+    """
+
+    def __init__(self, app, minimum_size: int = 1000, thread_minimum_size: int = 256 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_minimum_size = thread_minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Dict[str, Any] = {}
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                response_headers = {k.lower() for k, _ in message.get("headers", [])}
+                passthrough = b"content-encoding" in response_headers
+                if passthrough:
+                    await send(message)
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                # Streaming: envia o início original e deixa o resto passar
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            response_headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"]
+            if len(body) >= self.minimum_size:
+                if len(body) >= self.thread_minimum_size:
+                    body = await asyncio.to_thread(compress, body, encoding)
+                else:
+                    body = compress(body, encoding)
+                response_headers.append((b"content-encoding", encoding.encode("latin-1")))
+            response_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            response_headers.append((b"vary", b"Accept-Encoding"))
+
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,3 @@
+"""
+Benchmarks offline do agente pesquisador (LLM e busca falsos)
+"""
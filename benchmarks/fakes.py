@@ -0,0 +1,158 @@
+"""
+Backends Falsos - Modelo de chat e busca determinísticos para benchmarks offline
+"""
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.context import estimate_tokens
+from src.states import SearchResult
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+
+# Vocabulário dos textos gerados (variado o bastante para não cair na deduplicação)
+VOCAB = (
+    "pesquisa dados modelo agente fonte análise resultado método sistema evidência "
+    "estudo impacto risco benefício custo escala desempenho latência memória rede "
+    "validação conflito relatório consulta índice contexto token janela limite "
+    "arquitetura grafo nó estado cache busca síntese referência confiança autor "
+    "revisão período mercado usuário produto tecnologia processo métrica teste"
+).split()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def generate_text(seed: str, chars: int) -> str:
+    """Texto determinístico de ~chars caracteres a partir de uma semente"""
+    rng = random.Random(seed)
+    words: List[str] = []
+    size = 0
+    while size < chars:
+        sentence = " ".join(rng.choice(VOCAB) for _ in range(rng.randint(8, 16))).capitalize() + "."
+        words.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(words)[:max(chars, 1)]
+
+
+def _delay(latency: float, jitter: float, seed: str) -> float:
+    """Latência determinística: latency ± jitter (fração), semeada pelo conteúdo"""
+    if latency <= 0:
+        return 0.0
+    return max(0.0, latency * (1 + random.Random(seed).uniform(-jitter, jitter)))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Modelo de chat falso com latência e tamanho de resposta configuráveis
+
+    A resposta depende do nó que fez a chamada (metadata langgraph_node):
+    queries no planejamento/refinamento, texto na simulação de busca, JSON
+    de validação e relatório em Markdown. Tudo é derivado do hash do prompt,
+    então execuções repetidas produzem as mesmas respostas.
+    """
+
+    model: str = "fake-chat-model"
+    temperature: float = 0.0
+    latency: float = 0.05
+    jitter: float = 0.2
+    payload_chars: int = 1500
+    queries_per_plan: int = 3
+    claims_per_validation: int = 3
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _reply(self, node: str, prompt: str) -> str:
+        seed = _digest(prompt)
+        if node in ("plan_research", "refine_queries"):
+            return "\n".join(f"consulta {seed[:10]} {i}" for i in range(self.queries_per_plan))
+        if node == "validate_information":
+            return json.dumps({
+                "validations": [
+                    {
+                        "claim": generate_text(f"{seed}:{i}", 80),
+                        "is_validated": True,
+                        "confidence": 0.8,
+                        "supporting_sources": [],
+                        "reasoning": generate_text(f"{seed}:r{i}", 120)
+                    }
+                    for i in range(self.claims_per_validation)
+                ],
+                "conflicts_detected": False,
+                "summary": generate_text(seed, 120)
+            }, ensure_ascii=False)
+        if node == "synthesize_report":
+            return "# Relatório\n\n" + generate_text(seed, self.payload_chars)
+        return generate_text(seed, self.payload_chars)
+
+    def _result(self, messages: List[BaseMessage], run_manager) -> ChatResult:
+        node = (getattr(run_manager, "metadata", None) or {}).get("langgraph_node", "")
+        prompt = "\n".join(str(m.content) for m in messages)
+        content = self._reply(node, prompt)
+        usage = {
+            "input_tokens": estimate_tokens(prompt),
+            "output_tokens": estimate_tokens(content),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(content)
+        }
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content, usage_metadata=usage))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(_delay(self.latency, self.jitter, _digest(str(messages[-1].content))))
+        return self._result(messages, run_manager)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(_delay(self.latency, self.jitter, _digest(str(messages[-1].content))))
+        return self._result(messages, run_manager)
+
+
+class FakeSearch:
+    """
+    Backend de busca falso (mesma interface de src.search.TavilySearch)
+
+    Cada query retorna results_per_query resultados determinísticos, com
+    content_chars caracteres de conteúdo e a latência configurada.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.2,
+        results_per_query: int = 3,
+        content_chars: int = 2000,
+        search_depth: str = "basic"
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_results = results_per_query
+        self.content_chars = content_chars
+        self.search_depth = search_depth
+
+    def _results(self, query: str) -> List[SearchResult]:
+        seed = _digest(query)
+        return [
+            SearchResult(
+                source=f"https://bench.example/{seed[:12]}/{i}",
+                title=f"Resultado {i} para {query[:40]}",
+                content=generate_text(f"{seed}:{i}", self.content_chars),
+                relevance_score=round(1.0 - i / (self.max_results + 1), 3)
+            )
+            for i in range(self.max_results)
+        ]
+
+    def search(self, query: str) -> List[SearchResult]:
+        time.sleep(_delay(self.latency, self.jitter, query))
+        return self._results(query)
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        await asyncio.sleep(_delay(self.latency, self.jitter, query))
+        return self._results(query)
+
+    def close(self):
+        pass
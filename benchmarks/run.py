@@ -0,0 +1,240 @@
+"""
+Benchmarks Offline - Latência, tempo por nó, vazão e memória do agente e da API
+
+Roda o ResearchAgent (caminho assíncrono) e/ou o app FastAPI contra o modelo
+de chat e a busca falsos de benchmarks/fakes.py, sem acesso à rede.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.run
+    python -m benchmarks.run --target api --concurrency 1 10
+    python -m benchmarks.run --llm-latency 0.2 --payload-chars 4000 --json resultados.json
+"""
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agent import ResearchAgent
+from src.pool import ClientBundle, ClientPool
+from benchmarks.fakes import FakeChatModel, FakeSearch
+
+# Credenciais das requisições à API (o bundle delas no pool usa os backends falsos)
+API_CREDENTIALS = {"anthropic_api_key": "benchmark", "tavily_api_key": "benchmark"}
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Percentil com interpolação linear (p entre 0 e 100)"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize_latencies(latencies: Sequence[float]) -> Dict[str, float]:
+    return {
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0)
+    }
+
+
+def mean_node_times(results: Sequence[Dict[str, Any]]) -> Dict[str, float]:
+    """Tempo médio por nó (por execução) a partir de result["timings"]"""
+    totals: Dict[str, float] = {}
+    for result in results:
+        for node, stats in (result.get("timings") or {}).get("nodes", {}).items():
+            totals[node] = totals.get(node, 0.0) + stats["seconds"]
+    return {node: total / len(results) for node, total in totals.items()} if results else {}
+
+
+def _fakes(args) -> Tuple[FakeChatModel, FakeSearch]:
+    llm = FakeChatModel(
+        latency=args.llm_latency,
+        jitter=args.jitter,
+        payload_chars=args.payload_chars
+    )
+    search = FakeSearch(
+        latency=args.search_latency,
+        jitter=args.jitter,
+        results_per_query=args.results_per_query,
+        content_chars=args.content_chars
+    )
+    return llm, search
+
+
+def build_agent(args) -> ResearchAgent:
+    """ResearchAgent com os backends falsos (sem caches, para medir o trabalho completo)"""
+    llm, search = _fakes(args)
+    return ResearchAgent(anthropic_api_key="benchmark", max_iterations=args.iterations, llm=llm, search_backend=search)
+
+
+def load_api(args, workdir: str):
+    """Importa backend.api com caches/jobs num diretório temporário e os backends falsos"""
+    os.environ["SEARCH_CACHE_PATH"] = os.path.join(workdir, "search_cache.db")
+    os.environ["JOBS_DB_PATH"] = os.path.join(workdir, "jobs.db")
+    api = importlib.import_module("backend.api")
+
+    # Bundle falso registrado (e preso) no pool para as credenciais das requisições:
+    # register_credentials o reaproveita em vez de criar clientes reais
+    llm, search = _fakes(args)
+    key = ClientPool.credentials_key(API_CREDENTIALS["anthropic_api_key"], API_CREDENTIALS["tavily_api_key"])
+    api.client_pool.acquire(key, lambda: ClientBundle(
+        llm=llm,
+        search=search,
+        tavily_configured=True,
+        model_factory=lambda spec: llm  # Perfis de roteamento também usam o falso
+    ))
+    api.client_pool.pin(key)
+    return api
+
+
+async def _bounded(concurrency: int, jobs: List[Callable]) -> List[Tuple[float, Dict[str, Any]]]:
+    """Executa as corrotinas com no máximo `concurrency` simultâneas, medindo cada uma"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(job):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await job()
+            return time.perf_counter() - start, result
+
+    return list(await asyncio.gather(*(timed(job) for job in jobs)))
+
+
+async def run_agent(agent: ResearchAgent, queries: Sequence[str], concurrency: int):
+    return await _bounded(concurrency, [lambda q=q: agent.aresearch(q) for q in queries])
+
+
+async def run_api(api, queries: Sequence[str], concurrency: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def post(query: str) -> Dict[str, Any]:
+            response = await client.post("/research", json={
+                "query": query,
+                "max_iterations": 1,
+                **API_CREDENTIALS
+            })
+            response.raise_for_status()
+            return response.json()
+
+        return await _bounded(concurrency, [lambda q=q: post(q) for q in queries])
+
+
+def run_level(target: str, runner, concurrency: int, args) -> Dict[str, Any]:
+    """Mede um nível de concorrência: passada de tempo e, opcionalmente, passada de memória"""
+    runs = max(concurrency, args.min_runs)
+
+    def queries(tag: str) -> List[str]:
+        # Queries únicas por passada: nada vem de cache ou coalescência
+        return [f"Pergunta de benchmark {target} {tag} c{concurrency} #{i}" for i in range(runs)]
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        measured = asyncio.run(runner(queries("tempo"), concurrency))
+        wall = time.perf_counter() - start
+
+        peak_mb = None
+        if not args.skip_memory:
+            tracemalloc.start()
+            asyncio.run(runner(queries("memoria"), concurrency))
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+
+    latencies = [latency for latency, _ in measured]
+    results = [result for _, result in measured]
+    errors = sum(1 for r in results if (r.get("full_state") or {}).get("error"))
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": errors,
+        "wall_seconds": wall,
+        "throughput_rps": runs / wall if wall else 0.0,
+        "latency_seconds": summarize_latencies(latencies),
+        "node_seconds": mean_node_times(results),
+        "peak_memory_mb": peak_mb
+    }
+
+
+def print_level(report: Dict[str, Any]):
+    latency = report["latency_seconds"]
+    print(f"\n📊 {report['target']} | concorrência {report['concurrency']} | {report['runs']} execuções"
+          + (f" | ⚠️  {report['errors']} erros" if report["errors"] else ""))
+    print(f"   latência (s): média {latency['mean']:.3f} | p50 {latency['p50']:.3f} | "
+          f"p90 {latency['p90']:.3f} | p99 {latency['p99']:.3f} | máx {latency['max']:.3f}")
+    print(f"   vazão: {report['throughput_rps']:.1f} execuções/s ({report['wall_seconds']:.2f}s no total)")
+    if report["peak_memory_mb"] is not None:
+        print(f"   memória de pico (tracemalloc): {report['peak_memory_mb']:.1f} MB")
+    nodes = " | ".join(f"{node} {seconds:.3f}" for node, seconds in report["node_seconds"].items())
+    print(f"   tempo por nó (média, s): {nodes}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline do agente pesquisador")
+    parser.add_argument("--target", choices=["agent", "api", "both"], default="agent",
+                        help="O que medir: ResearchAgent.aresearch, POST /research ou ambos")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100],
+                        help="Níveis de execuções concorrentes")
+    parser.add_argument("--min-runs", type=int, default=20,
+                        help="Mínimo de execuções por nível (para a distribuição de latência)")
+    parser.add_argument("--iterations", type=int, default=1, help="max_iterations de cada pesquisa")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Latência média do LLM falso (s)")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Latência média da busca falsa (s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Variação da latência (fração, determinística)")
+    parser.add_argument("--payload-chars", type=int, default=1500, help="Tamanho das respostas do LLM falso")
+    parser.add_argument("--results-per-query", type=int, default=3, help="Resultados por busca")
+    parser.add_argument("--content-chars", type=int, default=2000, help="Tamanho do conteúdo de cada resultado")
+    parser.add_argument("--skip-memory", action="store_true", help="Não faz a passada com tracemalloc")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> List[Dict[str, Any]]:
+    args = parse_args(argv)
+    targets = ["agent", "api"] if args.target == "both" else [args.target]
+
+    print("⏱️  BENCHMARKS OFFLINE (LLM e busca falsos)")
+    print(f"   LLM {args.llm_latency}s ± {args.jitter:.0%} | busca {args.search_latency}s | "
+          f"{args.results_per_query} resultados de {args.content_chars} caracteres | respostas de {args.payload_chars}")
+
+    reports = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for target in targets:
+            if target == "agent":
+                agent = build_agent(args)
+                runner = lambda queries, concurrency: run_agent(agent, queries, concurrency)
+            else:
+                api = load_api(args, workdir)
+                runner = lambda queries, concurrency: run_api(api, queries, concurrency)
+
+            for concurrency in args.concurrency:
+                report = run_level(target, runner, concurrency, args)
+                print_level(report)
+                reports.append(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Resultados salvos em: {args.json}")
+
+    return reports
+
+
+if __name__ == "__main__":
+    main()
@@ -78,6 +78,8 @@ export default function Home() {
           query,
           max_iterations: maxIterations,
           anthropic_api_key: anthropicKey,
+          // Só os campos de full_state exibidos na interface
+          response: { state_fields: ["messages", "validations", "search_queries"] },
         }),
       })
 
@@ -10,18 +10,42 @@ Arquitetura do Grafo:
       ↓
     validate_information (cruza fontes)
       ↓
-    decide_next_step
+    decide_next_step (ganho marginal, orçamento de iterações)
       ↓
-    [se needs_more_research] → search_web (loop)
+    [se needs_more_research] → refine_queries → search_web (loop, só queries novas)
     [senão] → synthesize_report
       ↓
     END
 """
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union
+from contextlib import asynccontextmanager, contextmanager
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from .states import ResearchState
 from .nodes import ResearchNodes
+from .cache import LLMCache, SearchCache
+from .pool import ClientPool
+from .checkpoint import SQLiteCheckpoints
+from .metrics import MetricsCallbackHandler, MetricsRegistry, record_retry
+from .sources import SourceStore
+from .iteration import IterationPolicy
+from .routing import RoutingProfile, resolve_profile
+from .ratelimit import RateLimiter
+from .search import SearchBackend, SharedSearches, normalize_query
+import asyncio
 import os
+import uuid
+
+
+def _message_text(message) -> str:
+    """Extrai o texto de um chunk de mensagem (string ou lista de blocos)"""
+    content = getattr(message, "content", "")
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
 
 
 class ResearchAgent:
@@ -31,7 +55,18 @@ class ResearchAgent:
         self,
         anthropic_api_key: Optional[str] = None,
         tavily_api_key: Optional[str] = None,
-        max_iterations: int = 2
+        max_iterations: int = 2,
+        search_concurrency: int = 5,
+        search_cache: Optional[SearchCache] = None,
+        llm_cache: Optional[LLMCache] = None,
+        client_pool: Optional[ClientPool] = None,
+        checkpoint_path: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        iteration_policy: Optional[IterationPolicy] = None,
+        routing: Union[str, RoutingProfile, None] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        search_backend: Optional[SearchBackend] = None,
+        llm: Optional[Any] = None
     ):
         """
         Inicializa o agente de pesquisa
@@ -40,12 +75,42 @@ class ResearchAgent:
             anthropic_api_key: API key da Anthropic (ou via ANTHROPIC_API_KEY env)
             tavily_api_key: API key do Tavily (ou via TAVILY_API_KEY env)
             max_iterations: Número máximo de iterações de pesquisa
+            search_concurrency: Máximo de buscas simultâneas por iteração
+            search_cache: Cache de buscas compartilhado (ver src/cache.py)
+            llm_cache: Cache de respostas do LLM, opt-in (ver src/cache.py)
+            client_pool: Pool de clientes por credencial, para credenciais por execução (ver src/pool.py)
+            checkpoint_path: Arquivo SQLite para checkpoints do grafo; permite retomar execuções
+                (opcional, requer langgraph-checkpoint-sqlite)
+            metrics: Registro de métricas compartilhado (ver src/metrics.py); criado se omitido
+            iteration_policy: Critérios de parada antecipada do laço de pesquisa (ver src/iteration.py)
+            routing: Perfil de roteamento padrão, com um modelo (e fallbacks) por nó: "fast",
+                "balanced", "quality" ou um RoutingProfile (ver src/routing.py); None usa um
+                único modelo em todos os nós
+            rate_limiter: Limites de taxa e novas tentativas das chamadas à Anthropic e ao Tavily,
+                por API key (ver src/ratelimit.py); padrão: o limitador compartilhado do processo
+            search_backend: Backend de busca no lugar do Tavily, ex.: LocalCorpusSearch para
+                pesquisar documentos locais sem rede (ver src/corpus.py)
+            llm: Modelo de chat no lugar do ChatAnthropic (credenciais padrão), em todos os nós;
+                ex.: FakeChatModel dos benchmarks (ver benchmarks/fakes.py)
         """
         self.nodes = ResearchNodes(
             api_key=anthropic_api_key,
-            tavily_api_key=tavily_api_key
+            tavily_api_key=tavily_api_key,
+            search_concurrency=search_concurrency,
+            search_cache=search_cache,
+            llm_cache=llm_cache,
+            client_pool=client_pool,
+            iteration_policy=iteration_policy,
+            routing=routing,
+            rate_limiter=rate_limiter,
+            search_backend=search_backend,
+            llm=llm
         )
         self.max_iterations = max_iterations
+        self.checkpoints = SQLiteCheckpoints(checkpoint_path) if checkpoint_path else None
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        # Novas tentativas acontecem no limitador (ChatAnthropic usa max_retries=0)
+        self.nodes.rate_limiter.set_retry_hook(record_retry)
         self.graph = self._build_graph()
 
     def _build_graph(self) -> StateGraph:
@@ -54,11 +119,23 @@ class ResearchAgent:
         # Define o grafo com o estado
         workflow = StateGraph(ResearchState)
 
-        # Adiciona os nós
-        workflow.add_node("plan_research", self.nodes.plan_research)
-        workflow.add_node("search_web", self.nodes.search_web)
-        workflow.add_node("validate_information", self.nodes.validate_information)
-        workflow.add_node("synthesize_report", self.nodes.synthesize_report)
+        # Adiciona os nós (cada nó tem versão síncrona para invoke e assíncrona para ainvoke/astream)
+        nodes = self.nodes
+        workflow.add_node("plan_research", self._node("plan_research", nodes.plan_research, nodes.aplan_research))
+        workflow.add_node("search_web", self._node("search_web", nodes.search_web, nodes.asearch_web))
+        workflow.add_node("refine_queries", self._node("refine_queries", nodes.refine_queries, nodes.arefine_queries))
+        workflow.add_node(
+            "validate_information",
+            self._node("validate_information", nodes.validate_information, nodes.avalidate_information)
+        )
+        workflow.add_node(
+            "decide_next_step",
+            self._node("decide_next_step", nodes.decide_next_step, nodes.adecide_next_step)
+        )
+        workflow.add_node(
+            "synthesize_report",
+            self._node("synthesize_report", nodes.synthesize_report, nodes.asynthesize_report)
+        )
 
         # Define o fluxo
         workflow.set_entry_point("plan_research")
@@ -69,116 +146,512 @@ class ResearchAgent:
         # search_web → validate_information
         workflow.add_edge("search_web", "validate_information")
 
-        # validate_information → decide_next_step (condicional)
+        # validate_information → decide_next_step (mede o ganho da rodada e decide)
+        workflow.add_edge("validate_information", "decide_next_step")
+
+        # decide_next_step → refine_queries ou synthesize_report (condicional)
         workflow.add_conditional_edges(
-            "validate_information",
-            self.nodes.decide_next_step,
+            "decide_next_step",
+            nodes.next_step,
             {
-                "research_more": "search_web",  # Loop para mais pesquisa
+                "research_more": "refine_queries",  # Loop com queries refinadas
                 "synthesize": "synthesize_report"  # Vai para síntese
             }
         )
 
+        # refine_queries → search_web (executa apenas as queries novas)
+        workflow.add_edge("refine_queries", "search_web")
+
         # synthesize_report → END
         workflow.add_edge("synthesize_report", END)
 
-        # Compila o grafo
-        return workflow.compile()
+        # Compila o grafo (com checkpoint após cada nó, se configurado)
+        return workflow.compile(checkpointer=self.checkpoints.saver if self.checkpoints else None)
 
-    def research(self, query: str, max_iterations: Optional[int] = None) -> dict:
-        """
-        Executa uma pesquisa completa sobre um tópico
+    @asynccontextmanager
+    async def _async_graph(self) -> AsyncIterator:
+        """Grafo para uma execução assíncrona (com checkpointer assíncrono, se configurado)"""
+        if self.checkpoints is None:
+            yield self.graph
+            return
 
-        Args:
-            query: Pergunta ou tópico de pesquisa
-            max_iterations: Override do número máximo de iterações
+        async with self.checkpoints.asaver() as saver:
+            # Cópia rasa do grafo compilado: só o checkpointer muda
+            yield self.graph.copy(update={"checkpointer": saver})
 
-        Returns:
-            Dict com o relatório final, referências e metadados
-        """
-        print("\n" + "="*80)
-        print(f"🔬 INICIANDO PESQUISA: {query}")
-        print("="*80)
+    @staticmethod
+    def _node(name: str, func, afunc) -> RunnableLambda:
+        """Nó com implementação síncrona e assíncrona"""
+        return RunnableLambda(func, afunc=afunc, name=name)
 
-        # Estado inicial
-        initial_state = {
+    def _initial_state(self, query: str, max_iterations: Optional[int] = None) -> dict:
+        """Monta o estado inicial do grafo"""
+        return {
             "query": query,
             "max_iterations": max_iterations or self.max_iterations,
             "search_results": [],
             "search_queries": [],
+            "executed_queries": [],
+            "latest_search": {},
             "validations": [],
+            "latest_validations": [],
+            "validated_sources": [],
             "conflicts_detected": False,
             "final_report": "",
             "references": [],
             "confidence_level": 0.0,
             "current_iteration": 0,
             "needs_more_research": True,
+            "iteration_metrics": [],
             "error": None,
             "messages": []
         }
 
+    @staticmethod
+    def _build_result(final_state: dict, thread_id: Optional[str] = None) -> dict:
+        """Monta o resultado da pesquisa a partir do estado final do grafo"""
+        # Garante que todos os campos existem com valores padrão
+        return {
+            "report": final_state.get("final_report", "Erro ao gerar relatório"),
+            "references": final_state.get("references", []),
+            "confidence": final_state.get("confidence_level", 0.0),
+            "search_results_count": len(final_state.get("search_results", [])),
+            "validations_count": len(final_state.get("validations", [])),
+            "conflicts_detected": final_state.get("conflicts_detected", False),
+            "iterations": final_state.get("current_iteration", 0),
+            "thread_id": thread_id,
+            "full_state": final_state
+        }
+
+    @staticmethod
+    def _error_result(error: Exception, thread_id: Optional[str] = None) -> dict:
+        """Resultado estruturado de uma execução que falhou"""
+        print(f"\n❌ ERRO NO GRAFO: {error}")
+        import traceback
+        traceback.print_exc()
+
+        # Retorna erro estruturado
+        return {
+            "report": f"# Erro ao Executar Pesquisa\n\nOcorreu um erro durante a pesquisa: {str(error)}",
+            "references": [],
+            "confidence": 0.0,
+            "search_results_count": 0,
+            "validations_count": 0,
+            "conflicts_detected": False,
+            "iterations": 0,
+            "thread_id": thread_id,
+            "full_state": {"error": str(error)}
+        }
+
+    def register_credentials(self, anthropic_api_key: str, tavily_api_key: Optional[str] = None) -> str:
+        """
+        Registra credenciais para uso por execução, sem recompilar o grafo
+
+        Returns:
+            client_key a ser passada para research()/aresearch()/astream_research()
+        """
+        return self.nodes.register_credentials(anthropic_api_key, tavily_api_key)
+
+    @contextmanager
+    def credentials(self, anthropic_api_key: str, tavily_api_key: Optional[str] = None) -> Iterator[str]:
+        """
+        Registra credenciais e mantém seus clientes no pool durante o bloco
+
+        O bundle fica preso enquanto a execução roda: nem a ociosidade nem o
+        limite de tamanho do pool o descartam no meio do grafo.
+
+        Yields:
+            client_key a ser passada para as execuções do bloco
+        """
+        client_key = self.nodes.register_credentials(anthropic_api_key, tavily_api_key, pin=True)
+        try:
+            yield client_key
+        finally:
+            self.nodes.client_pool.release(client_key)
+
+    def model_config(self, routing_profile: Optional[str] = None) -> dict:
+        """Modelo e parâmetros usados pelos nós (identificam execuções equivalentes)"""
+        llm = self.nodes.llm
+        profile = resolve_profile(routing_profile) if routing_profile else self.nodes.routing
+        return {
+            "model": getattr(llm, "model", None) or getattr(llm, "model_name", ""),
+            "temperature": getattr(llm, "temperature", None),
+            "routing_profile": profile.name if profile else None
+        }
+
+    def _source_store(self, thread_id: Optional[str] = None) -> SourceStore:
+        """Repositório de fontes da execução (persistido junto dos checkpoints, se ativados)"""
+        if self.checkpoints is not None and thread_id:
+            return self.checkpoints.sources(thread_id)
+        return SourceStore()
+
+    def _run_config(
+        self,
+        client_key: Optional[str],
+        thread_id: Optional[str] = None,
+        metrics: Optional[MetricsCallbackHandler] = None,
+        routing_profile: Optional[str] = None,
+        shared_searches: Optional[SharedSearches] = None
+    ) -> dict:
+        """
+        Configuração de execução do grafo: clientes do pool, thread do
+        checkpoint, repositório de fontes, perfil de roteamento, buscas
+        compartilhadas de um lote e métricas, se houver
+        """
+        configurable = {"sources": self._source_store(thread_id)}
+        if client_key:
+            configurable["client_key"] = client_key
+        if thread_id:
+            configurable["thread_id"] = thread_id
+        if routing_profile:
+            resolve_profile(routing_profile)  # Falha cedo com perfil desconhecido
+            configurable["routing_profile"] = routing_profile
+        if shared_searches is not None:
+            configurable["shared_searches"] = shared_searches
+        config = {"configurable": configurable}
+        if metrics is not None:
+            config["callbacks"] = [metrics]
+        return config
+
+    @staticmethod
+    def _with_timings(result: dict, metrics: MetricsCallbackHandler, status: str) -> dict:
+        """Anexa ao resultado o resumo de tempos, tokens e chamadas da execução"""
+        result["timings"] = metrics.finish(status)
+        return result
+
+    def _new_thread_id(self, thread_id: Optional[str] = None) -> Optional[str]:
+        """Thread do checkpoint para uma nova execução (None sem checkpointing)"""
+        if self.checkpoints is None:
+            return None
+        return thread_id or uuid.uuid4().hex
+
+    def _require_checkpoints(self):
+        if self.checkpoints is None:
+            raise RuntimeError("Checkpointing desativado: informe checkpoint_path ao criar o ResearchAgent")
+
+    def research(
+        self,
+        query: str,
+        max_iterations: Optional[int] = None,
+        client_key: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        routing_profile: Optional[str] = None
+    ) -> dict:
+        """
+        Executa uma pesquisa completa sobre um tópico
+
+        Args:
+            query: Pergunta ou tópico de pesquisa
+            max_iterations: Override do número máximo de iterações
+            client_key: Credenciais registradas com register_credentials() (opcional)
+            thread_id: Thread do checkpoint (gerado se omitido; só com checkpointing)
+            routing_profile: Perfil de roteamento desta execução (padrão: o do agente)
+
+        Returns:
+            Dict com o relatório final, referências e metadados
+        """
+        print("\n" + "="*80)
+        print(f"🔬 INICIANDO PESQUISA: {query}")
+        print("="*80)
+
+        # Estado inicial
+        initial_state = self._initial_state(query, max_iterations)
+        thread_id = self._new_thread_id(thread_id)
+
+        metrics = MetricsCallbackHandler(self.metrics)
+
         # Executa o grafo
         try:
-            final_state = self.graph.invoke(initial_state)
+            final_state = self.graph.invoke(initial_state, self._run_config(client_key, thread_id, metrics, routing_profile))
 
             print("\n" + "="*80)
             print("✅ PESQUISA CONCLUÍDA")
             print("="*80)
 
-            # Garante que todos os campos existem com valores padrão
-            return {
-                "report": final_state.get("final_report", "Erro ao gerar relatório"),
-                "references": final_state.get("references", []),
-                "confidence": final_state.get("confidence_level", 0.0),
-                "search_results_count": len(final_state.get("search_results", [])),
-                "validations_count": len(final_state.get("validations", [])),
-                "conflicts_detected": final_state.get("conflicts_detected", False),
-                "iterations": final_state.get("current_iteration", 0),
-                "full_state": final_state
-            }
+            return self._with_timings(self._build_result(final_state, thread_id), metrics, "completed")
 
         except Exception as e:
-            print(f"\n❌ ERRO NO GRAFO: {e}")
-            import traceback
-            traceback.print_exc()
-
-            # Retorna erro estruturado
-            return {
-                "report": f"# Erro ao Executar Pesquisa\n\nOcorreu um erro durante a pesquisa: {str(e)}",
-                "references": [],
-                "confidence": 0.0,
-                "search_results_count": 0,
-                "validations_count": 0,
-                "conflicts_detected": False,
-                "iterations": 0,
-                "full_state": {"error": str(e)}
-            }
+            return self._with_timings(self._error_result(e, thread_id), metrics, "error")
+
+    async def aresearch(
+        self,
+        query: str,
+        max_iterations: Optional[int] = None,
+        client_key: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        routing_profile: Optional[str] = None,
+        shared_searches: Optional[SharedSearches] = None
+    ) -> dict:
+        """
+        Executa uma pesquisa completa sem bloquear o event loop
+
+        Caminho principal do backend: todos os nós têm versão assíncrona, então
+        um único worker atende várias pesquisas concorrentes.
+
+        Args:
+            query: Pergunta ou tópico de pesquisa
+            max_iterations: Override do número máximo de iterações
+            client_key: Credenciais registradas com register_credentials() (opcional)
+            thread_id: Thread do checkpoint (gerado se omitido; só com checkpointing)
+            routing_profile: Perfil de roteamento desta execução (padrão: o do agente)
+            shared_searches: Buscas compartilhadas com outras pesquisas de um lote (ver abatch_research)
 
-    async def aresearch(self, query: str, max_iterations: Optional[int] = None) -> dict:
-        """Versão assíncrona de research()"""
-        initial_state = {
+        Returns:
+            Dict com o relatório final, referências e metadados (mesmo formato de research())
+        """
+        print("\n" + "="*80)
+        print(f"🔬 INICIANDO PESQUISA: {query}")
+        print("="*80)
+
+        initial_state = self._initial_state(query, max_iterations)
+        thread_id = self._new_thread_id(thread_id)
+
+        metrics = MetricsCallbackHandler(self.metrics)
+
+        try:
+            async with self._async_graph() as graph:
+                final_state = await graph.ainvoke(
+                    initial_state,
+                    self._run_config(client_key, thread_id, metrics, routing_profile, shared_searches)
+                )
+
+            print("\n" + "="*80)
+            print("✅ PESQUISA CONCLUÍDA")
+            print("="*80)
+
+            return self._with_timings(self._build_result(final_state, thread_id), metrics, "completed")
+
+        except Exception as e:
+            return self._with_timings(self._error_result(e, thread_id), metrics, "error")
+
+    def get_run(self, thread_id: str) -> Optional[dict]:
+        """
+        Carrega o resultado de uma execução a partir do checkpoint, sem reexecutar nada
+
+        Returns:
+            Resultado no formato de research() mais "pending_nodes" (nós que
+            ainda faltam; vazio se a execução terminou), ou None se não existir
+        """
+        self._require_checkpoints()
+        snapshot = self.graph.get_state(self._run_config(None, thread_id))
+        return self._snapshot_result(snapshot, thread_id)
+
+    async def aget_run(self, thread_id: str) -> Optional[dict]:
+        """Versão assíncrona de get_run()"""
+        self._require_checkpoints()
+        async with self._async_graph() as graph:
+            snapshot = await graph.aget_state(self._run_config(None, thread_id))
+        return self._snapshot_result(snapshot, thread_id)
+
+    def _snapshot_result(self, snapshot, thread_id: str) -> Optional[dict]:
+        if not snapshot.values:
+            return None
+        result = self._build_result(snapshot.values, thread_id)
+        result["pending_nodes"] = list(snapshot.next)
+        return result
+
+    def resume(
+        self,
+        thread_id: str,
+        client_key: Optional[str] = None,
+        routing_profile: Optional[str] = None
+    ) -> Optional[dict]:
+        """
+        Retoma uma execução a partir do último nó concluído
+
+        Execuções já finalizadas apenas têm o resultado carregado do checkpoint.
+
+        Returns:
+            Resultado no formato de research(), ou None se o thread não existir
+        """
+        self._require_checkpoints()
+        config = self._run_config(client_key, thread_id)
+        snapshot = self.graph.get_state(config)
+        if not snapshot.values:
+            return None
+        if not snapshot.next:
+            return self._build_result(snapshot.values, thread_id)
+
+        print(f"\n♻️  RETOMANDO PESQUISA {thread_id} a partir de: {', '.join(snapshot.next)}")
+        metrics = MetricsCallbackHandler(self.metrics)
+        try:
+            final_state = self.graph.invoke(None, self._run_config(client_key, thread_id, metrics, routing_profile))
+            return self._with_timings(self._build_result(final_state, thread_id), metrics, "completed")
+        except Exception as e:
+            return self._with_timings(self._error_result(e, thread_id), metrics, "error")
+
+    async def aresume(
+        self,
+        thread_id: str,
+        client_key: Optional[str] = None,
+        routing_profile: Optional[str] = None
+    ) -> Optional[dict]:
+        """Versão assíncrona de resume()"""
+        self._require_checkpoints()
+        config = self._run_config(client_key, thread_id)
+        async with self._async_graph() as graph:
+            snapshot = await graph.aget_state(config)
+            if not snapshot.values:
+                return None
+            if not snapshot.next:
+                return self._build_result(snapshot.values, thread_id)
+
+            print(f"\n♻️  RETOMANDO PESQUISA {thread_id} a partir de: {', '.join(snapshot.next)}")
+            metrics = MetricsCallbackHandler(self.metrics)
+            try:
+                final_state = await graph.ainvoke(None, self._run_config(client_key, thread_id, metrics, routing_profile))
+                return self._with_timings(self._build_result(final_state, thread_id), metrics, "completed")
+            except Exception as e:
+                return self._with_timings(self._error_result(e, thread_id), metrics, "error")
+
+    async def astream_research(
+        self,
+        query: str,
+        max_iterations: Optional[int] = None,
+        client_key: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        routing_profile: Optional[str] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Executa a pesquisa emitindo eventos de progresso
+
+        Eventos (dicts com a chave "event"):
+            start: pesquisa iniciada (com o thread_id do checkpoint, se ativado)
+            node: um nó terminou (nome, mensagens do nó e contagens parciais)
+            token: trecho do relatório gerado por synthesize_report
+            claim: afirmação validada, assim que chega na resposta em streaming da validação
+            done: resultado final (mesmo formato de research())
+            error: a execução falhou (mensagem, tipo e o resultado de erro de research())
+        """
+        initial_state = self._initial_state(query, max_iterations)
+        thread_id = self._new_thread_id(thread_id)
+        yield {
+            "event": "start",
             "query": query,
-            "max_iterations": max_iterations or self.max_iterations,
-            "search_results": [],
-            "search_queries": [],
-            "validations": [],
-            "conflicts_detected": False,
-            "final_report": "",
-            "references": [],
-            "confidence_level": 0.0,
-            "current_iteration": 0,
-            "needs_more_research": True,
-            "error": None,
-            "messages": []
+            "max_iterations": initial_state["max_iterations"],
+            "thread_id": thread_id
         }
 
-        final_state = await self.graph.ainvoke(initial_state)
+        final_state = initial_state
+        pending_nodes = []
+        metrics = MetricsCallbackHandler(self.metrics)
 
-        return {
-            "report": final_state["final_report"],
-            "references": final_state["references"],
-            "confidence": final_state["confidence_level"],
-            "full_state": final_state
+        try:
+            async with self._async_graph() as graph:
+                async for mode, chunk in graph.astream(
+                    initial_state,
+                    self._run_config(client_key, thread_id, metrics, routing_profile),
+                    stream_mode=["updates", "messages", "values", "custom"]
+                ):
+                    if mode == "custom":
+                        if isinstance(chunk, dict) and "claim" in chunk:
+                            yield {"event": "claim", "claim": chunk["claim"]}
+
+                    elif mode == "messages":
+                        message, metadata = chunk
+                        text = _message_text(message)
+                        if metadata.get("langgraph_node") == "synthesize_report" and text:
+                            yield {"event": "token", "content": text}
+
+                    elif mode == "updates":
+                        # As contagens só ficam disponíveis no "values" do mesmo passo
+                        pending_nodes.extend(chunk.items())
+
+                    elif mode == "values":
+                        final_state = chunk
+                        counts = {
+                            "search_queries": len(chunk.get("search_queries", [])),
+                            "search_results": len(chunk.get("search_results", [])),
+                            "validations": len(chunk.get("validations", [])),
+                            "iteration": chunk.get("current_iteration", 0)
+                        }
+                        for node, update in pending_nodes:
+                            yield {
+                                "event": "node",
+                                "node": node,
+                                "messages": (update or {}).get("messages", []),
+                                "counts": counts
+                            }
+                        pending_nodes = []
+        except Exception as e:
+            result = self._with_timings(self._error_result(e, thread_id), metrics, "error")
+            yield {"event": "error", "error": str(e), "type": type(e).__name__, "result": result}
+            return
+
+        result = self._with_timings(self._build_result(final_state, thread_id), metrics, "completed")
+        yield {"event": "done", "result": result}
+
+    async def abatch_research(
+        self,
+        queries: Sequence[str],
+        max_iterations: Optional[int] = None,
+        client_key: Optional[str] = None,
+        routing_profile: Optional[str] = None,
+        concurrency: int = 4,
+        search_concurrency: Optional[int] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Executa um lote de pesquisas, emitindo cada resultado assim que fica pronto
+
+        Perguntas repetidas (após normalização) são planejadas e executadas
+        uma única vez. As buscas planejadas por todas as pesquisas passam
+        por um SharedSearches: cada busca distinta roda uma vez para o lote
+        inteiro, dentro de um único limite de concorrência. Validação e
+        síntese continuam por pergunta.
+
+        Args:
+            queries: Perguntas do lote
+            max_iterations: Override do número máximo de iterações
+            client_key: Credenciais registradas com register_credentials() (opcional)
+            routing_profile: Perfil de roteamento das execuções (padrão: o do agente)
+            concurrency: Máximo de pesquisas simultâneas
+            search_concurrency: Máximo de buscas simultâneas no lote (padrão: o do agente)
+
+        Eventos (dicts com a chave "event"):
+            result: resultado de uma pergunta ("index" na lista original, "query" e
+                "result" no formato de research()), na ordem de conclusão
+            summary: totais do lote (perguntas, execuções e buscas compartilhadas)
+        """
+        if routing_profile:
+            resolve_profile(routing_profile)  # Falha antes de iniciar o lote
+
+        groups: Dict[str, List[int]] = {}
+        for index, query in enumerate(queries):
+            groups.setdefault(normalize_query(query), []).append(index)
+
+        searches = SharedSearches(search_concurrency or self.nodes.search_concurrency)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(indices: List[int]):
+            async with semaphore:
+                result = await self.aresearch(
+                    queries[indices[0]],
+                    max_iterations,
+                    client_key,
+                    routing_profile=routing_profile,
+                    shared_searches=searches
+                )
+            return indices, result
+
+        tasks = [asyncio.ensure_future(run(indices)) for indices in groups.values()]
+        errors = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indices, result = await finished
+                errors += bool(result["full_state"].get("error"))
+                for index in indices:
+                    yield {"event": "result", "index": index, "query": queries[index], "result": result}
+        finally:
+            # Cliente desconectado no meio do lote: cancela o que falta
+            for task in tasks:
+                task.cancel()
+
+        yield {
+            "event": "summary",
+            "queries": len(queries),
+            "runs": len(groups),
+            "errors": errors,
+            "searches": searches.stats()
         }
 
     def visualize(self, output_path: str = "research_agent_graph.png"):
@@ -0,0 +1,323 @@
+"""
+Cache de Resultados - Memória (LRU) + disco (SQLite) com TTL
+"""
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from .states import SearchResult
+from .search import normalize_query
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class LRUStore:
+    """Armazenamento em memória com limite de entradas (LRU) e TTL"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    """
+    Armazenamento persistente em SQLite com TTL e limite de tamanho
+
+    Quando o total armazenado passa de max_bytes, as entradas expiradas são
+    removidas primeiro e depois as menos acessadas recentemente.
+
+    Leituras não escrevem no banco: o horário de acesso dos hits fica
+    pendente em memória e é gravado junto com a próxima escrita (ou a cada
+    access_flush_size hits). Entradas expiradas são apagadas no próximo _evict().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 100 * 1024 * 1024,
+        table: str = "cache",
+        access_flush_size: int = 256
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        self.access_flush_size = access_flush_size
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                return None
+
+            self._accessed[key] = now
+            if len(self._accessed) >= self.access_flush_size:
+                self._flush_accessed()
+                self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), expires_at, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _flush_accessed(self):
+        """Grava os horários de acesso pendentes (sem commit)"""
+        if not self._accessed:
+            return
+        self._conn.executemany(
+            f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+        )
+        self._accessed.clear()
+
+    def _evict(self):
+        """Remove expirados e, se preciso, as entradas menos usadas até caber em max_bytes"""
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC"
+        ).fetchall()
+        to_delete = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", to_delete)
+
+    def clear(self):
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
+
+
+class TieredCache:
+    """
+    Cache em duas camadas: LRU em memória na frente de um SQLite persistente
+
+    Thread-safe, pode ser compartilhado entre vários agentes do mesmo processo.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = 24 * 60 * 60,
+        max_memory_entries: int = 1024,
+        max_disk_bytes: int = 100 * 1024 * 1024,
+        table: str = "cache"
+    ):
+        """
+        Args:
+            path: Arquivo SQLite (None = apenas memória)
+            ttl: Tempo de vida de cada entrada em segundos (None = sem expiração)
+            max_memory_entries: Máximo de entradas na camada em memória
+            max_disk_bytes: Tamanho máximo dos valores armazenados em disco
+            table: Tabela SQLite usada por este cache
+        """
+        self.ttl = ttl
+        self.memory = LRUStore(max_entries=max_memory_entries)
+        self.disk = SQLiteStore(path, max_bytes=max_disk_bytes, table=table) if path else None
+        # Com a camada SQLite, get()/set() fazem I/O bloqueante (o caminho assíncrono usa uma thread)
+        self.blocking = self.disk is not None
+
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                # Promove para a memória
+                self.memory.set(key, value, self._expires_at())
+                self._count("disk_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: str):
+        expires_at = self._expires_at()
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            self.disk.set(key, value, expires_at)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de hits/misses"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self.memory)
+            }
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class SearchCache(TieredCache):
+    """Cache de resultados de busca, chaveado por query normalizada + parâmetros"""
+
+    def __init__(self, path: Optional[str] = None, **kwargs):
+        kwargs.setdefault("table", "search_cache")
+        super().__init__(path, **kwargs)
+
+    @staticmethod
+    def make_key(query: str, search_depth: str, max_results: int) -> str:
+        raw = f"{normalize_query(query)}|{search_depth}|{max_results}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_results(self, query: str, search_depth: str, max_results: int) -> Optional[List[SearchResult]]:
+        """Retorna os resultados em cache (None em caso de miss)"""
+        value = self.get(self.make_key(query, search_depth, max_results))
+        if value is None:
+            return None
+        return [SearchResult(**item) for item in json.loads(value)]
+
+    def set_results(self, query: str, search_depth: str, max_results: int, results: List[SearchResult]):
+        """Armazena os resultados de uma query"""
+        value = json.dumps([r.model_dump() for r in results], ensure_ascii=False)
+        self.set(self.make_key(query, search_depth, max_results), value)
+
+
+class LLMCache(TieredCache):
+    """
+    Cache exato de respostas do LLM (opt-in)
+
+    Chaveado por modelo, temperatura e hash da lista completa de mensagens.
+    Sem path o armazenamento é só em memória; com path, um SQLite local fica
+    atrás do LRU. Mantém contadores de hits/misses por nó do grafo.
+    """
+
+    def __init__(self, path: Optional[str] = None, **kwargs):
+        kwargs.setdefault("table", "llm_cache")
+        kwargs.setdefault("ttl", None)
+        super().__init__(path, **kwargs)
+        self._node_stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(model: str, temperature: Optional[float], messages: List[Any]) -> str:
+        payload = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "messages": [[m.type, m.content] for m in messages]
+            },
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, node: str, key: str) -> Optional[str]:
+        """Busca uma resposta em cache, contabilizando para o nó"""
+        value = self.get(key)
+        with self._lock:
+            counters = self._node_stats.setdefault(node, {"hits": 0, "misses": 0})
+            counters["hits" if value is not None else "misses"] += 1
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats["nodes"] = {
+                node: {
+                    **counters,
+                    "hit_rate": counters["hits"] / (counters["hits"] + counters["misses"])
+                }
+                for node, counters in self._node_stats.items()
+            }
+        return stats
@@ -0,0 +1,73 @@
+"""
+Checkpoints - Persistência do estado do grafo em SQLite para retomar execuções
+"""
+from typing import AsyncIterator
+from contextlib import asynccontextmanager
+from .states import SearchResult, SourceHandle, ValidationResult
+from .sources import SQLiteSourceStore
+import os
+import sqlite3
+
+
+# Tipos do estado gravados nos checkpoints (liberados na desserialização msgpack)
+STATE_TYPES = [(cls.__module__, cls.__name__) for cls in (SearchResult, SourceHandle, ValidationResult)]
+
+
+def _serializer():
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=STATE_TYPES)
+    except TypeError:
+        # Versões antigas do langgraph-checkpoint não restringem os tipos
+        return JsonPlusSerializer()
+
+
+class SQLiteCheckpoints:
+    """
+    Checkpointers SQLite do LangGraph (síncrono e assíncrono) sobre o mesmo arquivo
+
+    O estado é gravado após cada nó, com um thread_id por execução. Uma
+    execução interrompida pode ser retomada a partir do último nó concluído,
+    e o estado de uma execução finalizada pode ser lido sem reexecutar nada.
+
+    Requer o pacote opcional langgraph-checkpoint-sqlite (importado apenas
+    quando o checkpointing é ativado).
+    """
+
+    def __init__(self, path: str):
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError as e:
+            raise ImportError(
+                "Checkpointing requer o pacote langgraph-checkpoint-sqlite "
+                "(pip install langgraph-checkpoint-sqlite)"
+            ) from e
+
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.serde = _serializer()
+        self.saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False), serde=self.serde)
+        SQLiteSourceStore.setup(self.saver.conn)
+
+    def sources(self, thread_id: str) -> SQLiteSourceStore:
+        """Repositório de fontes de um thread, no mesmo arquivo dos checkpoints"""
+        return SQLiteSourceStore(self.saver.conn, thread_id, lock=getattr(self.saver, "lock", None))
+
+    @asynccontextmanager
+    async def asaver(self) -> AsyncIterator:
+        """
+        Checkpointer assíncrono para uma execução
+
+        A conexão aiosqlite é aberta e fechada por execução: ela fica presa a
+        uma thread própria e não deve sobreviver ao event loop que a usou.
+        """
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        import aiosqlite
+
+        async with aiosqlite.connect(self.path) as conn:
+            yield AsyncSqliteSaver(conn, serde=self.serde)
+
+    def close(self):
+        self.saver.conn.close()
@@ -0,0 +1,164 @@
+"""
+Empacotamento de Contexto - Seleciona os trechos mais relevantes dentro de um orçamento de tokens
+"""
+from typing import Dict, List, Optional, Sequence
+from dataclasses import dataclass
+from collections import Counter
+from .states import SearchResult
+import math
+import re
+
+
+# Aproximação de tokens por caractere (suficiente para limitar o tamanho do prompt)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata do número de tokens de um texto"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenização simples para BM25 (palavras com 3+ caracteres, minúsculas)"""
+    return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 2]
+
+
+class BM25:
+    """Ranqueamento BM25 sobre uma coleção de documentos tokenizados"""
+
+    def __init__(self, documents: Sequence[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_freqs = [Counter(doc) for doc in documents]
+        self.doc_lengths = [len(doc) for doc in documents]
+        self.avg_length = sum(self.doc_lengths) / len(documents) if documents else 0.0
+
+        df: Counter = Counter()
+        for freqs in self.doc_freqs:
+            df.update(freqs.keys())
+        self.idf = {term: bm25_idf(len(documents), count) for term, count in df.items()}
+
+    def score(self, query_tokens: Sequence[str], index: int) -> float:
+        freqs = self.doc_freqs[index]
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[index] / (self.avg_length or 1.0))
+        score = 0.0
+        for term in set(query_tokens):
+            tf = freqs.get(term, 0)
+            if tf:
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+
+def bm25_idf(total_docs: int, doc_freq: int) -> float:
+    """IDF do BM25 (variante sempre positiva)"""
+    return math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def chunk_text(text: str, chunk_tokens: int = 200) -> List[str]:
+    """
+    Divide um texto em trechos de até ~chunk_tokens tokens
+
+    Quebra preferencialmente em parágrafos e frases; frases maiores que o
+    limite são cortadas por palavras.
+    """
+    max_chars = chunk_tokens * CHARS_PER_TOKEN
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+|\n\s*\n", text.strip()) if s.strip()]
+
+    chunks: List[str] = []
+    current = ""
+    for sentence in sentences:
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class PackedSource:
+    """Fonte com o texto selecionado para o prompt"""
+    result: SearchResult
+    text: str
+    truncated: bool
+
+
+def pack_context(
+    query: str,
+    results: Sequence[SearchResult],
+    token_budget: Optional[int],
+    chunk_tokens: int = 200,
+    relevance_weight: float = 0.3
+) -> List[PackedSource]:
+    """
+    Seleciona trechos das fontes até preencher o orçamento de tokens
+
+    Cada trecho recebe score = BM25 normalizado contra a pergunta combinado com
+    o relevance_score da fonte. Os trechos são escolhidos gulosamente do maior
+    para o menor score e depois remontados na ordem original de cada fonte.
+
+    Args:
+        query: Pergunta de pesquisa
+        results: Fontes candidatas
+        token_budget: Orçamento de tokens para o conteúdo (None = sem limite)
+        chunk_tokens: Tamanho aproximado de cada trecho
+        relevance_weight: Peso do relevance_score da fonte (0-1)
+
+    Returns:
+        Fontes com ao menos um trecho selecionado, na ordem original
+    """
+    if token_budget is None:
+        return [PackedSource(result=r, text=r.content, truncated=False) for r in results]
+
+    chunks = []  # (índice da fonte, posição do trecho, texto)
+    for source_index, result in enumerate(results):
+        for position, text in enumerate(chunk_text(result.content, chunk_tokens)):
+            chunks.append((source_index, position, text))
+
+    if not chunks:
+        return []
+
+    bm25 = BM25([tokenize(text) for _, _, text in chunks])
+    query_tokens = tokenize(query)
+    lexical = [bm25.score(query_tokens, i) for i in range(len(chunks))]
+    top = max(lexical) or 1.0
+
+    scored = sorted(
+        range(len(chunks)),
+        key=lambda i: (1 - relevance_weight) * lexical[i] / top
+        + relevance_weight * results[chunks[i][0]].relevance_score,
+        reverse=True
+    )
+
+    selected: Dict[int, List[int]] = {}
+    used = 0
+    for i in scored:
+        cost = estimate_tokens(chunks[i][2])
+        if used + cost > token_budget:
+            continue
+        used += cost
+        selected.setdefault(chunks[i][0], []).append(i)
+
+    counts = Counter(source_index for source_index, _, _ in chunks)
+    packed = []
+    for source_index, result in enumerate(results):
+        if source_index not in selected:
+            continue
+        ordered = sorted(selected[source_index], key=lambda i: chunks[i][1])
+        packed.append(PackedSource(
+            result=result,
+            text=" [...] ".join(chunks[i][2] for i in ordered),
+            truncated=len(ordered) < counts[source_index]
+        ))
+    return packed
@@ -0,0 +1,540 @@
+"""
+Corpus Local - Busca BM25 em documentos locais com índice invertido em disco
+
+O índice de um diretório de documentos (.txt, .md, .html...) fica em
+segmentos imutáveis abertos com mmap: abrir um índice existente só lê o
+manifesto, e cada busca lê apenas as listas de postings dos termos da query.
+A reindexação é incremental: arquivos novos ou alterados (mtime/tamanho)
+vão para um segmento novo, os trechos antigos deixam de valer, e os
+segmentos são compactados quando se acumulam.
+"""
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from collections import Counter
+from datetime import datetime
+from html.parser import HTMLParser
+from .context import bm25_idf, chunk_text, tokenize
+from .states import SearchResult
+import asyncio
+import bisect
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+
+# Extensões indexadas (o resto do diretório é ignorado)
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".rst"}
+HTML_EXTENSIONS = {".html", ".htm"}
+
+# Formato do segmento: cabeçalho, léxico ordenado, termos, postings, documentos e textos
+_MAGIC = b"RCX1"
+_HEADER = struct.Struct("<4sIIQQQQQ")  # magic, termos, documentos, offsets das 5 seções
+_LEXICON = struct.Struct("<IIQI")       # offset do termo, tamanho, offset dos postings, df
+_POSTING = struct.Struct("<II")         # documento, frequência do termo
+_DOC = struct.Struct("<QII")            # offset do texto, tamanho do texto, tokens
+
+# Score BM25 que vira relevance_score 0.5 (scores maiores tendem a 1)
+BM25_HALF_SCORE = 5.0
+
+
+class _HTMLText(HTMLParser):
+    """Extrai título e texto visível de um HTML"""
+
+    def __init__(self):
+        super().__init__()
+        self.title = ""
+        self.parts: List[str] = []
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in ("p", "br", "div", "li", "h1", "h2", "h3", "h4", "tr", "section", "article"):
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self.parts.append(data)
+
+
+def extract_text(path: str) -> Tuple[str, str]:
+    """
+    Lê um documento e retorna (título, texto)
+
+    HTML perde as tags (o título vem de <title>); Markdown usa o primeiro
+    cabeçalho como título; nos demais, o título é o nome do arquivo.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    if os.path.splitext(path)[1].lower() in HTML_EXTENSIONS:
+        parser = _HTMLText()
+        parser.feed(raw)
+        text = re.sub(r"[ \t]+", " ", "".join(parser.parts))
+        text = re.sub(r"\s*\n\s*\n\s*", "\n\n", text).strip()
+        return " ".join(parser.title.split()) or name, text
+
+    heading = re.search(r"^#\s+(.+)$", raw, re.MULTILINE)
+    return (heading.group(1).strip() if heading else name), raw.strip()
+
+
+@dataclass
+class CorpusHit:
+    """Trecho encontrado na busca"""
+    path: str
+    chunk: int
+    title: str
+    text: str
+    score: float
+
+
+class _Segment:
+    """Segmento imutável do índice, lido via mmap"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_terms, self.n_docs, self._lex, self._terms, self._post, self._docs, self._text = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            self.close()
+            raise ValueError(f"Segmento de índice inválido: {path}")
+
+    def _term(self, i: int) -> bytes:
+        offset, size, _, _ = _LEXICON.unpack_from(self._mm, self._lex + i * _LEXICON.size)
+        start = self._terms + offset
+        return self._mm[start:start + size]
+
+    def postings(self, term: bytes) -> List[Tuple[int, int]]:
+        """Postings (documento, frequência) do termo (busca binária no léxico)"""
+        low, high = 0, self.n_terms
+        while low < high:
+            mid = (low + high) // 2
+            if self._term(mid) < term:
+                low = mid + 1
+            else:
+                high = mid
+        if low == self.n_terms or self._term(low) != term:
+            return []
+        _, _, offset, df = _LEXICON.unpack_from(self._mm, self._lex + low * _LEXICON.size)
+        start = self._post + offset
+        return list(_POSTING.iter_unpack(self._mm[start:start + df * _POSTING.size]))
+
+    def doc_length(self, doc: int) -> int:
+        return _DOC.unpack_from(self._mm, self._docs + doc * _DOC.size)[2]
+
+    def text(self, doc: int) -> str:
+        offset, size, _ = _DOC.unpack_from(self._mm, self._docs + doc * _DOC.size)
+        start = self._text + offset
+        return self._mm[start:start + size].decode("utf-8")
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+def _write_segment(path: str, docs: List[Tuple[str, List[str]]]):
+    """Grava um segmento com os trechos (texto, tokens) numerados a partir de 0"""
+    postings: Dict[bytes, List[Tuple[int, int]]] = {}
+    for doc, (_, tokens) in enumerate(docs):
+        for term, tf in Counter(tokens).items():
+            postings.setdefault(term.encode("utf-8"), []).append((doc, tf))
+    terms = sorted(postings)
+
+    lexicon, term_blob, post_blob = bytearray(), bytearray(), bytearray()
+    for term in terms:
+        lexicon += _LEXICON.pack(len(term_blob), len(term), len(post_blob), len(postings[term]))
+        term_blob += term
+        for doc, tf in postings[term]:
+            post_blob += _POSTING.pack(doc, tf)
+
+    doc_table, text_blob = bytearray(), bytearray()
+    for text, tokens in docs:
+        encoded = text.encode("utf-8")
+        doc_table += _DOC.pack(len(text_blob), len(encoded), len(tokens))
+        text_blob += encoded
+
+    offsets = [_HEADER.size]
+    for section in (lexicon, term_blob, post_blob, doc_table):
+        offsets.append(offsets[-1] + len(section))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(terms), len(docs), *offsets))
+        for section in (lexicon, term_blob, post_blob, doc_table, text_blob):
+            f.write(section)
+    os.replace(tmp, path)
+
+
+class CorpusIndex:
+    """
+    Índice invertido BM25 de um diretório de documentos
+
+    Cada arquivo vira trechos de ~chunk_tokens tokens (o trecho é o documento
+    do BM25). manifest.json guarda, por arquivo, mtime/tamanho e o intervalo
+    dos seus trechos no segmento onde foram gravados; trechos de arquivos
+    alterados ou removidos continuam nos segmentos antigos, mas deixam de ser
+    retornados. O df dos termos soma todos os segmentos (inclui trechos
+    mortos) até a próxima compactação, que regrava um único segmento quando
+    há mais de max_segments ou mais de max_dead_ratio de trechos mortos.
+
+    Um único processo deve reindexar o diretório por vez; buscas na mesma
+    instância são seguras entre threads.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        index_dir: Optional[str] = None,
+        chunk_tokens: int = 300,
+        max_segments: int = 8,
+        max_dead_ratio: float = 0.3,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        self.root = os.path.abspath(root)
+        self.id = hashlib.sha256(self.root.encode("utf-8")).hexdigest()[:12]
+        self.index_dir = index_dir or os.path.join(".cache", "corpus", self.id)
+        self.chunk_tokens = chunk_tokens
+        self.max_segments = max_segments
+        self.max_dead_ratio = max_dead_ratio
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._manifest = self._load_manifest()
+        self._segments: Dict[str, _Segment] = {}
+        self._live: Dict[str, bytearray] = {}
+        self._ranges: Dict[str, Tuple[List[int], List[str]]] = {}
+
+    @property
+    def generation(self) -> int:
+        """Contador de reindexações que mudaram o índice"""
+        return self._manifest["generation"]
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.index_dir, "manifest.json")
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("chunk_tokens") == self.chunk_tokens:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        # Sem índice (ou com trechos de outro tamanho): começa vazio
+        return {"generation": 0, "chunk_tokens": self.chunk_tokens, "next_segment": 1, "segments": {}, "files": {}}
+
+    def _save_manifest(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False)
+        os.replace(tmp, self._manifest_path())
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Arquivos indexáveis do diretório: caminho relativo → (mtime_ns, tamanho)"""
+        index_dir = os.path.abspath(self.index_dir)
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(
+                d for d in dirnames
+                if not d.startswith(".") and os.path.abspath(os.path.join(dirpath, d)) != index_dir
+            )
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() not in TEXT_EXTENSIONS | HTML_EXTENSIONS:
+                    continue
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                found[os.path.relpath(path, self.root).replace(os.sep, "/")] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def update(self) -> Dict[str, int]:
+        """
+        Reindexa só o que mudou no diretório desde a última atualização
+
+        Returns:
+            Contagem de arquivos added, updated, removed e unchanged, e de
+            trechos novos (chunks)
+        """
+        with self._lock:
+            files = self._manifest["files"]
+            found = self._scan()
+            stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "chunks": 0}
+
+            changed = []
+            for relpath, (mtime, size) in found.items():
+                entry = files.get(relpath)
+                if entry is not None and entry["mtime"] == mtime and entry["size"] == size:
+                    stats["unchanged"] += 1
+                else:
+                    stats["updated" if entry is not None else "added"] += 1
+                    changed.append(relpath)
+            removed = [relpath for relpath in files if relpath not in found]
+            stats["removed"] = len(removed)
+
+            if not changed and not removed:
+                return stats
+
+            for relpath in removed:
+                del files[relpath]
+
+            docs: List[Tuple[str, List[str]]] = []
+            entries = {}
+            for relpath in changed:
+                mtime, size = found[relpath]
+                title, text = extract_text(os.path.join(self.root, relpath))
+                chunks = [(chunk, tokenize(chunk)) for chunk in chunk_text(text, self.chunk_tokens)]
+                entries[relpath] = {
+                    "mtime": mtime, "size": size, "title": title, "first": len(docs),
+                    "chunks": len(chunks), "tokens": sum(len(tokens) for _, tokens in chunks)
+                }
+                docs.extend(chunks)
+            stats["chunks"] = len(docs)
+
+            segment = None
+            if docs:
+                segment = f"seg-{self._manifest['next_segment']:06d}"
+                self._manifest["next_segment"] += 1
+                os.makedirs(self.index_dir, exist_ok=True)
+                _write_segment(os.path.join(self.index_dir, segment + ".idx"), docs)
+                self._manifest["segments"][segment] = {"docs": len(docs)}
+            for relpath, entry in entries.items():
+                files[relpath] = dict(entry, segment=segment if entry["chunks"] else None)
+
+            self._manifest["generation"] += 1
+            self._save_manifest()
+            self._reset_views()
+
+            if self._needs_compaction():
+                self.compact()
+            else:
+                self._drop_empty_segments()
+            return stats
+
+    def _live_docs(self) -> int:
+        return sum(entry["chunks"] for entry in self._manifest["files"].values())
+
+    def _needs_compaction(self) -> bool:
+        segments = self._manifest["segments"]
+        total = sum(info["docs"] for info in segments.values())
+        dead = total - self._live_docs()
+        return len(segments) > self.max_segments or (total > 0 and dead / total > self.max_dead_ratio)
+
+    def compact(self):
+        """Regrava os trechos vivos num único segmento (sem reler os arquivos)"""
+        with self._lock:
+            files = self._manifest["files"]
+            docs: List[Tuple[str, List[str]]] = []
+            for relpath in sorted(files):
+                entry = files[relpath]
+                if not entry["chunks"]:
+                    continue
+                segment = self._segment(entry["segment"])
+                texts = [segment.text(entry["first"] + i) for i in range(entry["chunks"])]
+                entry["first"] = len(docs)
+                docs.extend((text, tokenize(text)) for text in texts)
+
+            old = list(self._manifest["segments"])
+            self._manifest["segments"] = {}
+            if docs:
+                name = f"seg-{self._manifest['next_segment']:06d}"
+                self._manifest["next_segment"] += 1
+                _write_segment(os.path.join(self.index_dir, name + ".idx"), docs)
+                self._manifest["segments"][name] = {"docs": len(docs)}
+                for entry in files.values():
+                    if entry["chunks"]:
+                        entry["segment"] = name
+
+            self._manifest["generation"] += 1
+            self._save_manifest()
+            self.close()
+            for name in old:
+                self._remove_segment(name)
+
+    def _drop_empty_segments(self):
+        """Apaga segmentos sem nenhum trecho vivo"""
+        live = {entry["segment"] for entry in self._manifest["files"].values()}
+        dead = [name for name in self._manifest["segments"] if name not in live]
+        if not dead:
+            return
+        for name in dead:
+            del self._manifest["segments"][name]
+        self._save_manifest()
+        self.close()
+        for name in dead:
+            self._remove_segment(name)
+
+    def _remove_segment(self, name: str):
+        try:
+            os.remove(os.path.join(self.index_dir, name + ".idx"))
+        except FileNotFoundError:
+            pass
+
+    def _reset_views(self):
+        """Descarta as máscaras de trechos vivos (recalculadas sob demanda)"""
+        self._live = {}
+        self._ranges = {}
+
+    def _segment(self, name: str) -> _Segment:
+        segment = self._segments.get(name)
+        if segment is None:
+            segment = self._segments[name] = _Segment(os.path.join(self.index_dir, name + ".idx"))
+        return segment
+
+    def _views(self, name: str) -> Tuple[bytearray, Tuple[List[int], List[str]]]:
+        """Máscara de trechos vivos e intervalos (primeiros trechos, arquivos) do segmento"""
+        if name not in self._live:
+            live = bytearray(self._manifest["segments"][name]["docs"])
+            ranges = []
+            for relpath, entry in self._manifest["files"].items():
+                if entry["segment"] == name:
+                    live[entry["first"]:entry["first"] + entry["chunks"]] = b"\x01" * entry["chunks"]
+                    ranges.append((entry["first"], relpath))
+            ranges.sort()
+            self._live[name] = live
+            self._ranges[name] = ([first for first, _ in ranges], [relpath for _, relpath in ranges])
+        return self._live[name], self._ranges[name]
+
+    def search(self, query: str, limit: int = 3) -> List[CorpusHit]:
+        """Trechos mais relevantes para a query (BM25), do maior para o menor score"""
+        terms = [term.encode("utf-8") for term in set(tokenize(query))]
+        with self._lock:
+            total_docs = self._live_docs()
+            if not total_docs or not terms:
+                return []
+            files = self._manifest["files"]
+            avg_length = sum(entry["tokens"] for entry in files.values()) / total_docs or 1.0
+
+            postings = {name: {term: self._segment(name).postings(term) for term in terms}
+                        for name in self._manifest["segments"]}
+            scores: Dict[Tuple[str, int], float] = {}
+            for term in terms:
+                df = sum(len(by_term[term]) for by_term in postings.values())
+                if not df:
+                    continue
+                idf = bm25_idf(total_docs, min(df, total_docs))
+                for name, by_term in postings.items():
+                    live, _ = self._views(name)
+                    segment = self._segment(name)
+                    for doc, tf in by_term[term]:
+                        if not live[doc]:
+                            continue
+                        norm = self.k1 * (1 - self.b + self.b * segment.doc_length(doc) / avg_length)
+                        scores[(name, doc)] = scores.get((name, doc), 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            hits = []
+            for (name, doc), score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+                _, (starts, paths) = self._views(name)
+                position = bisect.bisect_right(starts, doc) - 1
+                first, relpath = starts[position], paths[position]
+                hits.append(CorpusHit(
+                    path=relpath,
+                    chunk=doc - first,
+                    title=files[relpath]["title"],
+                    text=self._segment(name).text(doc),
+                    score=score
+                ))
+            return hits
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            segments = self._manifest["segments"]
+            return {
+                "files": len(self._manifest["files"]),
+                "chunks": self._live_docs(),
+                "segments": len(segments),
+                "dead_chunks": sum(info["docs"] for info in segments.values()) - self._live_docs(),
+                "generation": self.generation
+            }
+
+    def close(self):
+        """Fecha os segmentos abertos (reabertos sob demanda na próxima busca)"""
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments = {}
+            self._reset_views()
+
+
+class LocalCorpusSearch:
+    """
+    Backend de busca sobre um diretório local de documentos (sem rede e sem LLM)
+
+    Implementa a mesma interface do TavilySearch (ver SearchBackend em
+    src/search.py). Cada resultado é um trecho de arquivo: source é o
+    caminho relativo com o número do trecho, e relevance_score é o score
+    BM25 saturado em 0-1.
+    """
+
+    name = "corpus local"
+
+    def __init__(
+        self,
+        root: str,
+        index_dir: Optional[str] = None,
+        max_results: int = 3,
+        chunk_tokens: int = 300,
+        refresh: bool = True
+    ):
+        """
+        Args:
+            root: Diretório com os documentos
+            index_dir: Onde gravar o índice (padrão: .cache/corpus/<hash do diretório>)
+            max_results: Trechos retornados por query
+            chunk_tokens: Tamanho aproximado de cada trecho indexado
+            refresh: Reindexa (incrementalmente) ao criar o backend
+        """
+        self.index = CorpusIndex(root, index_dir=index_dir, chunk_tokens=chunk_tokens)
+        self.max_results = max_results
+        if refresh:
+            self.refresh()
+
+    @property
+    def search_depth(self) -> str:
+        # Entra na chave do cache de buscas: muda a cada reindexação que altera o índice
+        return f"corpus:{self.index.id}:{self.index.generation}"
+
+    def refresh(self) -> Dict[str, int]:
+        """Reindexa os arquivos novos, alterados e removidos"""
+        stats = self.index.update()
+        print(f"📚 Corpus local: {stats['added']} novos, {stats['updated']} alterados, "
+              f"{stats['removed']} removidos, {stats['unchanged']} sem mudança")
+        return stats
+
+    def search(self, query: str) -> List[SearchResult]:
+        """Executa uma busca no índice"""
+        timestamp = datetime.now().isoformat()
+        return [
+            SearchResult(
+                source=f"{hit.path}#{hit.chunk + 1}",
+                title=hit.title,
+                content=hit.text,
+                relevance_score=round(hit.score / (hit.score + BM25_HALF_SCORE), 3),
+                timestamp=timestamp
+            )
+            for hit in self.index.search(query, self.max_results)
+        ]
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        """Executa uma busca numa thread (leituras do mmap não bloqueiam o event loop)"""
+        return await asyncio.to_thread(self.search, query)
+
+    def close(self):
+        self.index.close()
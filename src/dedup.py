@@ -0,0 +1,170 @@
+"""
+Deduplicação de Resultados - URLs canônicas e conteúdo quase duplicado (SimHash)
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from .states import SearchResult
+import hashlib
+import re
+
+
+# Parâmetros de rastreamento que não mudam o conteúdo da página
+TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "ref", "ref_src", "mc_cid", "mc_eid", "igshid"}
+
+# Mínimo de palavras para comparar por SimHash (textos curtos só por igualdade)
+MIN_SIMHASH_TOKENS = 8
+
+
+@dataclass
+class DedupStats:
+    """Contadores da deduplicação"""
+    total: int = 0
+    kept: int = 0
+    url_duplicates: int = 0
+    near_duplicates: int = 0
+
+
+class Fingerprint(NamedTuple):
+    """Assinatura de conteúdo usada na comparação de quase duplicatas"""
+    simhash: Optional[int]
+    text_key: str  # Hash do texto normalizado (igualdade para textos curtos)
+
+
+@lru_cache(maxsize=4096)
+def canonicalize_url(url: str) -> str:
+    """
+    Normaliza uma URL para comparação
+
+    Coloca esquema/host em minúsculas, remove "www.", fragmento, barra final
+    e parâmetros de rastreamento (utm_*, fbclid...), e ordena a query string.
+    Fontes que não são URLs são apenas normalizadas em caixa e espaços.
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        return url.lower()
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or ""
+
+    return urlunsplit((parts.scheme.lower(), host, path, urlencode(query), ""))
+
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def simhash(text: str, shingle_size: int = 3) -> Optional[int]:
+    """
+    Fingerprint SimHash de 64 bits sobre shingles de palavras
+
+    Returns:
+        Fingerprint, ou None se o texto for curto demais para comparação
+    """
+    tokens = _tokens(text)
+    if len(tokens) < MIN_SIMHASH_TOKENS:
+        return None
+
+    weights = [0] * 64
+    shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def content_fingerprint(text: str) -> Fingerprint:
+    """SimHash e chave de texto de um conteúdo (a parte cara da deduplicação)"""
+    normalized = " ".join(_tokens(text))
+    text_key = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest() if normalized else ""
+    return Fingerprint(simhash(text), text_key)
+
+
+class _Entry:
+    """Resultado mantido, com seus fingerprints"""
+
+    __slots__ = ("result", "url", "fingerprint", "text_key", "existing")
+
+    def __init__(self, result: Any, fingerprint: Fingerprint, existing: bool):
+        self.result = result
+        self.url = canonicalize_url(result.source)
+        self.fingerprint, self.text_key = fingerprint
+        self.existing = existing
+
+    def is_near_duplicate(self, other: "_Entry", threshold: int) -> bool:
+        if self.fingerprint is not None and other.fingerprint is not None:
+            return hamming_distance(self.fingerprint, other.fingerprint) <= threshold
+        return bool(self.text_key) and self.text_key == other.text_key
+
+
+def deduplicate_results(
+    results: Sequence[SearchResult],
+    existing: Sequence[Any] = (),
+    threshold: int = 8,
+    fingerprint: Optional[Callable[[Any], Fingerprint]] = None
+) -> Tuple[List[Any], DedupStats]:
+    """
+    Remove resultados duplicados (mesma URL canônica ou conteúdo quase igual)
+
+    Duplicatas são fundidas mantendo o maior relevance_score. Resultados já
+    presentes em `existing` não são devolvidos de novo, a não ser que uma
+    duplicata melhore o score: nesse caso a versão atualizada é devolvida com
+    a mesma fonte, para substituir a anterior no estado.
+
+    Args:
+        results: Resultados novos
+        existing: Resultados já presentes no estado
+        threshold: Distância de Hamming máxima entre SimHashes para considerar quase duplicado
+        fingerprint: Obtém o Fingerprint de um item (padrão: calcula de result.content).
+            Permite passar em `existing` handles sem conteúdo, com fingerprints em cache
+            (SourceStore.fingerprint); itens existentes atualizados voltam com o mesmo tipo
+
+    Returns:
+        Tupla (resultados únicos/atualizados, estatísticas)
+    """
+    fingerprint = fingerprint or (lambda r: content_fingerprint(r.content))
+    stats = DedupStats(total=len(results))
+    entries = [_Entry(r, fingerprint(r), existing=True) for r in existing]
+    by_url: Dict[str, _Entry] = {e.url: e for e in entries}
+    updated: Dict[int, _Entry] = {}
+
+    for result in results:
+        candidate = _Entry(result, fingerprint(result), existing=False)
+
+        match = by_url.get(candidate.url)
+        if match is not None:
+            stats.url_duplicates += 1
+        else:
+            match = next((e for e in entries if candidate.is_near_duplicate(e, threshold)), None)
+            if match is not None:
+                stats.near_duplicates += 1
+
+        if match is None:
+            entries.append(candidate)
+            by_url[candidate.url] = candidate
+            continue
+
+        # Funde na entrada existente mantendo o melhor score
+        if candidate.result.relevance_score > match.result.relevance_score:
+            match.result = match.result.model_copy(update={"relevance_score": candidate.result.relevance_score})
+            if match.existing:
+                updated[id(match)] = match
+
+    unique = [e.result for e in entries if not e.existing or id(e) in updated]
+    stats.kept = sum(1 for e in entries if not e.existing)
+    return unique, stats
@@ -0,0 +1,102 @@
+"""
+Controle de Iterações - Orçamento e parada antecipada por ganho marginal de informação
+"""
+from typing import Any, Dict, Optional, Sequence, Tuple
+from dataclasses import dataclass
+from .states import ValidationResult
+
+
+@dataclass
+class IterationPolicy:
+    """
+    Critérios do laço de pesquisa (validate → refine → search)
+
+    Uma iteração extra só acontece dentro do orçamento (max_iterations) e se
+    ainda houver motivo: conflitos ou menos de min_validations afirmações.
+    Depois de uma iteração de refinamento, o laço para cedo se ela rendeu
+    pouco: nenhuma fonte nova, fontes majoritariamente duplicadas, ou poucas
+    afirmações novas sem mudança relevante de confiança.
+    """
+    min_validations: int = 3
+    min_new_claims: int = 1
+    min_confidence_gain: float = 0.05
+    max_duplicate_ratio: float = 0.8
+
+
+def average_confidence(validations: Sequence[ValidationResult]) -> float:
+    return sum(v.confidence for v in validations) / len(validations) if validations else 0.0
+
+
+def iteration_record(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Métricas da rodada que acabou de ser validada
+
+    Os deltas são calculados contra o registro da rodada anterior
+    (state["iteration_metrics"]); a primeira rodada parte do zero.
+    """
+    previous = (state.get("iteration_metrics") or [{}])[-1]
+    validations = state.get("validations", [])
+    search = state.get("latest_search") or {}
+
+    fetched = search.get("fetched", 0)
+    new_sources = search.get("new", 0)
+    confidence = average_confidence(validations)
+
+    return {
+        "iteration": state.get("current_iteration", 0),
+        "queries": search.get("queries", 0),
+        "fetched_sources": fetched,
+        "new_sources": new_sources,
+        "duplicate_ratio": round(1 - new_sources / fetched, 3) if fetched else 1.0,
+        "claims": len(validations),
+        "new_claims": len(validations) - previous.get("claims", 0),
+        "confidence": round(confidence, 3),
+        "confidence_delta": round(confidence - previous.get("confidence", 0.0), 3),
+        "conflicts": bool(state.get("conflicts_detected", False))
+    }
+
+
+def decide(record: Dict[str, Any], max_iterations: int, policy: IterationPolicy) -> Tuple[bool, str]:
+    """
+    Decide se vale fazer mais uma iteração
+
+    Returns:
+        Tupla (continuar, motivo)
+    """
+    if record["iteration"] > 0:
+        if record["new_sources"] == 0:
+            return False, "nenhuma fonte nova na última iteração"
+        if record["duplicate_ratio"] >= policy.max_duplicate_ratio:
+            return False, f"{record['duplicate_ratio']:.0%} das fontes eram duplicadas"
+        if (record["new_claims"] < policy.min_new_claims
+                and abs(record["confidence_delta"]) < policy.min_confidence_gain):
+            return False, "ganho marginal baixo (poucas afirmações novas e confiança estável)"
+
+    if record["iteration"] >= max_iterations:
+        return False, "orçamento de iterações esgotado"
+    if record["conflicts"]:
+        return True, "conflitos detectados"
+    if record["claims"] < policy.min_validations:
+        return True, f"apenas {record['claims']} afirmações validadas"
+    return False, "informações suficientes"
+
+
+def assess_iteration(state: Dict[str, Any], policy: Optional[IterationPolicy] = None) -> Dict[str, Any]:
+    """
+    Registro completo da decisão (métricas da rodada + decisão e motivo)
+    """
+    policy = policy or IterationPolicy()
+    record = iteration_record(state)
+    more, reason = decide(record, state.get("max_iterations", 1), policy)
+    record["decision"] = "research_more" if more else "synthesize"
+    record["reason"] = reason
+    return record
+
+
+def describe(record: Dict[str, Any]) -> str:
+    """Resumo de uma linha da decisão (para o log de mensagens)"""
+    return (
+        f"  📈 Iteração {record['iteration']}: {record['new_sources']}/{record['fetched_sources']} fontes novas, "
+        f"{record['new_claims']:+d} afirmações, confiança {record['confidence']:.0%} "
+        f"({record['confidence_delta']:+.0%})"
+    )
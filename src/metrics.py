@@ -0,0 +1,363 @@
+"""
+Métricas - Instrumentação por nó e por chamada externa (LLM, busca) via callbacks
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.callbacks.manager import adispatch_custom_event, dispatch_custom_event
+import bisect
+import threading
+import time
+
+
+# Buckets padrão de latência (segundos)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Preço por milhão de tokens (entrada, saída) em USD, para estimar custo
+MODEL_PRICES = {
+    "claude-3-haiku-20240307": (0.25, 1.25),
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00),
+    "claude-3-opus-20240229": (15.00, 75.00),
+}
+
+# Eventos customizados emitidos pelos nós
+SEARCH_EVENT = "search_call"
+LLM_CACHE_EVENT = "llm_cache"
+RETRY_EVENT = "call_retry"
+
+# Provedores de LLM (as novas tentativas dos demais contam como de busca)
+LLM_PROVIDERS = {"anthropic"}
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Custo estimado em USD (0 para modelos sem preço conhecido)"""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Counter:
+    """Contador monotônico com labels"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    """Histograma cumulativo com labels (formato Prometheus)"""
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = _label_key(labels)
+        with self._lock:
+            # [contagem por bucket..., +Inf, soma]
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(_label_key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', le),))} {cumulative:g}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registro das métricas do agente
+
+    Compartilhado por todas as execuções de um processo e exportado no
+    formato texto do Prometheus por render().
+    """
+
+    def __init__(self):
+        self.runs = Counter("research_runs_total", "Execuções do grafo por status")
+        self.run_duration = Histogram("research_run_duration_seconds", "Duração total de cada execução")
+        self.node_duration = Histogram("research_node_duration_seconds", "Tempo de parede por nó do grafo")
+        self.node_errors = Counter("research_node_errors_total", "Nós que terminaram com exceção")
+        self.llm_duration = Histogram("research_llm_call_duration_seconds", "Duração das chamadas ao LLM")
+        self.llm_tokens = Counter("research_llm_tokens_total", "Tokens do LLM por nó e direção")
+        self.llm_cost = Counter("research_llm_cost_usd_total", "Custo estimado do LLM em USD")
+        self.llm_errors = Counter("research_llm_errors_total", "Chamadas ao LLM que falharam")
+        self.llm_retries = Counter("research_llm_retries_total", "Novas tentativas de chamadas ao LLM")
+        self.search_retries = Counter("research_search_retries_total", "Novas tentativas de buscas web")
+        self.llm_cache = Counter("research_llm_cache_total", "Consultas ao cache do LLM por resultado")
+        self.search_duration = Histogram("research_search_duration_seconds", "Duração das buscas web")
+        self.searches = Counter("research_search_total", "Buscas web por resultado (ok, error, cached)")
+
+    def metrics(self) -> List[Any]:
+        return [value for value in vars(self).values() if isinstance(value, (Counter, Histogram))]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RunTimings:
+    """Resumo de tempos, tokens e chamadas de uma execução"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.nodes: Dict[str, Dict[str, float]] = {}
+        self.llm = {"calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0,
+                    "cost_usd": 0.0, "errors": 0, "retries": 0, "cache_hits": 0}
+        self.search = {"calls": 0, "seconds": 0.0, "cached": 0, "errors": 0, "retries": 0}
+
+    def add_node(self, node: str, seconds: float):
+        stats = self.nodes.setdefault(node, {"calls": 0, "seconds": 0.0})
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        def rounded(stats):
+            return {k: round(v, 6) if isinstance(v, float) else v for k, v in stats.items()}
+
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "nodes": {node: rounded(stats) for node, stats in self.nodes.items()},
+            "llm": rounded(self.llm),
+            "search": rounded(self.search)
+        }
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Coleta métricas de uma execução do grafo a partir dos callbacks do LangChain
+
+    Nós: início/fim das runs marcadas com "graph:step:N". LLM: início/fim das
+    chamadas de chat (tokens de usage_metadata). Buscas e cache do LLM:
+    eventos customizados emitidos pelos nós (ver emit_event). Novas
+    tentativas: eventos do hook do limitador de taxa (ver record_retry). Um
+    handler por execução, alimentando o registro compartilhado.
+    """
+
+    run_inline = True
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry
+        self.timings = RunTimings()
+        self._nodes: Dict[UUID, Tuple[str, float]] = {}
+        self._llm_calls: Dict[UUID, Tuple[str, str, float]] = {}
+        self._lock = threading.Lock()
+
+    # Nós do grafo
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, tags=None, metadata=None, **kwargs):
+        if any(tag.startswith("graph:step:") for tag in tags or []):
+            node = (metadata or {}).get("langgraph_node") or kwargs.get("name", "")
+            self._nodes[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._end_node(run_id, error=False)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        self._end_node(run_id, error=True)
+
+    def _end_node(self, run_id: UUID, error: bool):
+        started = self._nodes.pop(run_id, None)
+        if started is None:
+            return
+        node, start = started
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.timings.add_node(node, elapsed)
+        if self.registry:
+            self.registry.node_duration.observe(elapsed, node=node)
+            if error:
+                self.registry.node_errors.inc(node=node)
+
+    # Chamadas ao LLM
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        self._start_llm(run_id, metadata, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs):
+        self._start_llm(run_id, metadata, kwargs)
+
+    def _start_llm(self, run_id: UUID, metadata: Optional[dict], kwargs: dict):
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        model = metadata.get("ls_model_name") or params.get("model") or params.get("model_name") or ""
+        self._llm_calls[run_id] = (metadata.get("langgraph_node", ""), model, time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        started = self._llm_calls.pop(run_id, None)
+        if started is None:
+            return
+        node, model, start = started
+        elapsed = time.perf_counter() - start
+        input_tokens, output_tokens = self._usage(response)
+        cost = estimate_cost(model, input_tokens, output_tokens)
+
+        with self._lock:
+            llm = self.timings.llm
+            llm["calls"] += 1
+            llm["seconds"] += elapsed
+            llm["input_tokens"] += input_tokens
+            llm["output_tokens"] += output_tokens
+            llm["cost_usd"] += cost
+
+        if self.registry:
+            self.registry.llm_duration.observe(elapsed, node=node, model=model)
+            self.registry.llm_tokens.inc(input_tokens, node=node, direction="input")
+            self.registry.llm_tokens.inc(output_tokens, node=node, direction="output")
+            self.registry.llm_cost.inc(cost, node=node, model=model)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        started = self._llm_calls.pop(run_id, None)
+        node = started[0] if started else ""
+        with self._lock:
+            self.timings.llm["errors"] += 1
+        if self.registry:
+            self.registry.llm_errors.inc(node=node, error=type(error).__name__)
+
+    def on_retry(self, retry_state, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self.timings.llm["retries"] += 1
+        if self.registry:
+            self.registry.llm_retries.inc()
+
+    @staticmethod
+    def _usage(response) -> Tuple[int, int]:
+        """Tokens de entrada e saída de um LLMResult"""
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        if not input_tokens and not output_tokens:
+            usage = (response.llm_output or {}).get("usage") or {}
+            input_tokens = usage.get("input_tokens", 0)
+            output_tokens = usage.get("output_tokens", 0)
+        return input_tokens, output_tokens
+
+    # Eventos customizados (buscas e cache do LLM)
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node", "")
+        if name == SEARCH_EVENT:
+            self._record_search(data)
+        elif name == LLM_CACHE_EVENT:
+            with self._lock:
+                self.timings.llm["cache_hits"] += data["hits"]
+            if self.registry:
+                self.registry.llm_cache.inc(data["hits"], node=node, result="hit")
+                self.registry.llm_cache.inc(data["misses"], node=node, result="miss")
+        elif name == RETRY_EVENT:
+            self._record_retry(data, node)
+
+    def _record_retry(self, data: Dict[str, Any], node: str):
+        llm = data["provider"] in LLM_PROVIDERS
+        with self._lock:
+            (self.timings.llm if llm else self.timings.search)["retries"] += 1
+        if self.registry:
+            counter = self.registry.llm_retries if llm else self.registry.search_retries
+            counter.inc(node=node, error=data["error"])
+
+    def _record_search(self, data: Dict[str, Any]):
+        for outcome in data["outcomes"]:
+            result = "error" if outcome["error"] else "cached" if outcome["cached"] else "ok"
+            with self._lock:
+                search = self.timings.search
+                search["calls"] += 1
+                search["seconds"] += outcome["elapsed"]
+                search["cached"] += result == "cached"
+                search["errors"] += result == "error"
+            if self.registry:
+                self.registry.searches.inc(result=result)
+                if result != "cached":
+                    self.registry.search_duration.observe(outcome["elapsed"])
+
+    def finish(self, status: str) -> Dict[str, Any]:
+        """Fecha a execução: registra duração/status e retorna o resumo de tempos"""
+        summary = self.timings.summary()
+        if self.registry:
+            self.registry.runs.inc(status=status)
+            self.registry.run_duration.observe(summary["total_seconds"])
+        return summary
+
+
+def emit_event(name: str, data: Dict[str, Any], config: Optional[dict]):
+    """Emite um evento customizado para os callbacks da execução (ignorado fora do grafo)"""
+    if not config or not config.get("callbacks"):
+        return
+    try:
+        dispatch_custom_event(name, data, config=config)
+    except RuntimeError:
+        # Fora de uma run (sem parent_run_id): não há quem registre o evento
+        pass
+
+
+def record_retry(provider: str, error: Exception):
+    """
+    Hook de novas tentativas do limitador de taxa (RateLimiter.set_retry_hook)
+
+    Roda dentro da chamada que falhou, então o evento vai para a execução e
+    o nó correntes (config do contexto); fora de uma execução, é ignorado.
+    """
+    try:
+        dispatch_custom_event(RETRY_EVENT, {"provider": provider, "error": type(error).__name__})
+    except RuntimeError:
+        pass
+
+
+async def aemit_event(name: str, data: Dict[str, Any], config: Optional[dict]):
+    """Versão assíncrona de emit_event()"""
+    if not config or not config.get("callbacks"):
+        return
+    try:
+        await adispatch_custom_event(name, data, config=config)
+    except RuntimeError:
+        pass
@@ -1,50 +1,432 @@
 """
 Nós do Grafo - Implementação da lógica de cada etapa
 """
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
 from datetime import datetime
-from .states import ResearchState, SearchResult, ValidationResult
+from .states import ResearchState, SearchResult, SourceHandle, ValidationResult, claim_key
+from .cache import LLMCache, SearchCache
+from .context import PackedSource, estimate_tokens, pack_context
+from .dedup import DedupStats, deduplicate_results
+# clean_json_string continua disponível em src.nodes por compatibilidade
+from .validation import (
+    ValidationReport, ValidationStreamParser, clean_json_string, parse_validation, reduce_shard_validations, shard
+)
+from .pool import ClientBundle, ClientPool
+from .search import QueryOutcome, SearchBackend, TavilySearch, asearch_many, pending_queries, search_many
+from .sources import SourceStore
+from .iteration import IterationPolicy, assess_iteration, describe
+from .routing import ModelSpec, RoutingProfile, build_route, primary_model, resolve_profile
+from .ratelimit import ProviderLimiter, RateLimiter, shared_rate_limiter
+from .metrics import LLM_CACHE_EVENT, SEARCH_EVENT, aemit_event, emit_event
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import get_executor_for_config
+from langgraph.config import get_stream_writer
+import asyncio
+import hashlib
 import json
 import os
-import re
+import time
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
 load_dotenv()
 
+T = TypeVar("T")
 
-def clean_json_string(json_str: str) -> str:
-    """
-    Limpa string JSON removendo caracteres de controle inválidos
-    """
-    # Remove caracteres de controle (exceto \n, \r, \t que são válidos quando escapados)
-    # Remove controle characters ASCII (0-31) exceto os permitidos
-    cleaned = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', json_str)
-    return cleaned
+
+def _stream_writer():
+    """Writer do stream "custom" do grafo (no-op fora de uma execução)"""
+    try:
+        return get_stream_writer()
+    except (RuntimeError, KeyError):
+        return lambda _: None
 
 
 class ResearchNodes:
     """Implementação de todos os nós do grafo de pesquisa"""
 
-    def __init__(self, api_key: Optional[str] = None, tavily_api_key: Optional[str] = None):
-        """Inicializa os nós com as APIs necessárias"""
-        self.llm = ChatAnthropic(
-            model="claude-3-haiku-20240307",
-            api_key=api_key or os.getenv("ANTHROPIC_API_KEY"),
-            temperature=0.3
-        )
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        tavily_api_key: Optional[str] = None,
+        search_concurrency: int = 5,
+        search_depth: str = "basic",
+        max_results: int = 3,
+        simulation_concurrency: int = 5,
+        search_cache: Optional[SearchCache] = None,
+        llm_cache: Optional[LLMCache] = None,
+        near_duplicate_threshold: int = 8,
+        incremental_validation: bool = True,
+        validation_token_budget: Optional[int] = 6000,
+        synthesis_token_budget: Optional[int] = 4000,
+        context_chunk_tokens: int = 200,
+        validation_shard_size: Optional[int] = 8,
+        validation_concurrency: int = 4,
+        client_pool: Optional[ClientPool] = None,
+        iteration_policy: Optional[IterationPolicy] = None,
+        routing: Union[str, RoutingProfile, None] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        structured_validation: bool = True,
+        search_backend: Optional[SearchBackend] = None,
+        llm: Optional[Any] = None
+    ):
+        """
+        Inicializa os nós com as APIs necessárias
+
+        Args:
+            api_key: API key da Anthropic
+            tavily_api_key: API key do Tavily
+            search_concurrency: Máximo de buscas simultâneas no search_web
+            search_depth: Profundidade de busca do Tavily ("basic" ou "advanced")
+            max_results: Resultados por query no Tavily
+            simulation_concurrency: Máximo de chamadas simultâneas na simulação de busca
+            search_cache: Cache de resultados de busca (pode ser compartilhado entre agentes)
+            llm_cache: Cache de respostas do LLM (opt-in)
+            near_duplicate_threshold: Distância máxima de SimHash para considerar conteúdos quase duplicados
+            incremental_validation: Valida apenas resultados novos a cada iteração
+            validation_token_budget: Orçamento de tokens das fontes no prompt de validação (None = sem limite)
+            synthesis_token_budget: Orçamento de tokens das fontes no prompt de síntese (None = sem limite)
+            context_chunk_tokens: Tamanho aproximado dos trechos usados no empacotamento
+            validation_shard_size: Resultados por fragmento na validação map-reduce (None = chamada única)
+            validation_concurrency: Máximo de fragmentos validados simultaneamente
+            client_pool: Pool de clientes por credencial (permite credenciais por execução)
+            iteration_policy: Critérios de parada do laço de pesquisa (ver src/iteration.py)
+            routing: Perfil de roteamento (nome ou RoutingProfile) com um modelo por nó;
+                None usa o mesmo modelo em todos os nós (ver src/routing.py)
+            rate_limiter: Limites de taxa e novas tentativas por provedor/API key
+                (padrão: o limitador compartilhado do processo, ver src/ratelimit.py)
+            structured_validation: Valida pela tool ValidationReport (saída estruturada)
+                quando o modelo suporta tool calling
+            search_backend: Backend de busca usado em todas as execuções no lugar do
+                Tavily (ex.: LocalCorpusSearch, ver src/corpus.py)
+            llm: Modelo de chat das credenciais padrão no lugar do ChatAnthropic, usado em
+                todos os nós mesmo com perfil de roteamento (ex.: o modelo falso dos benchmarks)
+        """
+        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        self.rate_limiter = rate_limiter if rate_limiter is not None else shared_rate_limiter()
+        self.llm = llm if llm is not None else self._build_llm(self.api_key)
+        # Modelo injetado: os perfis de roteamento não criam clientes Anthropic
+        self._fixed_llm = llm is not None
+        self.routing = resolve_profile(routing)
+        # Modelos roteados das credenciais padrão (um cliente por rota)
+        self._routed_models: Dict[Any, Any] = {}
 
         # Para busca web, vamos usar Tavily (você pode substituir por outra API)
         self.tavily_key = tavily_api_key or os.getenv("TAVILY_API_KEY")
+        self.search_concurrency = search_concurrency
+        self.search_depth = search_depth
+        self.max_results = max_results
+        self.simulation_concurrency = simulation_concurrency
+        self.search_cache = search_cache
+        self.llm_cache = llm_cache
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.incremental_validation = incremental_validation
+        self.validation_token_budget = validation_token_budget
+        self.synthesis_token_budget = synthesis_token_budget
+        self.context_chunk_tokens = context_chunk_tokens
+        self.validation_shard_size = validation_shard_size
+        self.validation_concurrency = validation_concurrency
+        self.structured_validation = structured_validation
+        self.client_pool = client_pool if client_pool is not None else ClientPool()
+        self.iteration_policy = iteration_policy or IterationPolicy()
+
+        # Repositório de fontes usado quando o nó roda sem um por execução
+        # (ResearchAgent passa o da execução em config["configurable"]["sources"])
+        self.sources = SourceStore()
+
+        # Backend fixo (ex.: corpus local) ou cliente Tavily criado sob demanda e reutilizado
+        self.search_backend = search_backend
+        self._search_client: Optional[TavilySearch] = None
+        self._tavily_available = self._tavily_key_configured()
+
+    def _tavily_key_configured(self) -> bool:
+        """Verifica se há uma key Tavily válida configurada"""
+        return bool(self.tavily_key) and self.tavily_key != "sua-chave-tavily-aqui"
+
+    @staticmethod
+    def _build_llm(api_key: Optional[str]) -> ChatAnthropic:
+        """Cria o cliente do modelo de linguagem"""
+        return ChatAnthropic(
+            model="claude-3-haiku-20240307",
+            api_key=api_key,
+            temperature=0.3,
+            max_retries=0  # Novas tentativas ficam no limitador (respeitam o limite de taxa)
+        )
+
+    @staticmethod
+    def _build_model(spec: ModelSpec, api_key: Optional[str]) -> ChatAnthropic:
+        """Cria o cliente de um modelo de perfil de roteamento"""
+        return ChatAnthropic(
+            model=spec.model,
+            api_key=api_key,
+            temperature=spec.temperature,
+            default_request_timeout=spec.timeout,
+            max_retries=spec.max_retries
+        )
+
+    def _build_search_client(self, tavily_key: Optional[str]) -> Optional[TavilySearch]:
+        """Cria o cliente Tavily (None se não configurado ou não instalado)"""
+        if not tavily_key or tavily_key == "sua-chave-tavily-aqui":
+            return None
+        try:
+            return TavilySearch(
+                api_key=tavily_key,
+                search_depth=self.search_depth,
+                max_results=self.max_results,
+                limiter=self.rate_limiter.limiter("tavily", tavily_key)
+            )
+        except ImportError:
+            return None
 
-    def plan_research(self, state: ResearchState) -> Dict[str, Any]:
+    def register_credentials(self, api_key: str, tavily_api_key: Optional[str] = None, pin: bool = False) -> str:
         """
-        Nó inicial: planeja a pesquisa e gera queries de busca
+        Registra credenciais no pool de clientes
+
+        Com pin=True, o bundle fica preso no pool até client_pool.release(chave).
+
+        Returns:
+            Chave (hash) a ser passada em config["configurable"]["client_key"]
         """
-        print(f"\n🎯 PLANEJANDO PESQUISA: {state['query']}")
+        key = ClientPool.credentials_key(api_key, tavily_api_key)
+        self.client_pool.acquire(key, lambda: ClientBundle(
+            llm=self._build_llm(api_key),
+            search=self.search_backend if self.search_backend is not None else self._build_search_client(tavily_api_key),
+            owns_search=self.search_backend is None,
+            tavily_configured=bool(tavily_api_key),
+            model_factory=lambda spec: self._build_model(spec, api_key),
+            llm_limiter=self.rate_limiter.limiter("anthropic", api_key)
+        ), pin=pin)
+        return key
+
+    def _clients(self, config: Optional[RunnableConfig]) -> ClientBundle:
+        """Clientes da execução: do pool (client_key na config) ou os padrões do agente"""
+        key = (config or {}).get("configurable", {}).get("client_key")
+        if key is None:
+            return ClientBundle(
+                llm=self.llm,
+                search=self._get_search_client(),
+                tavily_configured=self._tavily_key_configured(),
+                model_factory=None if self._fixed_llm else lambda spec: self._build_model(spec, self.api_key),
+                models=self._routed_models,
+                llm_limiter=self.rate_limiter.limiter("anthropic", self.api_key)
+            )
+
+        bundle = self.client_pool.get(key)
+        if bundle is None:
+            raise RuntimeError("Credenciais não encontradas no pool de clientes (expiradas?)")
+        return bundle
+
+    def routing_profile(self, config: Optional[RunnableConfig] = None) -> Optional[RoutingProfile]:
+        """Perfil de roteamento da execução (config["configurable"]["routing_profile"]) ou o do agente"""
+        name = ((config or {}).get("configurable") or {}).get("routing_profile")
+        return resolve_profile(name) if name else self.routing
+
+    def _llm(self, node: str, config: Optional[RunnableConfig] = None):
+        """
+        LLM de um nó
+
+        Sem perfil de roteamento, todos os nós usam o modelo da execução.
+        Com perfil, cada nó usa o modelo da sua rota (com fallback), criado
+        uma vez por credencial e reutilizado entre execuções.
+        """
+        clients = self._clients(config)
+        profile = self.routing_profile(config)
+        if profile is None or clients.model_factory is None:
+            return clients.llm
+
+        route = profile.route(node)
+        llm = clients.models.get(route)
+        if llm is None:
+            llm = clients.models.setdefault(route, build_route(route, clients.model_factory))
+        return llm
+
+    @staticmethod
+    def _model_name(llm) -> str:
+        return getattr(llm, "model", None) or getattr(llm, "model_name", "")
+
+    @classmethod
+    def _llm_cache_key(cls, llm, messages: list) -> str:
+        """Chave de cache: modelo (principal, se houver fallback) + temperatura + hash das mensagens"""
+        llm = primary_model(llm)
+        return LLMCache.make_key(cls._model_name(llm), getattr(llm, "temperature", None), messages)
+
+    @classmethod
+    def _answered_by_primary(cls, llm, metadata: Optional[Dict[str, Any]]) -> bool:
+        """
+        Se a resposta veio do modelo principal da rota (o da chave de cache)
+
+        Respostas de um fallback não vão para o cache: a chave é a do
+        principal. O modelo que respondeu vem do response_metadata do
+        provedor; numa rota com fallback, sem essa informação, a resposta
+        também fica de fora.
+        """
+        primary = primary_model(llm)
+        if primary is llm:
+            return True
+        metadata = metadata or {}
+        return (metadata.get("model_name") or metadata.get("model")) == cls._model_name(primary)
+
+    def _cache_response(self, llm, key: str, response: BaseMessage):
+        if self._answered_by_primary(llm, response.response_metadata):
+            self.llm_cache.set(key, response.content)
+
+    def _llm_limiter(self, config: Optional[RunnableConfig]) -> ProviderLimiter:
+        """Limitador de taxa da API key da Anthropic usada pela execução"""
+        limiter = self._clients(config).llm_limiter
+        return limiter if limiter is not None else self.rate_limiter.limiter("anthropic", self.api_key)
+
+    @staticmethod
+    def _prompt_tokens(messages: list) -> int:
+        return sum(estimate_tokens(str(m.content)) for m in messages)
+
+    @staticmethod
+    def _used_tokens(response: BaseMessage) -> Optional[int]:
+        """Tokens reais (entrada + saída) informados pelo provedor"""
+        usage = getattr(response, "usage_metadata", None)
+        return usage.get("total_tokens") if usage else None
+
+    def _call_llm(self, llm, messages: list, config: Optional[RunnableConfig] = None) -> BaseMessage:
+        """Chamada ao LLM pelo limitador de taxa (com novas tentativas e backoff)"""
+        return self._llm_limiter(config).call(
+            lambda: llm.invoke(messages), self._prompt_tokens(messages), self._used_tokens
+        )
+
+    async def _acall_llm(self, llm, messages: list, config: Optional[RunnableConfig] = None) -> BaseMessage:
+        """Versão assíncrona de _call_llm()"""
+        return await self._llm_limiter(config).acall(
+            lambda: llm.ainvoke(messages), self._prompt_tokens(messages), self._used_tokens
+        )
+
+    def _call_llm_batch(
+        self,
+        llm,
+        batch: List[list],
+        max_concurrency: int,
+        config: Optional[RunnableConfig] = None
+    ) -> List[BaseMessage]:
+        """Lote de chamadas em paralelo (até max_concurrency), cada uma pelo limitador"""
+        limiter = self._llm_limiter(config)
+
+        def call(messages: list) -> BaseMessage:
+            return limiter.call(lambda: llm.invoke(messages), self._prompt_tokens(messages), self._used_tokens)
+
+        # Executor que propaga o contexto (callbacks de métricas) para as threads
+        with get_executor_for_config({"max_concurrency": max_concurrency}) as executor:
+            return list(executor.map(call, batch))
+
+    async def _acall_llm_batch(
+        self,
+        llm,
+        batch: List[list],
+        max_concurrency: int,
+        config: Optional[RunnableConfig] = None
+    ) -> List[BaseMessage]:
+        """Versão assíncrona de _call_llm_batch()"""
+        limiter = self._llm_limiter(config)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def call(messages: list) -> BaseMessage:
+            async with semaphore:
+                return await limiter.acall(
+                    lambda: llm.ainvoke(messages), self._prompt_tokens(messages), self._used_tokens
+                )
+
+        return list(await asyncio.gather(*(call(messages) for messages in batch)))
+
+    def _invoke_llm(self, node: str, messages: list, config: Optional[RunnableConfig] = None) -> BaseMessage:
+        """Chama o LLM da execução passando pelo cache de respostas (se habilitado)"""
+        llm = self._llm(node, config)
+        if self.llm_cache is None:
+            return self._call_llm(llm, messages, config)
+
+        key = self._llm_cache_key(llm, messages)
+        cached = self.llm_cache.lookup(node, key)
+        emit_event(LLM_CACHE_EVENT, {"hits": int(cached is not None), "misses": int(cached is None)}, config)
+        if cached is not None:
+            return AIMessage(content=cached)
+
+        response = self._call_llm(llm, messages, config)
+        self._cache_response(llm, key, response)
+        return response
+
+    async def _ainvoke_llm(self, node: str, messages: list, config: Optional[RunnableConfig] = None) -> BaseMessage:
+        """Versão assíncrona de _invoke_llm()"""
+        llm = self._llm(node, config)
+        if self.llm_cache is None:
+            return await self._acall_llm(llm, messages, config)
+
+        key = self._llm_cache_key(llm, messages)
+        cached = self.llm_cache.lookup(node, key)
+        await aemit_event(LLM_CACHE_EVENT, {"hits": int(cached is not None), "misses": int(cached is None)}, config)
+        if cached is not None:
+            return AIMessage(content=cached)
+
+        response = await self._acall_llm(llm, messages, config)
+        self._cache_response(llm, key, response)
+        return response
+
+    def _cached_batch(self, llm, node: str, batch: List[list]):
+        """
+        Separa as respostas já em cache das chamadas pendentes
 
+        Returns:
+            Tupla (respostas por posição, chaves, posições pendentes)
+        """
+        responses: List[Optional[BaseMessage]] = [None] * len(batch)
+        keys = [self._llm_cache_key(llm, messages) for messages in batch]
+        for i, key in enumerate(keys):
+            cached = self.llm_cache.lookup(node, key)
+            if cached is not None:
+                responses[i] = AIMessage(content=cached)
+        pending = [i for i, r in enumerate(responses) if r is None]
+        return responses, keys, pending
+
+    def _batch_llm(
+        self,
+        node: str,
+        batch: List[list],
+        max_concurrency: int,
+        config: Optional[RunnableConfig] = None
+    ) -> List[BaseMessage]:
+        """Chama o LLM em lote, enviando apenas as mensagens que não estão em cache"""
+        llm = self._llm(node, config)
+        if self.llm_cache is None:
+            return self._call_llm_batch(llm, batch, max_concurrency, config)
+
+        responses, keys, pending = self._cached_batch(llm, node, batch)
+        emit_event(LLM_CACHE_EVENT, {"hits": len(batch) - len(pending), "misses": len(pending)}, config)
+        if pending:
+            fresh = self._call_llm_batch(llm, [batch[i] for i in pending], max_concurrency, config)
+            for i, response in zip(pending, fresh):
+                self._cache_response(llm, keys[i], response)
+                responses[i] = response
+        return responses
+
+    async def _abatch_llm(
+        self,
+        node: str,
+        batch: List[list],
+        max_concurrency: int,
+        config: Optional[RunnableConfig] = None
+    ) -> List[BaseMessage]:
+        """Versão assíncrona de _batch_llm()"""
+        llm = self._llm(node, config)
+        if self.llm_cache is None:
+            return await self._acall_llm_batch(llm, batch, max_concurrency, config)
+
+        responses, keys, pending = self._cached_batch(llm, node, batch)
+        await aemit_event(LLM_CACHE_EVENT, {"hits": len(batch) - len(pending), "misses": len(pending)}, config)
+        if pending:
+            fresh = await self._acall_llm_batch(llm, [batch[i] for i in pending], max_concurrency, config)
+            for i, response in zip(pending, fresh):
+                self._cache_response(llm, keys[i], response)
+                responses[i] = response
+        return responses
+
+    def _planning_messages(self, state: ResearchState) -> list:
+        """Mensagens do planejamento inicial da pesquisa"""
         prompt = f"""Você é um pesquisador experiente. Dada a seguinte pergunta de pesquisa,
 gere 3-5 queries de busca específicas e complementares que ajudarão a obter uma resposta completa.
 
@@ -52,12 +434,14 @@ Pergunta: {state['query']}
 
 Retorne apenas as queries, uma por linha, sem numeração ou formatação extra."""
 
-        response = self.llm.invoke([
+        return [
             SystemMessage(content="Você é um assistente de pesquisa expert."),
             HumanMessage(content=prompt)
-        ])
+        ]
 
-        queries = [q.strip() for q in response.content.strip().split('\n') if q.strip()]
+    def _planning_update(self, state: ResearchState, content: str) -> Dict[str, Any]:
+        """Atualização de estado com as queries planejadas"""
+        queries = self._parse_queries(content)
 
         # Mensagens de log detalhadas
         log_messages = [
@@ -73,136 +457,420 @@ Retorne apenas as queries, uma por linha, sem numeração ou formatação extra.
             "current_iteration": 0
         }
 
-    def search_web(self, state: ResearchState) -> Dict[str, Any]:
+    def plan_research(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """
+        Nó inicial: planeja a pesquisa e gera queries de busca
+        """
+        print(f"\n🎯 PLANEJANDO PESQUISA: {state['query']}")
+        response = self._invoke_llm("plan_research", self._planning_messages(state), config)
+        return self._planning_update(state, response.content)
+
+    async def aplan_research(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """Versão assíncrona de plan_research()"""
+        print(f"\n🎯 PLANEJANDO PESQUISA: {state['query']}")
+        response = await self._ainvoke_llm("plan_research", self._planning_messages(state), config)
+        return self._planning_update(state, response.content)
+
+    @staticmethod
+    def _parse_queries(content: str) -> List[str]:
+        """Extrai as queries (uma por linha) da resposta do LLM"""
+        return [q.strip() for q in content.strip().split('\n') if q.strip()]
+
+    def _refinement_messages(self, state: ResearchState, executed: List[str]) -> list:
+        """Monta o prompt de refinamento a partir das lacunas da última validação"""
+        latest = state.get('latest_validations', [])
+
+        gaps = [
+            f"- {v.claim} (confiança: {v.confidence:.0%}"
+            + (", não validada" if not v.is_validated else "")
+            + (f", conflito: {v.conflicting_info}" if v.conflicting_info else "")
+            + ")"
+            for v in latest
+            if not v.is_validated or v.conflicting_info or v.confidence < 0.7
+        ]
+        gaps_text = "\n".join(gaps) if gaps else "- Poucas afirmações validadas: a cobertura do tema ainda é insuficiente"
+        executed_text = "\n".join(f"- {q}" for q in executed)
+
+        prompt = f"""Você está refinando uma pesquisa sobre: "{state['query']}"
+
+Lacunas e conflitos encontrados na última validação:
+{gaps_text}
+
+Queries já executadas (NÃO repita):
+{executed_text}
+
+Gere 2-3 novas queries de busca específicas que resolvam essas lacunas e conflitos.
+
+Retorne apenas as queries, uma por linha, sem numeração ou formatação extra."""
+
+        return [
+            SystemMessage(content="Você é um assistente de pesquisa expert."),
+            HumanMessage(content=prompt)
+        ]
+
+    def _refined_update(self, content: str, executed: List[str]) -> Dict[str, Any]:
+        """Filtra as queries refinadas já executadas e monta a atualização de estado"""
+        queries = pending_queries(self._parse_queries(content), executed)
+
+        log_messages = [f"🔁 REFINANDO PESQUISA: {len(queries)} novas queries"]
+        for i, q in enumerate(queries, 1):
+            log_messages.append(f"  {i}. {q}")
+        print(log_messages[0])
+
+        return {
+            "search_queries": queries,
+            "messages": log_messages
+        }
+
+    def refine_queries(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """
+        Nó de refinamento: gera queries novas a partir das lacunas e conflitos
+        da última validação (executado antes de cada iteração extra)
+        """
+        executed = state.get('executed_queries', [])
+        response = self._invoke_llm("refine_queries", self._refinement_messages(state, executed), config)
+        return self._refined_update(response.content, executed)
+
+    async def arefine_queries(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """Versão assíncrona de refine_queries()"""
+        executed = state.get('executed_queries', [])
+        response = await self._ainvoke_llm("refine_queries", self._refinement_messages(state, executed), config)
+        return self._refined_update(response.content, executed)
+
+    def _get_search_client(self) -> Optional[SearchBackend]:
+        """Retorna o backend de busca padrão do agente, reutilizável (None se indisponível)"""
+        if self.search_backend is not None:
+            return self.search_backend
+        if self._search_client is None and self._tavily_available:
+            self._search_client = self._build_search_client(self.tavily_key)
+            self._tavily_available = self._search_client is not None
+        return self._search_client
+
+    def _collect_outcomes(self, outcomes: List[QueryOutcome], log_messages: List[str]):
+        """
+        Agrega os resultados das buscas concorrentes (na ordem das queries)
+
+        Returns:
+            Tupla (resultados, queries que falharam)
+        """
+        search_results = []
+        failed_queries = []
+
+        for outcome in outcomes:
+            if outcome.error is not None:
+                error_msg = f"  ⚠️  Erro na busca '{outcome.query}': {outcome.error} ({outcome.elapsed:.2f}s)"
+                print(error_msg)
+                log_messages.append(error_msg)
+                failed_queries.append(outcome.query)
+                continue
+
+            search_results.extend(outcome.results)
+            timing = "cache" if outcome.cached else "compartilhada no lote" if outcome.shared else f"{outcome.elapsed:.2f}s"
+            log_msg = f"  ✓ Busca real: \"{outcome.query[:60]}...\" ({len(outcome.results)} resultados, {timing})"
+            print(log_msg)
+            log_messages.append(log_msg)
+
+        return search_results, failed_queries
+
+    @staticmethod
+    def _search_event(outcomes: List[QueryOutcome]) -> Dict[str, Any]:
+        """Dados das buscas para os callbacks de métricas"""
+        return {"outcomes": [
+            {"elapsed": o.elapsed, "cached": o.cached or o.shared, "error": o.error is not None}
+            for o in outcomes
+        ]}
+
+    def _sources(self, config: Optional[RunnableConfig] = None) -> SourceStore:
+        """Repositório de fontes da execução"""
+        sources = ((config or {}).get("configurable") or {}).get("sources")
+        return sources if sources is not None else self.sources
+
+    @staticmethod
+    async def _offload(sources: SourceStore, fn: Callable[..., T], *args: Any) -> T:
+        """Roda fn numa thread quando o repositório de fontes faz I/O (SQLite), sem travar o event loop"""
+        if sources.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _deduplicate(
+        self,
+        search_results: List[SearchResult],
+        state: ResearchState,
+        sources: SourceStore,
+        log_messages: List[str]
+    ) -> Tuple[List[SourceHandle], DedupStats]:
+        """
+        Etapa de deduplicação entre busca e validação (URL canônica + SimHash)
+
+        Os resultados mantidos vão para o repositório de fontes; o estado
+        recebe apenas os handles. As fontes já no estado são comparadas pelos
+        fingerprints em cache no repositório: só os resultados novos são hasheados.
+
+        Returns:
+            Tupla (handles dos resultados novos/atualizados, estatísticas)
+        """
+        unique, stats = deduplicate_results(
+            search_results,
+            existing=state.get('search_results', []),
+            threshold=self.near_duplicate_threshold,
+            fingerprint=sources.fingerprint
+        )
+
+        removed = stats.url_duplicates + stats.near_duplicates
+        if removed:
+            dedup_msg = (
+                f"  🧹 Deduplicação: {stats.total} → {stats.kept} resultados "
+                f"({stats.url_duplicates} URLs repetidas, {stats.near_duplicates} conteúdos quase duplicados)"
+            )
+            print(dedup_msg)
+            log_messages.append(dedup_msg)
+
+        return sources.add(unique), stats
+
+    def search_web(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
         """
         Nó de busca: executa as queries e coleta resultados
         """
-        queries = state.get('search_queries', [])
+        # Executa apenas queries que nunca rodaram (iterações anteriores já estão no estado)
+        queries = pending_queries(state.get('search_queries', []), state.get('executed_queries', []))
         print(f"\n🔍 BUSCANDO INFORMAÇÕES ({len(queries)} queries)")
 
+        start = time.perf_counter()
         search_results = []
         log_messages = [f"🔍 BUSCANDO INFORMAÇÕES ({len(queries)} queries)"]
 
-        # Verifica se deve usar Tavily ou simulação
-        use_tavily = self.tavily_key and self.tavily_key != "sua-chave-tavily-aqui"
+        clients = self._clients(config)
+        search_client = clients.search
+
+        if search_client:
+            # Busca REAL no backend (queries em paralelo, cliente reutilizado)
+            tavily_msg = f"  🌐 Usando {getattr(search_client, 'name', 'Tavily API')} (busca real, até {self.search_concurrency} em paralelo)"
+            print(tavily_msg)
+            log_messages.append(tavily_msg)
+
+            outcomes = search_many(search_client, queries, self.search_concurrency, cache=self.search_cache)
+            emit_event(SEARCH_EVENT, self._search_event(outcomes), config)
+            search_results, failed_queries = self._collect_outcomes(outcomes, log_messages)
+
+            # Fallback para simulação (em lote) nas queries que falharam
+            if failed_queries:
+                search_results.extend(self._simulate_searches(failed_queries, config))
+                log_messages.append(f"  → Usando simulação em lote como fallback para {len(failed_queries)} queries")
+        else:
+            if clients.tavily_configured:
+                fallback_msg = "  ⚠️  Tavily não instalado, usando simulação"
+                print(fallback_msg)
+                log_messages.append(fallback_msg)
 
-        if use_tavily:
-            # Busca REAL com Tavily API
-            try:
-                from tavily import TavilyClient
-                tavily_client = TavilyClient(api_key=self.tavily_key)
-                print("  🌐 Usando Tavily API (busca real)")
-                log_messages.append("  🌐 Usando Tavily API (busca real)")
-
-                for query in queries:
-                    try:
-                        # Busca real
-                        response = tavily_client.search(
-                            query=query,
-                            search_depth="basic",
-                            max_results=3
-                        )
-
-                        # Processa resultados
-                        num_results = len(response.get('results', []))
-                        for item in response.get('results', []):
-                            result = SearchResult(
-                                source=item.get('url', 'N/A'),
-                                title=item.get('title', query),
-                                content=item.get('content', ''),
-                                relevance_score=item.get('score', 0.5),
-                                timestamp=datetime.now().isoformat()
-                            )
-                            search_results.append(result)
-
-                        log_msg = f"  ✓ Busca real: \"{query[:60]}...\" ({num_results} resultados)"
-                        print(log_msg)
-                        log_messages.append(log_msg)
-
-                    except Exception as e:
-                        error_msg = f"  ⚠️  Erro na busca '{query}': {e}"
-                        print(error_msg)
-                        log_messages.append(error_msg)
-                        # Fallback para simulação em caso de erro
-                        result = self._simulate_search(query)
-                        search_results.append(result)
-                        log_messages.append(f"  → Usando simulação como fallback")
-
-            except ImportError:
+            # Simulação com LLM (todas as queries em lote)
+            sim_msg = f"  🤖 Usando simulação com LLM (lote, até {self.simulation_concurrency} em paralelo)"
+            print(sim_msg)
+            log_messages.append(sim_msg)
+
+            search_results = self._simulate_searches(queries, config)
+            for query in queries:
+                log_msg = f"  ✓ Busca simulada: \"{query[:60]}...\""
+                print(log_msg)
+                log_messages.append(log_msg)
+
+        search_results, stats = self._deduplicate(search_results, state, self._sources(config), log_messages)
+        log_messages.append(f"✓ Total: {len(search_results)} resultados coletados em {time.perf_counter() - start:.2f}s")
+
+        return {
+            "search_results": search_results,
+            "executed_queries": queries,
+            "latest_search": {"queries": len(queries), "fetched": stats.total, "new": stats.kept},
+            "messages": log_messages
+        }
+
+    async def asearch_web(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """
+        Versão assíncrona de search_web(): dispara todas as queries de uma vez
+        """
+        # Executa apenas queries que nunca rodaram (iterações anteriores já estão no estado)
+        queries = pending_queries(state.get('search_queries', []), state.get('executed_queries', []))
+        print(f"\n🔍 BUSCANDO INFORMAÇÕES ({len(queries)} queries)")
+
+        start = time.perf_counter()
+        search_results = []
+        log_messages = [f"🔍 BUSCANDO INFORMAÇÕES ({len(queries)} queries)"]
+
+        clients = self._clients(config)
+        search_client = clients.search
+
+        if search_client:
+            tavily_msg = f"  🌐 Usando {getattr(search_client, 'name', 'Tavily API')} (busca real assíncrona, até {self.search_concurrency} em paralelo)"
+            print(tavily_msg)
+            log_messages.append(tavily_msg)
+
+            shared = ((config or {}).get("configurable") or {}).get("shared_searches")
+            if shared is not None:
+                # Lote de pesquisas: cada busca distinta roda uma vez para o lote inteiro
+                outcomes = await shared.asearch_many(search_client, queries, cache=self.search_cache)
+            else:
+                outcomes = await asearch_many(search_client, queries, self.search_concurrency, cache=self.search_cache)
+            await aemit_event(SEARCH_EVENT, self._search_event(outcomes), config)
+            search_results, failed_queries = self._collect_outcomes(outcomes, log_messages)
+
+            if failed_queries:
+                search_results.extend(await self._asimulate_searches(failed_queries, config))
+                log_messages.append(f"  → Usando simulação em lote como fallback para {len(failed_queries)} queries")
+        else:
+            if clients.tavily_configured:
                 fallback_msg = "  ⚠️  Tavily não instalado, usando simulação"
                 print(fallback_msg)
                 log_messages.append(fallback_msg)
-                use_tavily = False
 
-        if not use_tavily:
-            # Simulação com LLM
-            sim_msg = "  🤖 Usando simulação com LLM"
+            sim_msg = f"  🤖 Usando simulação com LLM (lote, até {self.simulation_concurrency} em paralelo)"
             print(sim_msg)
             log_messages.append(sim_msg)
 
+            search_results = await self._asimulate_searches(queries, config)
             for query in queries:
-                result = self._simulate_search(query)
-                search_results.append(result)
                 log_msg = f"  ✓ Busca simulada: \"{query[:60]}...\""
                 print(log_msg)
                 log_messages.append(log_msg)
 
-        log_messages.append(f"✓ Total: {len(search_results)} resultados coletados")
+        sources = self._sources(config)
+        search_results, stats = await self._offload(sources, self._deduplicate, search_results, state, sources, log_messages)
+        log_messages.append(f"✓ Total: {len(search_results)} resultados coletados em {time.perf_counter() - start:.2f}s")
 
         return {
             "search_results": search_results,
+            "executed_queries": queries,
+            "latest_search": {"queries": len(queries), "fetched": stats.total, "new": stats.kept},
             "messages": log_messages
         }
 
-    def _simulate_search(self, query: str) -> SearchResult:
-        """Simulação de busca com LLM"""
+    def _simulation_messages(self, query: str) -> list:
+        """Monta as mensagens da simulação de busca"""
         prompt = f"""Simule um resultado de busca para: "{query}"
 
 Forneça informações factuais e realistas sobre este tópico.
 Seja específico e inclua detalhes verificáveis."""
 
-        response = self.llm.invoke([
+        return [
             SystemMessage(content="Você é um motor de busca que retorna informações factuais."),
             HumanMessage(content=prompt)
-        ])
+        ]
 
+    @staticmethod
+    def _simulated_result(query: str, content: str) -> SearchResult:
+        """Cria o SearchResult de uma busca simulada"""
+        # Digest estável (hash() muda a cada processo) e sem colisões entre queries distintas
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
         return SearchResult(
-            source=f"fonte-simulada-{hash(query) % 1000}.com",
+            source=f"fonte-simulada-{digest}.com",
             title=f"Resultado para: {query[:50]}",
-            content=response.content,
+            content=content,
             relevance_score=0.85,
             timestamp=datetime.now().isoformat()
         )
 
-    def validate_information(self, state: ResearchState) -> Dict[str, Any]:
+    def _simulate_searches(self, queries: List[str], config: Optional[RunnableConfig] = None) -> List[SearchResult]:
         """
-        Nó de validação: cruza informações e detecta conflitos
+        Simulação de busca com LLM em lote
+
+        Todas as queries saem num único lote (_batch_llm), com até
+        simulation_concurrency chamadas simultâneas; as respostas voltam na
+        ordem das queries.
         """
-        print(f"\n✅ VALIDANDO INFORMAÇÕES")
-        log_messages = ["✅ VALIDANDO INFORMAÇÕES"]
+        if not queries:
+            return []
+
+        responses = self._batch_llm(
+            "search_web",
+            [self._simulation_messages(q) for q in queries],
+            self.simulation_concurrency,
+            config
+        )
+        return [self._simulated_result(q, r.content) for q, r in zip(queries, responses)]
+
+    async def _asimulate_searches(self, queries: List[str], config: Optional[RunnableConfig] = None) -> List[SearchResult]:
+        """Versão assíncrona de _simulate_searches()"""
+        if not queries:
+            return []
+
+        responses = await self._abatch_llm(
+            "search_web",
+            [self._simulation_messages(q) for q in queries],
+            self.simulation_concurrency,
+            config
+        )
+        return [self._simulated_result(q, r.content) for q, r in zip(queries, responses)]
 
+    def _results_to_validate(self, state: ResearchState) -> List[SourceHandle]:
+        """Resultados que ainda não passaram pela validação (modo incremental)"""
         results = state.get('search_results', [])
-        if not results:
-            log_messages.append("  ⚠️  Nenhum resultado para validar")
-            return {"validations": [], "conflicts_detected": False, "messages": log_messages}
+        if not self.incremental_validation:
+            return results
+
+        validated = set(state.get('validated_sources', []))
+        return [r for r in results if r.source not in validated]
+
+    def _pack_sources(
+        self,
+        query: str,
+        results: List[SourceHandle],
+        token_budget: Optional[int],
+        sources: SourceStore,
+        log_messages: List[str]
+    ) -> List[PackedSource]:
+        """
+        Seleciona os trechos mais relevantes das fontes dentro do orçamento de tokens
 
-        # Extrai claims principais de cada resultado
+        O conteúdo completo de cada handle só é lido do repositório aqui.
+        """
+        packed = pack_context(query, sources.resolve_all(results), token_budget, chunk_tokens=self.context_chunk_tokens)
+
+        if token_budget is not None:
+            used = sum(estimate_tokens(p.text) for p in packed)
+            truncated = sum(1 for p in packed if p.truncated)
+            log_messages.append(
+                f"  📦 Contexto: {len(packed)}/{len(results)} fontes, ~{used} tokens "
+                f"(orçamento {token_budget}, {truncated} fontes resumidas)"
+            )
+        return packed
+
+    def _validation_messages(self, state: ResearchState, sources: List[PackedSource], structured: bool = False) -> list:
+        """Monta o prompt de validação (com as afirmações já validadas, no modo incremental)"""
         all_content = "\n\n---\n\n".join([
-            f"FONTE {i+1} ({r.source}):\n{r.content}"
-            for i, r in enumerate(results)
+            f"FONTE {i+1} ({p.result.source}):\n{p.text}"
+            for i, p in enumerate(sources)
         ])
 
+        existing = state.get('validations', []) if self.incremental_validation else []
+        existing_section = ""
+        if existing:
+            existing_claims = "\n".join(
+                f"- {v.claim} (confiança: {v.confidence:.0%}, fontes: {', '.join(v.supporting_sources) or 'N/A'})"
+                for v in existing
+            )
+            existing_section = f"""
+AFIRMAÇÕES JÁ VALIDADAS EM ITERAÇÕES ANTERIORES:
+{existing_claims}
+
+As fontes acima são NOVAS. Se elas confirmarem, contradisserem ou refinarem uma
+afirmação já validada, repita o texto EXATO da afirmação e retorne a confiança
+atualizada. Não repita afirmações que as novas fontes não afetam.
+"""
+
+        output = (
+            "Registre o resultado com a ferramenta ValidationReport, neste formato"
+            if structured else "Retorne um JSON com este formato"
+        )
+
         prompt = f"""Analise as seguintes informações de múltiplas fontes sobre: "{state['query']}"
 
 {all_content}
-
+{existing_section}
 Sua tarefa:
 1. Identifique as principais afirmações/claims
 2. Verifique se há consenso entre as fontes
 3. Detecte conflitos ou contradições
 4. Avalie a confiabilidade de cada afirmação
 
-Retorne um JSON com este formato:
+{output}:
 {{
   "validations": [
     {{
@@ -218,62 +886,67 @@ Retorne um JSON com este formato:
   "summary": "resumo da validação"
 }}"""
 
-        response = self.llm.invoke([
+        return [
             SystemMessage(content="Você é um analista de informações que valida fatos cruzando fontes."),
             HumanMessage(content=prompt)
-        ])
-
-        # Parse da resposta
-        try:
-            # Extrai JSON da resposta
-            content = response.content.strip()
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-
-            # Limpa caracteres de controle inválidos
-            content = clean_json_string(content)
-
-            validation_data = json.loads(content)
-
-            validations = [
-                ValidationResult(**v) for v in validation_data.get('validations', [])
-            ]
-
-            conflicts = validation_data.get('conflicts_detected', False)
-
-            log_msg_valid = f"  ✓ {len(validations)} afirmações validadas"
-            print(log_msg_valid)
-            log_messages.append(log_msg_valid)
-
-            if conflicts:
-                conflict_msg = "  ⚠️  Conflitos detectados!"
-                print(conflict_msg)
-                log_messages.append(conflict_msg)
-            else:
-                no_conflict_msg = "  ✓ Sem conflitos detectados"
-                log_messages.append(no_conflict_msg)
-
-            # Adiciona resumo das validações
-            for i, val in enumerate(validations, 1):
-                log_messages.append(f"    {i}. {val.claim[:60]}... (confiança: {val.confidence:.0%})")
+        ]
 
-            log_messages.append(validation_data.get('summary', 'Validação completa'))
+    def _validation_update(
+        self,
+        validations: List[ValidationResult],
+        conflicts: bool,
+        summary: str,
+        state: ResearchState,
+        results: List[SourceHandle],
+        log_messages: List[str]
+    ) -> Dict[str, Any]:
+        """Monta a atualização de estado de uma validação bem-sucedida"""
+        existing_keys = {claim_key(v.claim) for v in state.get('validations', [])}
+        updated = sum(1 for v in validations if claim_key(v.claim) in existing_keys)
+
+        log_msg_valid = f"  ✓ {len(validations)} afirmações validadas"
+        if updated:
+            log_msg_valid += f" ({updated} atualizações de afirmações anteriores)"
+        print(log_msg_valid)
+        log_messages.append(log_msg_valid)
+
+        if conflicts:
+            conflict_msg = "  ⚠️  Conflitos detectados!"
+            print(conflict_msg)
+            log_messages.append(conflict_msg)
+        else:
+            no_conflict_msg = "  ✓ Sem conflitos detectados"
+            log_messages.append(no_conflict_msg)
+
+        # Adiciona resumo das validações
+        for i, val in enumerate(validations, 1):
+            log_messages.append(f"    {i}. {val.claim[:60]}... (confiança: {val.confidence:.0%})")
+
+        log_messages.append(summary)
 
-            return {
-                "validations": validations,
-                "conflicts_detected": conflicts,
-                "messages": log_messages
-            }
+        return {
+            "validations": validations,
+            "latest_validations": validations,
+            "validated_sources": [r.source for r in results],
+            "conflicts_detected": conflicts,
+            "messages": log_messages
+        }
 
-        except json.JSONDecodeError as e:
-            error_msg = f"  ⚠️  Erro ao parsear validação: {e}"
+    def _fallback_validation(
+        self,
+        error: Exception,
+        state: ResearchState,
+        results: List[SourceHandle],
+        log_messages: List[str]
+    ) -> Dict[str, Any]:
+        """Validação básica usada quando a resposta do LLM não pôde ser interpretada"""
+        if isinstance(error, json.JSONDecodeError):
+            error_msg = f"  ⚠️  Erro ao parsear validação: {error}"
             print(error_msg)
             log_messages.append(error_msg)
 
             # Log do conteúdo que falhou (primeiros 200 chars para debug)
-            print(f"  Debug: Conteúdo recebido (primeiros 200 chars): {content[:200] if 'content' in locals() else 'N/A'}")
+            print(f"  Debug: Conteúdo recebido (primeiros 200 chars): {error.doc[:200]}")
 
             # Fallback: cria validação básica
             print("  → Criando validação fallback...")
@@ -286,14 +959,8 @@ Retorne um JSON com este formato:
             )
 
             log_messages.append("  → Usando validação fallback")
-
-            return {
-                "validations": [fallback_validation],
-                "conflicts_detected": False,
-                "messages": log_messages
-            }
-        except Exception as e:
-            error_msg = f"  ⚠️  Erro inesperado na validação: {e}"
+        else:
+            error_msg = f"  ⚠️  Erro inesperado na validação: {error}"
             print(error_msg)
             log_messages.append(error_msg)
 
@@ -306,38 +973,358 @@ Retorne um JSON com este formato:
                 reasoning="Validação básica devido a erro no processamento."
             )
 
-            return {
-                "validations": [fallback_validation],
-                "conflicts_detected": False,
-                "messages": log_messages
-            }
+        return {
+            "validations": [fallback_validation],
+            "latest_validations": [fallback_validation],
+            "conflicts_detected": False,
+            "messages": log_messages
+        }
+
+    @staticmethod
+    def _log_truncated(data: Dict[str, Any], log_messages: List[str], label: str = "Resposta de validação"):
+        if not data["complete"]:
+            truncated_msg = f"  ⚠️  {label} truncada: {len(data['validations'])} afirmações completas aproveitadas"
+            print(truncated_msg)
+            log_messages.append(truncated_msg)
+
+    def _parse_validation(
+        self,
+        data: Union[Dict[str, Any], Exception],
+        state: ResearchState,
+        results: List[SourceHandle],
+        log_messages: List[str]
+    ) -> Dict[str, Any]:
+        """Monta a atualização de estado a partir da validação interpretada (ou do erro de parsing)"""
+        if isinstance(data, Exception):
+            return self._fallback_validation(data, state, results, log_messages)
+
+        self._log_truncated(data, log_messages)
+        return self._validation_update(
+            data["validations"],
+            data["conflicts_detected"],
+            data["summary"],
+            state,
+            results,
+            log_messages
+        )
 
-    def synthesize_report(self, state: ResearchState) -> Dict[str, Any]:
+    def _reduce_validation_shards(
+        self,
+        outcomes: List[Union[Dict[str, Any], Exception]],
+        shards: List[List[SourceHandle]],
+        state: ResearchState,
+        log_messages: List[str]
+    ) -> Dict[str, Any]:
+        """Etapa reduce: funde as validações de cada fragmento"""
+        shard_validations = []
+        shard_conflicts = False
+        validated_results = []
+        last_error = None
+
+        for i, (data, shard_results) in enumerate(zip(outcomes, shards), 1):
+            if isinstance(data, Exception):
+                last_error = data
+                error_msg = f"  ⚠️  Fragmento {i}/{len(shards)}: resposta inválida ({data})"
+                print(error_msg)
+                log_messages.append(error_msg)
+                continue
+
+            self._log_truncated(data, log_messages, f"Fragmento {i}/{len(shards)}")
+            shard_validations.append(data["validations"])
+            shard_conflicts = shard_conflicts or data["conflicts_detected"]
+            validated_results.extend(shard_results)
+
+        if not shard_validations:
+            return self._fallback_validation(last_error, state, [r for s in shards for r in s], log_messages)
+
+        validations, disagreement = reduce_shard_validations(shard_validations)
+        if disagreement:
+            log_messages.append("  ⚠️  Fragmentos divergem sobre afirmações em comum")
+
+        return self._validation_update(
+            validations,
+            shard_conflicts or disagreement,
+            f"Validação map-reduce: {len(shard_validations)}/{len(shards)} fragmentos consolidados",
+            state,
+            validated_results,
+            log_messages
+        )
+
+    def _validation_inputs(self, state: ResearchState, log_messages: List[str]) -> Tuple[List[SourceHandle], Optional[Dict[str, Any]]]:
         """
-        Nó de síntese: cria relatório final com referências
+        Seleciona os resultados a validar
+
+        Returns:
+            Tupla (resultados, atualização final se não houver nada a validar)
         """
-        print(f"\n📝 SINTETIZANDO RELATÓRIO FINAL")
-        log_messages = ["📝 SINTETIZANDO RELATÓRIO FINAL"]
+        if not state.get('search_results', []):
+            log_messages.append("  ⚠️  Nenhum resultado para validar")
+            return [], {"validations": [], "latest_validations": [], "conflicts_detected": False, "messages": log_messages}
+
+        results = self._results_to_validate(state)
+        if not results:
+            log_messages.append("  ✓ Nenhum resultado novo desde a última validação")
+            return [], {"latest_validations": [], "conflicts_detected": False, "messages": log_messages}
+
+        if self.incremental_validation and state.get('validations'):
+            log_messages.append(
+                f"  → Validação incremental: {len(results)} resultados novos "
+                f"contra {len(state['validations'])} afirmações existentes"
+            )
+        return results, None
+
+    def _validation_shards(
+        self,
+        state: ResearchState,
+        results: List[SourceHandle],
+        sources: SourceStore,
+        log_messages: List[str],
+        structured: bool = False
+    ) -> Optional[Tuple[List[List[SourceHandle]], List[list]]]:
+        """
+        Prepara a validação map-reduce quando há resultados demais para uma chamada
+
+        Returns:
+            Tupla (resultados de cada fragmento que couberam no prompt, mensagens
+            por fragmento), ou None para validação única
+        """
+        if not self.validation_shard_size or len(results) <= self.validation_shard_size:
+            return None
+
+        # Map-reduce: cada fragmento é validado em uma chamada concorrente
+        shards = shard(results, self.validation_shard_size)
+        log_messages.append(
+            f"  → Validação map-reduce: {len(shards)} fragmentos de até {self.validation_shard_size} "
+            f"resultados (até {self.validation_concurrency} em paralelo)"
+        )
+        packed = [
+            self._pack_sources(state['query'], shard_results, self.validation_token_budget, sources, log_messages)
+            for shard_results in shards
+        ]
+        batch = [self._validation_messages(state, p, structured) for p in packed]
+        return [self._packed_handles(s, p) for s, p in zip(shards, packed)], batch
+
+    @staticmethod
+    def _packed_handles(results: List[SourceHandle], packed: List[PackedSource]) -> List[SourceHandle]:
+        """
+        Resultados que entraram no prompt de validação
 
+        Fontes cortadas pelo orçamento de tokens não contam como validadas:
+        no modo incremental, voltam na próxima passada.
+        """
+        kept = {p.result.source for p in packed}
+        return [r for r in results if r.source in kept]
+
+    def _validation_llm(self, config: Optional[RunnableConfig]) -> Tuple[Any, Any, bool]:
+        """
+        LLM da validação
+
+        Com structured_validation, o modelo é obrigado a responder pela tool
+        ValidationReport (schema derivado de ValidationResult); modelos sem
+        tool calling recebem o mesmo formato como instrução de texto.
+
+        Returns:
+            Tupla (modelo, runnable a chamar, se usa saída estruturada)
+        """
+        llm = self._llm("validate_information", config)
+        if self.structured_validation:
+            try:
+                return llm, llm.bind_tools([ValidationReport], tool_choice=ValidationReport.__name__), True
+            except (NotImplementedError, AttributeError):
+                pass
+        return llm, llm, False
+
+    @staticmethod
+    def _chunk_text(chunk: BaseMessage) -> str:
+        """Trecho de um chunk em streaming: argumentos da tool ou texto"""
+        tool_chunks = getattr(chunk, "tool_call_chunks", None)
+        if tool_chunks:
+            return "".join(c.get("args") or "" for c in tool_chunks)
+        content = chunk.content
+        if isinstance(content, str):
+            return content
+        return "".join(b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text")
+
+    @staticmethod
+    def _chunk_tokens(chunk: BaseMessage) -> int:
+        usage = getattr(chunk, "usage_metadata", None)
+        return usage.get("total_tokens", 0) if usage else 0
+
+    @staticmethod
+    def _emit_claims(parser: ValidationStreamParser, new: List[ValidationResult], emitted: int, writer) -> int:
+        """
+        Publica no stream "custom" as afirmações que acabaram de fechar
+
+        Numa nova tentativa o parser recomeça; as afirmações já publicadas
+        (emitted) não são repetidas.
+        """
+        first = len(parser.validations) - len(new)
+        for index, claim in enumerate(new, first):
+            if index >= emitted:
+                writer({"claim": claim.model_dump()})
+        return max(emitted, len(parser.validations))
+
+    def _validation_cache(self, llm, messages: list) -> Tuple[Optional[str], Optional[str]]:
+        """Chave e resposta em cache da validação (None, None sem cache)"""
+        if self.llm_cache is None:
+            return None, None
+        key = self._llm_cache_key(llm, messages)
+        return key, self.llm_cache.lookup("validate_information", key)
+
+    def _finish_validation(self, parser: ValidationStreamParser, key: Optional[str]) -> Union[Dict[str, Any], Exception]:
+        """Fecha o parsing (só respostas completas vão para o cache)"""
         try:
-            results = state.get('search_results', [])
-            validations = state.get('validations', [])
+            data = parser.finish()
+        except json.JSONDecodeError as e:
+            return e
+        if key is not None and data["complete"]:
+            self.llm_cache.set(key, parser.text)
+        return data
+
+    def _validate(self, llm, runnable, messages: list, config: Optional[RunnableConfig] = None) -> Union[Dict[str, Any], Exception]:
+        """
+        Uma chamada de validação em streaming, pelo parser incremental
+
+        Cada afirmação fica disponível (stream "custom" do grafo) assim que
+        o objeto dela fecha; uma resposta truncada mantém as afirmações
+        completas. Passa pelo cache de respostas e pelo limitador de taxa.
+
+        Returns:
+            Dados da validação (ver ValidationStreamParser.finish) ou o erro de parsing
+        """
+        key, cached = self._validation_cache(llm, messages)
+        if key is not None:
+            emit_event(LLM_CACHE_EVENT, {"hits": int(cached is not None), "misses": int(cached is None)}, config)
+        if cached is not None:
+            try:
+                return parse_validation(cached)
+            except json.JSONDecodeError as e:
+                return e
+
+        writer = _stream_writer()
+        emitted = 0
+        metadata: Dict[str, Any] = {}
+
+        def attempt() -> Tuple[ValidationStreamParser, int]:
+            nonlocal emitted
+            parser, used = ValidationStreamParser(), 0
+            metadata.clear()
+            for chunk in runnable.stream(messages):
+                used += self._chunk_tokens(chunk)
+                metadata.update(chunk.response_metadata)
+                emitted = self._emit_claims(parser, parser.feed(self._chunk_text(chunk)), emitted, writer)
+            return parser, used
+
+        parser, _ = self._llm_limiter(config).call(attempt, self._prompt_tokens(messages), lambda r: r[1] or None)
+        return self._finish_validation(parser, key if self._answered_by_primary(llm, metadata) else None)
+
+    async def _avalidate(self, llm, runnable, messages: list, config: Optional[RunnableConfig] = None) -> Union[Dict[str, Any], Exception]:
+        """Versão assíncrona de _validate()"""
+        key, cached = self._validation_cache(llm, messages)
+        if key is not None:
+            await aemit_event(LLM_CACHE_EVENT, {"hits": int(cached is not None), "misses": int(cached is None)}, config)
+        if cached is not None:
+            try:
+                return parse_validation(cached)
+            except json.JSONDecodeError as e:
+                return e
+
+        writer = _stream_writer()
+        emitted = 0
+        metadata: Dict[str, Any] = {}
+
+        async def attempt() -> Tuple[ValidationStreamParser, int]:
+            nonlocal emitted
+            parser, used = ValidationStreamParser(), 0
+            metadata.clear()
+            async for chunk in runnable.astream(messages):
+                used += self._chunk_tokens(chunk)
+                metadata.update(chunk.response_metadata)
+                emitted = self._emit_claims(parser, parser.feed(self._chunk_text(chunk)), emitted, writer)
+            return parser, used
+
+        parser, _ = await self._llm_limiter(config).acall(attempt, self._prompt_tokens(messages), lambda r: r[1] or None)
+        return self._finish_validation(parser, key if self._answered_by_primary(llm, metadata) else None)
+
+    def validate_information(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """
+        Nó de validação: cruza informações e detecta conflitos
+
+        No modo incremental, apenas os resultados que chegaram desde a última
+        passada são analisados, contra o conjunto de afirmações já existente.
+        """
+        print(f"\n✅ VALIDANDO INFORMAÇÕES")
+        log_messages = ["✅ VALIDANDO INFORMAÇÕES"]
+
+        results, done = self._validation_inputs(state, log_messages)
+        if done is not None:
+            return done
+
+        sources = self._sources(config)
+        llm, runnable, structured = self._validation_llm(config)
+        sharded = self._validation_shards(state, results, sources, log_messages, structured)
+        if sharded is not None:
+            shards, batch = sharded
+            with get_executor_for_config({"max_concurrency": self.validation_concurrency}) as executor:
+                outcomes = list(executor.map(lambda messages: self._validate(llm, runnable, messages, config), batch))
+            return self._reduce_validation_shards(outcomes, shards, state, log_messages)
+
+        packed = self._pack_sources(state['query'], results, self.validation_token_budget, sources, log_messages)
+        data = self._validate(llm, runnable, self._validation_messages(state, packed, structured), config)
+
+        return self._parse_validation(data, state, self._packed_handles(results, packed), log_messages)
+
+    async def avalidate_information(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """Versão assíncrona de validate_information()"""
+        print(f"\n✅ VALIDANDO INFORMAÇÕES")
+        log_messages = ["✅ VALIDANDO INFORMAÇÕES"]
 
-            log_messages.append(f"  → Processando {len(results)} fontes")
-            log_messages.append(f"  → Integrando {len(validations)} validações")
+        results, done = self._validation_inputs(state, log_messages)
+        if done is not None:
+            return done
 
-            # Prepara contexto para síntese
-            sources_summary = "\n\n".join([
-                f"FONTE {i+1}: {r.source}\n{r.content[:500]}..."
-                for i, r in enumerate(results)
-            ])
+        sources = self._sources(config)
+        llm, runnable, structured = self._validation_llm(config)
+        sharded = await self._offload(sources, self._validation_shards, state, results, sources, log_messages, structured)
+        if sharded is not None:
+            shards, batch = sharded
+            semaphore = asyncio.Semaphore(max(1, self.validation_concurrency))
 
-            validations_summary = "\n".join([
-                f"- {v.claim} (confiança: {v.confidence:.0%})"
-                for v in validations
-            ])
+            async def validate_shard(messages: list):
+                async with semaphore:
+                    return await self._avalidate(llm, runnable, messages, config)
 
-            prompt = f"""Com base na pesquisa realizada sobre "{state['query']}", crie um relatório final completo.
+            outcomes = list(await asyncio.gather(*(validate_shard(messages) for messages in batch)))
+            return self._reduce_validation_shards(outcomes, shards, state, log_messages)
+
+        packed = await self._offload(
+            sources, self._pack_sources, state['query'], results, self.validation_token_budget, sources, log_messages
+        )
+        data = await self._avalidate(llm, runnable, self._validation_messages(state, packed, structured), config)
+
+        return self._parse_validation(data, state, self._packed_handles(results, packed), log_messages)
+
+    def _synthesis_messages(self, state: ResearchState, sources: SourceStore, log_messages: List[str]) -> list:
+        """Mensagens da síntese do relatório final"""
+        results = state.get('search_results', [])
+        validations = state.get('validations', [])
+
+        log_messages.append(f"  → Processando {len(results)} fontes")
+        log_messages.append(f"  → Integrando {len(validations)} validações")
+
+        # Prepara contexto para síntese (trechos mais relevantes dentro do orçamento)
+        packed = self._pack_sources(state['query'], results, self.synthesis_token_budget, sources, log_messages)
+        sources_summary = "\n\n".join([
+            f"FONTE {i+1}: {p.result.source}\n{p.text}"
+            for i, p in enumerate(packed)
+        ])
+
+        validations_summary = "\n".join([
+            f"- {v.claim} (confiança: {v.confidence:.0%})"
+            for v in validations
+        ])
+
+        prompt = f"""Com base na pesquisa realizada sobre "{state['query']}", crie um relatório final completo.
 
 FONTES CONSULTADAS:
 {sources_summary}
@@ -356,51 +1343,57 @@ Formato do relatório: Markdown profissional
 
 IMPORTANTE: Retorne apenas o conteúdo do relatório em Markdown puro, sem blocos de código ou formatação extra."""
 
-            response = self.llm.invoke([
-                SystemMessage(content="Você é um pesquisador acadêmico que escreve relatórios claros e bem referenciados em Markdown."),
-                HumanMessage(content=prompt)
-            ])
-
-            # Limpa o conteúdo do relatório (remove markdown code blocks se houver)
-            report_content = response.content.strip()
-            if "```markdown" in report_content:
-                report_content = report_content.split("```markdown")[1].split("```")[0].strip()
-            elif report_content.startswith("```") and report_content.endswith("```"):
-                report_content = report_content[3:-3].strip()
-
-            # Calcula confiança média
-            avg_confidence = sum(v.confidence for v in validations) / len(validations) if validations else 0.5
-
-            # Prepara referências
-            references = [
-                {
-                    "source": r.source,
-                    "title": r.title,
-                    "url": r.source
-                }
-                for r in results
-            ]
-
-            final_msg = f"  ✓ Relatório gerado (confiança: {avg_confidence:.0%})"
-            print(final_msg)
-            log_messages.append(final_msg)
-            log_messages.append(f"  ✓ {len(references)} referências incluídas")
-            log_messages.append("✅ Síntese completa")
-
-            return {
-                "final_report": report_content,
-                "references": references,
-                "confidence_level": avg_confidence,
-                "messages": log_messages
+        return [
+            SystemMessage(content="Você é um pesquisador acadêmico que escreve relatórios claros e bem referenciados em Markdown."),
+            HumanMessage(content=prompt)
+        ]
+
+    def _synthesis_update(self, state: ResearchState, content: str, log_messages: List[str]) -> Dict[str, Any]:
+        """Atualização de estado com o relatório, referências e confiança"""
+        results = state.get('search_results', [])
+        validations = state.get('validations', [])
+
+        # Limpa o conteúdo do relatório (remove markdown code blocks se houver)
+        report_content = content.strip()
+        if "```markdown" in report_content:
+            report_content = report_content.split("```markdown")[1].split("```")[0].strip()
+        elif report_content.startswith("```") and report_content.endswith("```"):
+            report_content = report_content[3:-3].strip()
+
+        # Calcula confiança média
+        avg_confidence = sum(v.confidence for v in validations) / len(validations) if validations else 0.5
+
+        # Prepara referências
+        references = [
+            {
+                "source": r.source,
+                "title": r.title,
+                "url": r.source
             }
+            for r in results
+        ]
 
-        except Exception as e:
-            error_msg = f"  ⚠️  Erro ao gerar relatório: {e}"
-            print(error_msg)
-            log_messages.append(error_msg)
+        final_msg = f"  ✓ Relatório gerado (confiança: {avg_confidence:.0%})"
+        print(final_msg)
+        log_messages.append(final_msg)
+        log_messages.append(f"  ✓ {len(references)} referências incluídas")
+        log_messages.append("✅ Síntese completa")
 
-            # Relatório fallback
-            fallback_report = f"""# Relatório de Pesquisa: {state['query']}
+        return {
+            "final_report": report_content,
+            "references": references,
+            "confidence_level": avg_confidence,
+            "messages": log_messages
+        }
+
+    def _fallback_report(self, state: ResearchState, error: Exception, log_messages: List[str]) -> Dict[str, Any]:
+        """Relatório mínimo quando a síntese falha"""
+        error_msg = f"  ⚠️  Erro ao gerar relatório: {error}"
+        print(error_msg)
+        log_messages.append(error_msg)
+
+        # Relatório fallback
+        fallback_report = f"""# Relatório de Pesquisa: {state['query']}
 
 ## Resumo
 
@@ -419,31 +1412,71 @@ Confiança média: 50%
 *Relatório gerado automaticamente com informações limitadas devido a erro no processamento.*
 """
 
-            return {
-                "final_report": fallback_report,
-                "references": [],
-                "confidence_level": 0.5,
-                "messages": log_messages
-            }
+        return {
+            "final_report": fallback_report,
+            "references": [],
+            "confidence_level": 0.5,
+            "messages": log_messages
+        }
 
-    def decide_next_step(self, state: ResearchState) -> str:
+    def synthesize_report(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
         """
-        Nó de decisão: determina se precisa de mais pesquisa
+        Nó de síntese: cria relatório final com referências
         """
-        current_iter = state.get('current_iteration', 0)
-        max_iter = state.get('max_iterations', 1)
-        conflicts = state.get('conflicts_detected', False)
-        validations = state.get('validations', [])
+        print(f"\n📝 SINTETIZANDO RELATÓRIO FINAL")
+        log_messages = ["📝 SINTETIZANDO RELATÓRIO FINAL"]
 
-        # Se tem conflitos e ainda tem iterações disponíveis
-        if conflicts and current_iter < max_iter:
-            print(f"\n🔄 Conflitos detectados - Nova iteração necessária")
-            return "research_more"
+        try:
+            response = self._invoke_llm("synthesize_report", self._synthesis_messages(state, self._sources(config), log_messages), config)
+            return self._synthesis_update(state, response.content, log_messages)
+        except Exception as e:
+            return self._fallback_report(state, e, log_messages)
 
-        # Se tem poucas validações e ainda pode iterar
-        if len(validations) < 3 and current_iter < max_iter:
-            print(f"\n🔄 Informações insuficientes - Nova iteração necessária")
-            return "research_more"
+    async def asynthesize_report(self, state: ResearchState, config: Optional[RunnableConfig] = None) -> Dict[str, Any]:
+        """Versão assíncrona de synthesize_report()"""
+        print(f"\n📝 SINTETIZANDO RELATÓRIO FINAL")
+        log_messages = ["📝 SINTETIZANDO RELATÓRIO FINAL"]
+
+        try:
+            sources = self._sources(config)
+            messages = await self._offload(sources, self._synthesis_messages, state, sources, log_messages)
+            response = await self._ainvoke_llm("synthesize_report", messages, config)
+            return self._synthesis_update(state, response.content, log_messages)
+        except Exception as e:
+            return self._fallback_report(state, e, log_messages)
 
-        print(f"\n✅ Pesquisa completa - Gerando relatório final")
-        return "synthesize"
\ No newline at end of file
+    def decide_next_step(self, state: ResearchState) -> Dict[str, Any]:
+        """
+        Nó de decisão: controla o laço de pesquisa
+
+        Mede o ganho da rodada (fontes novas, duplicatas, afirmações novas e
+        variação de confiança), decide entre mais uma iteração e a síntese
+        (ver src/iteration.py) e registra métricas e motivo em
+        iteration_metrics. Ao decidir por mais pesquisa, avança
+        current_iteration, que limita o laço a max_iterations.
+        """
+        record = assess_iteration(state, self.iteration_policy)
+        log_messages = [describe(record)]
+
+        update: Dict[str, Any] = {"iteration_metrics": [record]}
+        if record["decision"] == "research_more":
+            decision_msg = f"🔄 Nova iteração necessária: {record['reason']}"
+            update["current_iteration"] = state.get('current_iteration', 0) + 1
+            update["needs_more_research"] = True
+        else:
+            decision_msg = f"✅ Pesquisa completa - Gerando relatório final ({record['reason']})"
+            update["needs_more_research"] = False
+
+        print(f"\n{decision_msg}")
+        log_messages.append(decision_msg)
+        update["messages"] = log_messages
+        return update
+
+    async def adecide_next_step(self, state: ResearchState) -> Dict[str, Any]:
+        """Versão assíncrona de decide_next_step() (decisão local, sem I/O)"""
+        return self.decide_next_step(state)
+
+    @staticmethod
+    def next_step(state: ResearchState) -> str:
+        """Aresta condicional: segue a decisão registrada por decide_next_step"""
+        return "research_more" if state.get('needs_more_research') else "synthesize"
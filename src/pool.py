@@ -0,0 +1,136 @@
+"""
+Pool de Clientes - Reutiliza clientes LLM/busca por credencial entre execuções
+"""
+from typing import Any, Callable, Dict, Optional
+from dataclasses import dataclass, field
+import hashlib
+import threading
+import time
+
+
+@dataclass
+class ClientBundle:
+    """
+    Clientes usados por uma execução do grafo
+
+    model_factory cria, com as mesmas credenciais, os modelos dos perfis de
+    roteamento; os clientes criados ficam em models (um por rota).
+    llm_limiter é o limitador de taxa da API key da Anthropic (src/ratelimit.py).
+    pins conta quem prendeu o bundle (ex.: jobs na fila); bundles presos nunca
+    são descartados. Com owns_search=False, search é um backend compartilhado
+    (ex.: o corpus local do agente) e não é fechado junto com o bundle.
+    """
+    llm: Any
+    search: Optional[Any] = None
+    tavily_configured: bool = False
+    last_used: float = field(default_factory=time.monotonic)
+    model_factory: Optional[Callable[[Any], Any]] = None
+    models: Dict[Any, Any] = field(default_factory=dict)
+    llm_limiter: Optional[Any] = None
+    pins: int = 0
+    owns_search: bool = True
+
+    def close(self):
+        if not self.owns_search:
+            return
+        close = getattr(self.search, "close", None)
+        if close is not None:
+            close()
+
+
+class ClientPool:
+    """
+    Pool de clientes chaveado pelo hash das credenciais
+
+    Mantém um ClientBundle por conjunto de API keys, de forma que requisições
+    com as mesmas credenciais reaproveitem clientes HTTP (e suas conexões TLS).
+    Entradas ociosas por mais de idle_ttl segundos são descartadas, assim como
+    as menos usadas quando o pool passa de max_size; entradas presas com pin()
+    ficam até o release() correspondente.
+    """
+
+    def __init__(self, idle_ttl: float = 600.0, max_size: int = 64):
+        self.idle_ttl = idle_ttl
+        self.max_size = max_size
+        self._bundles: Dict[str, ClientBundle] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def credentials_key(*secrets: Optional[str]) -> str:
+        """Hash das credenciais (as keys em si nunca ficam na configuração do grafo)"""
+        raw = "\x1f".join(secret or "" for secret in secrets)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def acquire(self, key: str, factory: Callable[[], ClientBundle], pin: bool = False) -> ClientBundle:
+        """
+        Retorna o bundle da chave, criando-o com factory se necessário
+
+        Com pin=True, o bundle já sai preso (como pin(), sem intervalo em que
+        outra chamada possa descartá-lo); desfaça com release().
+        """
+        evicted = []
+        with self._lock:
+            evicted.extend(self._pop_idle())
+            bundle = self._bundles.get(key)
+            if bundle is None:
+                bundle = factory()
+                self._bundles[key] = bundle
+            if pin:
+                bundle.pins += 1
+            evicted.extend(self._pop_oldest())
+            bundle.last_used = time.monotonic()
+
+        for old in evicted:
+            old.close()
+        return bundle
+
+    def get(self, key: str) -> Optional[ClientBundle]:
+        """Retorna o bundle da chave (None se não existir ou tiver sido descartado)"""
+        with self._lock:
+            bundle = self._bundles.get(key)
+            if bundle is not None:
+                bundle.last_used = time.monotonic()
+            return bundle
+
+    def pin(self, key: str) -> bool:
+        """Impede o descarte do bundle da chave até release(); False se ele não existir"""
+        with self._lock:
+            bundle = self._bundles.get(key)
+            if bundle is None:
+                return False
+            bundle.pins += 1
+            return True
+
+    def release(self, key: str):
+        """Desfaz um pin(); o bundle volta a expirar por ociosidade a partir de agora"""
+        with self._lock:
+            bundle = self._bundles.get(key)
+            if bundle is not None and bundle.pins > 0:
+                bundle.pins -= 1
+                bundle.last_used = time.monotonic()
+
+    def evict_idle(self) -> int:
+        """Descarta os bundles ociosos; retorna quantos foram removidos"""
+        with self._lock:
+            evicted = self._pop_idle()
+        for bundle in evicted:
+            bundle.close()
+        return len(evicted)
+
+    def _pop_idle(self):
+        now = time.monotonic()
+        idle = [k for k, b in self._bundles.items() if not b.pins and now - b.last_used > self.idle_ttl]
+        return [self._bundles.pop(k) for k in idle]
+
+    def _pop_oldest(self):
+        evicted = []
+        while len(self._bundles) > self.max_size:
+            unpinned = [k for k, b in self._bundles.items() if not b.pins]
+            if not unpinned:
+                break
+            oldest = min(unpinned, key=lambda k: self._bundles[k].last_used)
+            evicted.append(self._bundles.pop(oldest))
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._bundles)
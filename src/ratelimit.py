@@ -0,0 +1,352 @@
+"""
+Limite de Taxa - Token bucket por provedor/API key e novas tentativas com backoff
+
+Todas as chamadas externas dos nós (Anthropic e Tavily) passam por um
+ProviderLimiter: antes de sair, a chamada reserva uma requisição (e os
+tokens estimados) nos buckets da sua API key; se falhar por um erro
+transitório (429, 5xx, sobrecarga, timeout), é repetida com backoff
+exponencial com jitter, respeitando o Retry-After do provedor. Um 429
+bloqueia a API key inteira pelo Retry-After, não só a chamada que o recebeu.
+
+Nas rotas com fallback (src/routing.py) o limitador envolve a rota inteira:
+um 429 do modelo principal é tratado pelo with_fallbacks, que passa na hora
+para o alternativo. O limitador só vê o erro (e só então pausa a key e
+respeita o Retry-After) quando todos os modelos da rota falham.
+
+Cada nova tentativa chama o hook on_retry(provedor, erro) do RateLimiter;
+src/metrics.py usa esse hook para contar as novas tentativas por execução.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+
+T = TypeVar("T")
+
+# Status HTTP que valem nova tentativa (529 = API da Anthropic sobrecarregada)
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Trechos de nomes de exceção transitórias (SDKs da Anthropic e do Tavily, httpx, requests)
+RETRYABLE_NAMES = ("RateLimit", "UsageLimitExceeded", "Overloaded", "Timeout", "Connection")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Limites de uma API key (None = sem limite)"""
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Novas tentativas de chamadas externas
+
+    O atraso da tentativa n é sorteado entre 0 e min(max_delay,
+    base_delay * 2**n) (jitter completo), a menos que o provedor informe
+    Retry-After, que é respeitado até max_retry_after segundos.
+    """
+    max_attempts: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    max_retry_after: float = 60.0
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        wait = retry_after(error)
+        if wait is not None:
+            return min(wait, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Erros transitórios: rate limit, sobrecarga, 5xx, timeouts e falhas de conexão"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(name in type(error).__name__ for name in RETRYABLE_NAMES)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Segundos pedidos pelo provedor (Retry-After / retry-after-ms), se houver"""
+    seconds = getattr(error, "retry_after_seconds", None)
+    if seconds is not None:
+        return float(seconds)
+
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # Formato de data HTTP
+            when = parsedate_to_datetime(value)
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket com reserva: quem pede além do saldo fica devendo e
+    espera o tempo de reposição da dívida (as esperas saem em ordem de chegada)
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Debita amount e retorna quantos segundos esperar antes de usá-lo"""
+        self._refill(now)
+        # Um pedido maior que o bucket inteiro espera só até o bucket encher
+        self._tokens -= min(amount, self.capacity)
+        return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, amount: float, now: float):
+        """Corrige o saldo depois da chamada (uso real maior ou menor que o estimado)"""
+        self._refill(now)
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class ProviderLimiter:
+    """
+    Limites e novas tentativas de uma API key de um provedor
+
+    Compartilhado por todas as execuções (threads e tarefas) que usam a
+    mesma key no processo.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        limit: RateLimit,
+        retry: RetryPolicy,
+        on_retry: Optional[Callable[[str, Exception], None]] = None
+    ):
+        self.provider = provider
+        self.limit = limit
+        self.retry = retry
+        self.on_retry = on_retry
+        self._requests = TokenBucket(limit.requests_per_minute) if limit.requests_per_minute else None
+        self._tokens = TokenBucket(limit.tokens_per_minute) if limit.tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "throttled": 0, "wait_seconds": 0.0, "retries": 0, "rate_limited": 0, "failures": 0}
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserva uma requisição (e tokens) e retorna a espera necessária em segundos"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+
+            self._stats["calls"] += 1
+            if wait > 0:
+                self._stats["throttled"] += 1
+                self._stats["wait_seconds"] += wait
+            return wait
+
+    def record_tokens(self, estimated: int, actual: Optional[int]):
+        """Ajusta o bucket de tokens com o uso real informado pelo provedor"""
+        if self._tokens is None or actual is None:
+            return
+        with self._lock:
+            self._tokens.adjust(actual - estimated, time.monotonic())
+
+    def _failed(self, error: Exception, attempt: int) -> float:
+        """Registra a falha e retorna o atraso até a próxima tentativa (relança se não couber)"""
+        if not is_retryable(error) or attempt + 1 >= self.retry.max_attempts:
+            with self._lock:
+                self._stats["failures"] += 1
+            raise error
+
+        delay = self.retry.delay(attempt, error)
+        with self._lock:
+            self._stats["retries"] += 1
+            if _status_code(error) == 429 or retry_after(error) is not None:
+                # O provedor pediu pausa: vale para todas as chamadas desta key
+                self._stats["rate_limited"] += 1
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        if self.on_retry is not None:
+            self.on_retry(self.provider, error)
+        return delay
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        tokens: int = 0,
+        usage: Optional[Callable[[T], Optional[int]]] = None
+    ) -> T:
+        """
+        Executa fn respeitando os limites, com novas tentativas em erros transitórios
+
+        Args:
+            fn: Chamada externa
+            tokens: Tokens estimados da chamada (para tokens_per_minute)
+            usage: Extrai do resultado os tokens realmente usados (opcional)
+        """
+        attempt = 0
+        while True:
+            wait = self.reserve(tokens)
+            if wait:
+                time.sleep(wait)
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._failed(e, attempt))
+                attempt += 1
+                continue
+            if usage is not None:
+                self.record_tokens(tokens, usage(result))
+            return result
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        tokens: int = 0,
+        usage: Optional[Callable[[T], Optional[int]]] = None
+    ) -> T:
+        """Versão assíncrona de call() (fn retorna uma corrotina nova a cada tentativa)"""
+        attempt = 0
+        while True:
+            wait = self.reserve(tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.sleep(self._failed(e, attempt))
+                attempt += 1
+                continue
+            if usage is not None:
+                self.record_tokens(tokens, usage(result))
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["requests_per_minute"] = self.limit.requests_per_minute
+        stats["tokens_per_minute"] = self.limit.tokens_per_minute
+        return stats
+
+
+class RateLimiter:
+    """
+    Registro de limitadores por (provedor, API key) do processo
+
+    limits define o limite padrão de cada provedor ("anthropic", "tavily");
+    configure() sobrescreve o de uma key específica. As keys só aparecem
+    como hash (nos stats, um prefixo curto).
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, RateLimit]] = None,
+        retry: Optional[RetryPolicy] = None,
+        on_retry: Optional[Callable[[str, Exception], None]] = None
+    ):
+        self.limits = dict(limits or {})
+        self.retry = retry or RetryPolicy()
+        self.on_retry = on_retry
+        self._key_limits: Dict[Tuple[str, str], RateLimit] = {}
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key_id(api_key: Optional[str]) -> str:
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """
+        Limites a partir do ambiente: ANTHROPIC_REQUESTS_PER_MINUTE,
+        ANTHROPIC_TOKENS_PER_MINUTE e TAVILY_REQUESTS_PER_MINUTE
+        """
+        def value(name: str) -> Optional[float]:
+            raw = os.getenv(name)
+            return float(raw) if raw else None
+
+        return cls({
+            "anthropic": RateLimit(value("ANTHROPIC_REQUESTS_PER_MINUTE"), value("ANTHROPIC_TOKENS_PER_MINUTE")),
+            "tavily": RateLimit(value("TAVILY_REQUESTS_PER_MINUTE"))
+        })
+
+    def configure(self, provider: str, limit: RateLimit, api_key: Optional[str] = None):
+        """Define o limite de um provedor (ou só de uma API key)"""
+        with self._lock:
+            if api_key is None:
+                self.limits[provider] = limit
+                stale = [k for k in self._limiters if k[0] == provider and k not in self._key_limits]
+            else:
+                key = (provider, self._key_id(api_key))
+                self._key_limits[key] = limit
+                stale = [key]
+            # Limitadores já criados passam a usar o novo limite
+            for key in stale:
+                self._limiters.pop(key, None)
+
+    def set_retry_hook(self, hook: Optional[Callable[[str, Exception], None]]):
+        """Define a função chamada a cada nova tentativa, com (provedor, erro), em todos os limitadores"""
+        with self._lock:
+            self.on_retry = hook
+            for limiter in self._limiters.values():
+                limiter.on_retry = hook
+
+    def limiter(self, provider: str, api_key: Optional[str]) -> ProviderLimiter:
+        """Limitador compartilhado da API key no provedor"""
+        key = (provider, self._key_id(api_key))
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limit = self._key_limits.get(key) or self.limits.get(provider) or RateLimit()
+                limiter = self._limiters[key] = ProviderLimiter(provider, limit, self.retry, self.on_retry)
+            return limiter
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {f"{provider}:{key_id[:8]}": limiter.stats() for (provider, key_id), limiter in limiters.items()}
+
+
+_shared: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter() -> RateLimiter:
+    """RateLimiter do processo (criado na primeira chamada a partir do ambiente)"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimiter.from_env()
+        return _shared
@@ -0,0 +1,100 @@
+"""
+Roteamento de Modelos - Um modelo por nó, em níveis de latência, com fallback automático
+"""
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from dataclasses import dataclass, field
+from langchain_core.runnables.fallbacks import RunnableWithFallbacks
+
+
+HAIKU = "claude-3-haiku-20240307"
+HAIKU_35 = "claude-3-5-haiku-20241022"
+SONNET_35 = "claude-3-5-sonnet-20241022"
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """Modelo de um nó: nome, temperatura e limites de cada chamada"""
+    model: str
+    temperature: float = 0.3
+    timeout: Optional[float] = None  # Segundos por requisição (None = padrão do cliente)
+    max_retries: int = 0  # Novas tentativas do SDK; as do agente ficam em src/ratelimit.py
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """
+    Modelo principal de um nó e alternativas
+
+    Se o principal falhar por qualquer erro (sobrecarga, rate limit,
+    timeout), as alternativas são tentadas em ordem, na hora e sem espera.
+    Com alternativas, o principal deve ter um timeout curto, para o fallback
+    entrar logo. O limitador (src/ratelimit.py) só recebe o erro do último
+    modelo quando todos falham; só então pausa a API key (429/Retry-After)
+    e repete a rota com backoff.
+    """
+    primary: ModelSpec
+    fallbacks: Tuple[ModelSpec, ...] = ()
+
+
+@dataclass
+class RoutingProfile:
+    """Rota padrão e rotas específicas por nó (plan_research, search_web, ...)"""
+    name: str
+    default: ModelRoute
+    nodes: Dict[str, ModelRoute] = field(default_factory=dict)
+
+    def route(self, node: str) -> ModelRoute:
+        return self.nodes.get(node, self.default)
+
+
+_FAST = ModelRoute(ModelSpec(HAIKU, timeout=20), (ModelSpec(HAIKU_35, timeout=30),))
+
+# Perfis disponíveis (aceitos por nome no ResearchAgent e na API)
+ROUTING_PROFILES: Dict[str, RoutingProfile] = {
+    # Modelo rápido em todos os nós
+    "fast": RoutingProfile("fast", default=_FAST),
+    # Rápido no planejamento e na simulação; validação e síntese em modelos maiores
+    "balanced": RoutingProfile("balanced", default=_FAST, nodes={
+        "validate_information": ModelRoute(
+            ModelSpec(HAIKU_35, temperature=0.0, timeout=45),
+            (ModelSpec(HAIKU, temperature=0.0, timeout=45),)
+        ),
+        "synthesize_report": ModelRoute(
+            ModelSpec(SONNET_35, timeout=90),
+            (ModelSpec(HAIKU_35, timeout=60),)
+        )
+    }),
+    # Validação e síntese no modelo maior
+    "quality": RoutingProfile("quality", default=_FAST, nodes={
+        "validate_information": ModelRoute(
+            ModelSpec(SONNET_35, temperature=0.0, timeout=90),
+            (ModelSpec(HAIKU_35, temperature=0.0, timeout=60),)
+        ),
+        "synthesize_report": ModelRoute(
+            ModelSpec(SONNET_35, timeout=120),
+            (ModelSpec(HAIKU_35, timeout=60),)
+        )
+    })
+}
+
+
+def resolve_profile(profile: Union[str, RoutingProfile, None]) -> Optional[RoutingProfile]:
+    """Perfil pelo nome (ou o próprio perfil); None mantém o modelo único do agente"""
+    if profile is None or isinstance(profile, RoutingProfile):
+        return profile
+    if profile not in ROUTING_PROFILES:
+        raise ValueError(f"Perfil de roteamento desconhecido: {profile} (disponíveis: {', '.join(ROUTING_PROFILES)})")
+    return ROUTING_PROFILES[profile]
+
+
+def build_route(route: ModelRoute, factory: Callable[[ModelSpec], Any]) -> Any:
+    """Cliente do nó: o modelo principal, com as alternativas como fallback"""
+    primary = factory(route.primary)
+    if not route.fallbacks:
+        return primary
+    return primary.with_fallbacks([factory(spec) for spec in route.fallbacks])
+
+
+def primary_model(llm: Any) -> Any:
+    """Modelo principal de um cliente (desembrulha o fallback)"""
+    return llm.runnable if isinstance(llm, RunnableWithFallbacks) else llm
@@ -0,0 +1,333 @@
+"""
+Backends de Busca - Clientes reutilizáveis e execução concorrente de queries
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional, Protocol, Sequence, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+from langchain_core.runnables.config import ContextThreadPoolExecutor
+from .states import SearchResult
+import asyncio
+import time
+
+if TYPE_CHECKING:
+    from .cache import SearchCache
+    from .ratelimit import ProviderLimiter
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza o texto da query (caixa e espaços) para comparação"""
+    return " ".join(query.lower().split())
+
+
+def pending_queries(queries: Sequence[str], executed: Sequence[str]) -> List[str]:
+    """
+    Filtra as queries que ainda não foram executadas
+
+    Remove duplicatas (após normalização) mantendo a ordem original.
+    """
+    seen = {normalize_query(q) for q in executed}
+    pending = []
+    for query in queries:
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            pending.append(query)
+    return pending
+
+
+@dataclass
+class QueryOutcome:
+    """Resultado da execução de uma query de busca"""
+    query: str
+    results: List[SearchResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    error: Optional[Exception] = None
+    cached: bool = False
+    shared: bool = False  # Reaproveitada de outra pesquisa do mesmo lote
+
+
+class SearchBackend(Protocol):
+    """
+    Interface dos backends de busca do search_web
+
+    search_depth e max_results entram na chave do cache de buscas e da
+    deduplicação do lote; name aparece no log de mensagens. Implementações:
+    TavilySearch (web) e LocalCorpusSearch (documentos locais, src/corpus.py).
+    """
+    name: str
+    search_depth: str
+    max_results: int
+
+    def search(self, query: str) -> List[SearchResult]: ...
+
+    async def asearch(self, query: str) -> List[SearchResult]: ...
+
+
+class TavilySearch:
+    """
+    Cliente Tavily com conexões HTTP reutilizadas
+
+    Mantém um único cliente síncrono (requests.Session) e um cliente
+    assíncrono (httpx.AsyncClient) durante toda a vida do agente, evitando
+    um novo handshake TLS a cada busca. Com limiter, cada busca respeita o
+    limite de taxa da key e é repetida em erros transitórios (429, 5xx).
+    """
+
+    name = "Tavily API"
+
+    def __init__(
+        self,
+        api_key: str,
+        search_depth: str = "basic",
+        max_results: int = 3,
+        limiter: Optional["ProviderLimiter"] = None
+    ):
+        # Import tardio: se tavily-python não estiver instalado o chamador cai na simulação
+        from tavily import TavilyClient
+
+        self.api_key = api_key
+        self.search_depth = search_depth
+        self.max_results = max_results
+        self.limiter = limiter
+        self._client = TavilyClient(api_key=api_key)
+        self._async_client = None
+        self._async_loop = None
+
+    def _get_async_client(self):
+        """Retorna o cliente assíncrono do event loop atual (conexões são presas ao loop)"""
+        from tavily import AsyncTavilyClient
+
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = AsyncTavilyClient(api_key=self.api_key)
+            self._async_loop = loop
+        return self._async_client
+
+    def close(self):
+        """Fecha as conexões do cliente síncrono"""
+        session = getattr(self._client, "session", None)
+        if session is not None:
+            session.close()
+
+    def search(self, query: str) -> List[SearchResult]:
+        """Executa uma busca síncrona"""
+        call = lambda: self._client.search(
+            query=query,
+            search_depth=self.search_depth,
+            max_results=self.max_results
+        )
+        response = self.limiter.call(call) if self.limiter else call()
+        return self._to_results(query, response)
+
+    async def asearch(self, query: str) -> List[SearchResult]:
+        """Executa uma busca assíncrona"""
+        call = lambda: self._get_async_client().search(
+            query=query,
+            search_depth=self.search_depth,
+            max_results=self.max_results
+        )
+        response = await (self.limiter.acall(call) if self.limiter else call())
+        return self._to_results(query, response)
+
+    @staticmethod
+    def _to_results(query: str, response: dict) -> List[SearchResult]:
+        """Converte a resposta do Tavily em SearchResult"""
+        return [
+            SearchResult(
+                source=item.get('url', 'N/A'),
+                title=item.get('title', query),
+                content=item.get('content', ''),
+                relevance_score=item.get('score', 0.5),
+                timestamp=datetime.now().isoformat()
+            )
+            for item in response.get('results', [])
+        ]
+
+
+def _from_cache(backend, queries: Sequence[str], cache: Optional["SearchCache"]) -> Tuple[Dict[str, QueryOutcome], List[str]]:
+    """Separa as queries já em cache das que precisam ir ao backend"""
+    outcomes: Dict[str, QueryOutcome] = {}
+    misses: List[str] = []
+
+    for query in dict.fromkeys(queries):
+        cached = None
+        if cache is not None:
+            cached = cache.get_results(query, backend.search_depth, backend.max_results)
+        if cached is None:
+            misses.append(query)
+        else:
+            outcomes[query] = QueryOutcome(query=query, results=cached, cached=True)
+
+    return outcomes, misses
+
+
+def _to_cache(backend, outcomes: Sequence[QueryOutcome], cache: Optional["SearchCache"]):
+    """Armazena no cache as buscas bem-sucedidas"""
+    if cache is None:
+        return
+    for outcome in outcomes:
+        if outcome.error is None:
+            cache.set_results(outcome.query, backend.search_depth, backend.max_results, outcome.results)
+
+
+async def _afrom_cache(backend, queries: Sequence[str], cache: Optional["SearchCache"]):
+    """Versão assíncrona de _from_cache(): com camada em disco, o SQLite roda numa thread"""
+    if cache is not None and cache.blocking:
+        return await asyncio.to_thread(_from_cache, backend, queries, cache)
+    return _from_cache(backend, queries, cache)
+
+
+async def _ato_cache(backend, outcomes: Sequence[QueryOutcome], cache: Optional["SearchCache"]):
+    """Versão assíncrona de _to_cache()"""
+    if cache is not None and cache.blocking:
+        await asyncio.to_thread(_to_cache, backend, outcomes, cache)
+    else:
+        _to_cache(backend, outcomes, cache)
+
+
+def _timed_search(backend, query: str) -> QueryOutcome:
+    """Executa uma busca medindo o tempo e capturando erros"""
+    start = time.perf_counter()
+    try:
+        results = backend.search(query)
+        return QueryOutcome(query=query, results=results, elapsed=time.perf_counter() - start)
+    except Exception as e:
+        return QueryOutcome(query=query, elapsed=time.perf_counter() - start, error=e)
+
+
+def search_many(
+    backend,
+    queries: Sequence[str],
+    max_concurrency: int = 5,
+    cache: Optional["SearchCache"] = None
+) -> List[QueryOutcome]:
+    """
+    Executa várias queries em paralelo (threads) com limite de concorrência
+
+    Args:
+        backend: Objeto com search(query), search_depth e max_results
+        queries: Queries a executar
+        max_concurrency: Máximo de buscas simultâneas
+        cache: Cache consultado antes do backend (opcional)
+
+    Returns:
+        Lista de QueryOutcome na mesma ordem das queries
+    """
+    outcomes, misses = _from_cache(backend, queries, cache)
+
+    if misses:
+        workers = max(1, min(max_concurrency, len(misses)))
+        # As threads herdam o contexto da execução (eventos de novas tentativas do limitador)
+        with ContextThreadPoolExecutor(max_workers=workers) as pool:
+            fetched = list(pool.map(lambda q: _timed_search(backend, q), misses))
+        _to_cache(backend, fetched, cache)
+        outcomes.update((o.query, o) for o in fetched)
+
+    return [outcomes[q] for q in queries]
+
+
+async def asearch_many(
+    backend,
+    queries: Sequence[str],
+    max_concurrency: int = 5,
+    cache: Optional["SearchCache"] = None
+) -> List[QueryOutcome]:
+    """
+    Executa várias queries de forma assíncrona com limite de concorrência
+
+    Args:
+        backend: Objeto com asearch(query), search_depth e max_results
+        queries: Queries a executar
+        max_concurrency: Máximo de buscas simultâneas
+        cache: Cache consultado antes do backend (opcional)
+
+    Returns:
+        Lista de QueryOutcome na mesma ordem das queries
+    """
+    outcomes, misses = await _afrom_cache(backend, queries, cache)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(query: str) -> QueryOutcome:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                results = await backend.asearch(query)
+                return QueryOutcome(query=query, results=results, elapsed=time.perf_counter() - start)
+            except Exception as e:
+                return QueryOutcome(query=query, elapsed=time.perf_counter() - start, error=e)
+
+    if misses:
+        fetched = list(await asyncio.gather(*(run(q) for q in misses)))
+        await _ato_cache(backend, fetched, cache)
+        outcomes.update((o.query, o) for o in fetched)
+
+    return [outcomes[q] for q in queries]
+
+
+class SharedSearches:
+    """
+    Buscas compartilhadas por um lote de pesquisas (ResearchAgent.abatch_research)
+
+    Cada query distinta (após normalização) vai ao backend uma única vez
+    durante o lote: pesquisas que planejam a mesma busca aguardam a mesma
+    execução ou reaproveitam o resultado já obtido. Todas as buscas do lote
+    dividem um único limite de concorrência.
+    """
+
+    def __init__(self, max_concurrency: int = 5):
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._outcomes: Dict[Tuple[str, str, int], "asyncio.Future[QueryOutcome]"] = {}
+        self.requested = 0
+        self.executed = 0
+
+    async def _run(self, backend, query: str, cache: Optional["SearchCache"]) -> QueryOutcome:
+        outcomes, misses = await _afrom_cache(backend, [query], cache)
+        if not misses:
+            return outcomes[query]
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self.executed += 1
+            start = time.perf_counter()
+            try:
+                results = await backend.asearch(query)
+                outcome = QueryOutcome(query=query, results=results, elapsed=time.perf_counter() - start)
+            except Exception as e:
+                outcome = QueryOutcome(query=query, elapsed=time.perf_counter() - start, error=e)
+        await _ato_cache(backend, [outcome], cache)
+        return outcome
+
+    async def asearch_many(
+        self,
+        backend,
+        queries: Sequence[str],
+        cache: Optional["SearchCache"] = None
+    ) -> List[QueryOutcome]:
+        """
+        Mesmo contrato de asearch_many(), deduplicando contra todo o lote
+
+        Returns:
+            Lista de QueryOutcome na mesma ordem das queries (shared=True nas
+            que vieram de outra pesquisa do lote)
+        """
+        pending = []
+        for query in queries:
+            self.requested += 1
+            key = (normalize_query(query), backend.search_depth, backend.max_results)
+            owner = key not in self._outcomes
+            if owner:
+                self._outcomes[key] = asyncio.ensure_future(self._run(backend, query, cache))
+            pending.append((query, owner, self._outcomes[key]))
+
+        outcomes = []
+        for query, owner, future in pending:
+            outcome = await asyncio.shield(future)
+            if not owner:
+                outcome = QueryOutcome(query=query, results=outcome.results, error=outcome.error, shared=True)
+            outcomes.append(outcome)
+        return outcomes
+
+    def stats(self) -> Dict[str, int]:
+        return {"requested": self.requested, "executed": self.executed, "shared": self.requested - len(self._outcomes)}
@@ -0,0 +1,182 @@
+"""
+Repositório de Fontes - Conteúdo das fontes guardado uma vez por execução, endereçado por hash
+
+O estado do grafo carrega apenas SourceHandle (slot, URL, score e hash); o
+texto completo fica aqui e é resolvido sob demanda pelos prompts de
+validação e síntese. Assim, reducers, nós e checkpoints copiam handles
+pequenos, e a memória cresce com o número de fontes distintas, não com
+iterações × nós.
+"""
+from typing import Dict, Iterable, List, Optional, Union
+from .dedup import Fingerprint, content_fingerprint
+from .states import SearchResult, SourceHandle
+import hashlib
+import sqlite3
+import threading
+
+
+def content_hash(content: str) -> str:
+    """Hash do conteúdo de uma fonte (chave do repositório)"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class SourceStore:
+    """
+    Repositório em memória do conteúdo das fontes de uma execução
+
+    Cada conteúdo distinto ocupa um slot; fontes com o mesmo texto
+    compartilham o slot. Seguro para uso concorrente (threads e tarefas).
+    """
+
+    # Se put()/content() fazem I/O bloqueante (os nós assíncronos usam uma thread)
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self._contents: List[Optional[str]] = []
+        # Fingerprints de deduplicação por hash de conteúdo (calculados uma vez)
+        self._fingerprints: Dict[str, Fingerprint] = {}
+
+    def put(self, result: SearchResult) -> SourceHandle:
+        """Guarda o conteúdo (se ainda não existir) e devolve o handle da fonte"""
+        digest = content_hash(result.content)
+        with self._lock:
+            slot = self._slots.get(digest)
+            if slot is None:
+                slot = self._store(digest, result.content)
+        return SourceHandle(
+            slot=slot,
+            source=result.source,
+            title=result.title,
+            relevance_score=result.relevance_score,
+            content_hash=digest,
+            timestamp=result.timestamp
+        )
+
+    def add(self, results: Iterable[Union[SourceHandle, SearchResult]]) -> List[SourceHandle]:
+        """Guarda os resultados (handles já guardados passam direto)"""
+        return [r if isinstance(r, SourceHandle) else self.put(r) for r in results]
+
+    def _store(self, digest: str, content: str) -> int:
+        self._contents.append(content)
+        self._slots[digest] = len(self._contents) - 1
+        return self._slots[digest]
+
+    def _load(self, slot: int) -> Optional[str]:
+        """Conteúdo de um slot ausente da memória (só existe no repositório persistente)"""
+        return None
+
+    def content(self, handle: SourceHandle) -> str:
+        """Texto completo de uma fonte"""
+        with self._lock:
+            # O hash é a referência confiável (o slot só vale no repositório de origem)
+            slot = self._slots.get(handle.content_hash)
+            content = self._contents[slot] if slot is not None else None
+            if slot is not None and content is None:
+                content = self._contents[slot] = self._load(slot)
+
+        if content is None:
+            raise KeyError(f"Fonte não encontrada no repositório: {handle.source} ({handle.content_hash[:12]})")
+        return content
+
+    def fingerprint(self, item: Union[SourceHandle, SearchResult]) -> Fingerprint:
+        """
+        Fingerprint de deduplicação de uma fonte, calculado uma vez por conteúdo
+
+        Handles de fontes já conhecidas não precisam ter o texto resolvido
+        (nem relido do banco) a cada rodada de busca.
+        """
+        digest = item.content_hash if isinstance(item, SourceHandle) else content_hash(item.content)
+        with self._lock:
+            cached = self._fingerprints.get(digest)
+        if cached is None:
+            text = self.content(item) if isinstance(item, SourceHandle) else item.content
+            cached = content_fingerprint(text)
+            with self._lock:
+                self._fingerprints[digest] = cached
+        return cached
+
+    def resolve(self, item: Union[SourceHandle, SearchResult]) -> SearchResult:
+        """SearchResult completo de um handle (SearchResult já completos passam direto)"""
+        if isinstance(item, SearchResult):
+            return item
+        return SearchResult(
+            source=item.source,
+            title=item.title,
+            content=self.content(item),
+            relevance_score=item.relevance_score,
+            timestamp=item.timestamp
+        )
+
+    def resolve_all(self, items: Iterable[Union[SourceHandle, SearchResult]]) -> List[SearchResult]:
+        return [self.resolve(item) for item in items]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            loaded = [c for c in self._contents if c is not None]
+            return {"sources": len(self._slots), "loaded": len(loaded), "chars": sum(len(c) for c in loaded)}
+
+
+class SQLiteSourceStore(SourceStore):
+    """
+    Repositório de fontes de uma execução persistido em SQLite
+
+    Usado com checkpoints: uma execução retomada (mesmo em outro processo)
+    resolve os handles salvos no estado. Ao abrir, carrega apenas o índice
+    hash → slot; cada conteúdo é lido do banco na primeira vez que é pedido.
+    """
+
+    blocking = True
+
+    def __init__(self, conn: sqlite3.Connection, run_id: str, lock: Optional[threading.Lock] = None):
+        super().__init__()
+        self.conn = conn
+        self.run_id = run_id
+        # Mesma trava do SqliteSaver quando a conexão é compartilhada
+        self._db_lock = lock or threading.Lock()
+
+        with self._db_lock:
+            rows = conn.execute(
+                "SELECT content_hash, slot FROM research_sources WHERE run_id = ? ORDER BY slot",
+                (run_id,)
+            ).fetchall()
+        for digest, slot in rows:
+            self._slots[digest] = slot
+        self._contents = [None] * len(rows)
+
+    @staticmethod
+    def setup(conn: sqlite3.Connection):
+        """Cria a tabela de fontes (idempotente)"""
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS research_sources (
+                run_id TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (run_id, slot),
+                UNIQUE (run_id, content_hash)
+            )"""
+        )
+        conn.commit()
+
+    def _store(self, digest: str, content: str) -> int:
+        slot = super()._store(digest, content)
+        with self._db_lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO research_sources (run_id, slot, content_hash, content) VALUES (?, ?, ?, ?)",
+                (self.run_id, slot, digest, content)
+            )
+            self.conn.commit()
+        return slot
+
+    def _load(self, slot: int) -> Optional[str]:
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT content FROM research_sources WHERE run_id = ? AND slot = ?",
+                (self.run_id, slot)
+            ).fetchone()
+        return row[0] if row else None
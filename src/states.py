@@ -2,7 +2,7 @@
 Estados do Agente Pesquisador
 Define a estrutura de dados que flui pelo grafo
 """
-from typing import List, Dict, Optional, Annotated
+from typing import Any, List, Dict, Optional, Annotated
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 import operator
@@ -17,6 +17,21 @@ class SearchResult(BaseModel):
     timestamp: str = Field(default="", description="Timestamp da busca")
 
 
+class SourceHandle(BaseModel):
+    """
+    Referência compacta a uma fonte guardada no SourceStore da execução
+
+    O estado carrega handles em vez do conteúdo completo; o texto é obtido
+    pelo content_hash (src/sources.py) quando um prompt precisa dele.
+    """
+    slot: int = Field(description="Posição do conteúdo no repositório da execução")
+    source: str = Field(description="URL ou nome da fonte")
+    title: str = Field(default="", description="Título do conteúdo")
+    relevance_score: float = Field(default=0.0, description="Score de relevância (0-1)")
+    content_hash: str = Field(description="SHA-256 do conteúdo")
+    timestamp: str = Field(default="", description="Timestamp da busca")
+
+
 class ValidationResult(BaseModel):
     """Resultado da validação de uma informação"""
     claim: str = Field(description="Afirmação sendo validada")
@@ -27,6 +42,52 @@ class ValidationResult(BaseModel):
     reasoning: str = Field(default="", description="Raciocínio da validação")
 
 
+def merge_search_results(left: List[SourceHandle], right: List[SourceHandle]) -> List[SourceHandle]:
+    """
+    Reducer de search_results: adiciona resultados novos e substitui,
+    na mesma posição, os que têm a mesma fonte (ex.: score atualizado)
+    """
+    merged = list(left)
+    index = {r.source: i for i, r in enumerate(merged)}
+    for result in right:
+        if result.source in index:
+            merged[index[result.source]] = result
+        else:
+            index[result.source] = len(merged)
+            merged.append(result)
+    return merged
+
+
+def claim_key(claim: str) -> str:
+    """Chave de comparação de uma afirmação (caixa, espaços e pontuação final)"""
+    return " ".join(claim.lower().split()).rstrip(".;:!")
+
+
+def merge_validations(left: List[ValidationResult], right: List[ValidationResult]) -> List[ValidationResult]:
+    """
+    Reducer de validations: afirmações novas são adicionadas; afirmações já
+    existentes (mesmo texto) são atualizadas com a nova confiança, e as
+    fontes de suporte das duas versões são unidas
+    """
+    merged = list(left)
+    index = {claim_key(v.claim): i for i, v in enumerate(merged)}
+    for validation in right:
+        key = claim_key(validation.claim)
+        if key not in index:
+            index[key] = len(merged)
+            merged.append(validation)
+            continue
+
+        previous = merged[index[key]]
+        sources = list(dict.fromkeys(previous.supporting_sources + validation.supporting_sources))
+        merged[index[key]] = validation.model_copy(update={
+            "claim": previous.claim,
+            "supporting_sources": sources,
+            "conflicting_info": validation.conflicting_info or previous.conflicting_info
+        })
+    return merged
+
+
 class ResearchState(TypedDict):
     """
     Estado global do agente de pesquisa
@@ -38,11 +99,15 @@ class ResearchState(TypedDict):
     max_iterations: int
 
     # Resultados de busca
-    search_results: Annotated[List[SearchResult], operator.add]
+    search_results: Annotated[List[SourceHandle], merge_search_results]  # Conteúdo no SourceStore
     search_queries: Annotated[List[str], operator.add]
+    executed_queries: Annotated[List[str], operator.add]  # Queries já executadas (busca incremental)
+    latest_search: Dict[str, int]  # Última rodada de busca: queries, fontes obtidas e fontes novas
 
     # Validação
-    validations: Annotated[List[ValidationResult], operator.add]
+    validations: Annotated[List[ValidationResult], merge_validations]
+    validated_sources: Annotated[List[str], operator.add]  # Fontes já analisadas (validação incremental)
+    latest_validations: List[ValidationResult]  # Validações da última passada
     conflicts_detected: bool
 
     # Síntese final
@@ -51,8 +116,9 @@ class ResearchState(TypedDict):
     confidence_level: float
 
     # Controle de fluxo
-    current_iteration: int
+    current_iteration: int  # Iterações de refinamento já iniciadas
     needs_more_research: bool
+    iteration_metrics: Annotated[List[Dict[str, Any]], operator.add]  # Métricas e decisão de cada rodada
     error: Optional[str]
 
     # Mensagens intermediárias (para debug)
@@ -0,0 +1,190 @@
+"""
+Validação - Saída estruturada, parsing incremental das respostas e validação map-reduce
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple, TypeVar
+from pydantic import BaseModel, Field, ValidationError
+from langchain_core.utils.json import parse_partial_json
+from .states import ValidationResult, claim_key
+import json
+import re
+
+
+T = TypeVar("T")
+
+
+def clean_json_string(json_str: str) -> str:
+    """
+    Limpa string JSON removendo caracteres de controle inválidos
+    """
+    # Remove caracteres de controle (exceto \n, \r, \t que são válidos quando escapados)
+    # Remove controle characters ASCII (0-31) exceto os permitidos
+    cleaned = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', json_str)
+    return cleaned
+
+
+def extract_validation_data(raw_content: str) -> Dict[str, Any]:
+    """
+    Extrai o JSON de validação da resposta do LLM
+
+    Raises:
+        json.JSONDecodeError: se a resposta não contiver JSON válido
+    """
+    content = raw_content.strip()
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0].strip()
+
+    # Limpa caracteres de controle inválidos
+    return json.loads(clean_json_string(content), strict=False)
+
+
+class ValidationReport(BaseModel):
+    """Registra as afirmações identificadas nas fontes e o resultado da validação cruzada"""
+    validations: List[ValidationResult] = Field(description="Afirmações validadas, na ordem em que foram analisadas")
+    conflicts_detected: bool = Field(description="Se as fontes se contradizem em algum ponto")
+    summary: str = Field(default="", description="Resumo da validação")
+
+
+class ValidationStreamParser:
+    """
+    Parser incremental da resposta de validação (JSON de ValidationReport)
+
+    Recebe o texto em trechos (argumentos da tool em streaming ou texto
+    livre, com ou sem bloco ```json) e devolve cada afirmação assim que o
+    objeto dela fecha no array "validations". Uma resposta truncada (ex.:
+    limite de tokens) mantém as afirmações completas até o corte.
+    """
+
+    _ARRAY_START = re.compile(r'"validations"\s*:\s*\[')
+
+    def __init__(self):
+        self.text = ""
+        self.validations: List[ValidationResult] = []
+        self.invalid = 0  # Itens completos que não formam um ValidationResult
+        self.complete = False
+        self._pos: Optional[int] = None  # Próximo item do array (None = array ainda não encontrado)
+        self._array_closed = False
+        # strict=False aceita quebras de linha cruas dentro das strings
+        self._decoder = json.JSONDecoder(strict=False)
+
+    def feed(self, chunk: str) -> List[ValidationResult]:
+        """Acrescenta um trecho e retorna as afirmações que ficaram completas"""
+        self.text += clean_json_string(chunk)
+        if self._pos is None:
+            match = self._ARRAY_START.search(self.text)
+            if match is None:
+                return []
+            self._pos = match.end()
+
+        new: List[ValidationResult] = []
+        while not self._array_closed:
+            pos = self._pos
+            while pos < len(self.text) and self.text[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(self.text):
+                break
+            if self.text[pos] == "]":
+                self._array_closed = True
+                self._pos = pos + 1
+                break
+            try:
+                item, end = self._decoder.raw_decode(self.text, pos)
+            except json.JSONDecodeError:
+                break  # Item ainda incompleto: espera o próximo trecho
+            self._pos = end
+            try:
+                new.append(ValidationResult(**item))
+            except (TypeError, ValidationError):
+                self.invalid += 1
+
+        self.validations.extend(new)
+        return new
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Fecha o parsing: dados completos da validação
+
+        Se o JSON inteiro não fecha (resposta truncada), usa as afirmações
+        completas e o que houver de conflicts_detected/summary; sem
+        conflicts_detected, há conflito se alguma afirmação o descreve.
+
+        Raises:
+            json.JSONDecodeError: se nenhuma afirmação pôde ser aproveitada
+        """
+        try:
+            data = extract_validation_data(self.text)
+            self.complete = isinstance(data, dict)
+        except json.JSONDecodeError:
+            if not self.validations:
+                raise
+            start = self.text.find("{")
+            data = parse_partial_json(self.text[start:]) if start >= 0 else None
+
+        data = data if isinstance(data, dict) else {}
+        return {
+            "validations": self.validations,
+            "conflicts_detected": bool(data.get(
+                "conflicts_detected", any(v.conflicting_info for v in self.validations)
+            )),
+            "summary": data.get("summary") or "Validação completa",
+            "complete": self.complete
+        }
+
+
+def parse_validation(raw_content: str) -> Dict[str, Any]:
+    """Interpreta uma resposta de validação já completa (ver ValidationStreamParser.finish)"""
+    parser = ValidationStreamParser()
+    parser.feed(raw_content)
+    return parser.finish()
+
+
+def shard(items: Sequence[T], shard_size: int) -> List[List[T]]:
+    """Divide uma sequência em fragmentos de até shard_size itens"""
+    size = max(1, shard_size)
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def reduce_shard_validations(shards: Sequence[List[ValidationResult]]) -> Tuple[List[ValidationResult], bool]:
+    """
+    Etapa reduce da validação em fragmentos
+
+    Afirmações repetidas entre fragmentos são fundidas: fontes unidas e
+    confiança média. Se os fragmentos discordam sobre a validade de uma
+    afirmação, ela é marcada como não validada com o conflito descrito.
+
+    Returns:
+        Tupla (validações fundidas, se houve discordância entre fragmentos)
+    """
+    groups: Dict[str, List[ValidationResult]] = {}
+    for validations in shards:
+        for validation in validations:
+            groups.setdefault(claim_key(validation.claim), []).append(validation)
+
+    merged: List[ValidationResult] = []
+    disagreement = False
+    for versions in groups.values():
+        first = versions[0]
+        if len(versions) == 1:
+            merged.append(first)
+            continue
+
+        verdicts = {v.is_validated for v in versions}
+        conflicting_info = "; ".join(dict.fromkeys(v.conflicting_info for v in versions if v.conflicting_info)) or None
+        if len(verdicts) > 1:
+            disagreement = True
+            conflicting_info = "; ".join(filter(None, [
+                "Fragmentos de fontes divergem sobre esta afirmação",
+                conflicting_info
+            ]))
+
+        merged.append(ValidationResult(
+            claim=first.claim,
+            is_validated=all(v.is_validated for v in versions),
+            confidence=sum(v.confidence for v in versions) / len(versions),
+            supporting_sources=list(dict.fromkeys(s for v in versions for s in v.supporting_sources)),
+            conflicting_info=conflicting_info,
+            reasoning=" | ".join(dict.fromkeys(v.reasoning for v in versions if v.reasoning))
+        ))
+
+    return merged, disagreement
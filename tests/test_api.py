@@ -0,0 +1,96 @@
+"""
+Testes dos endpoints do backend FastAPI (backends falsos registrados no pool de clientes)
+"""
+from fastapi.testclient import TestClient
+from backend.coalesce import SingleFlight
+from benchmarks.run import API_CREDENTIALS, load_api, parse_args
+import json
+import pytest
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    args = parse_args(["--llm-latency", "0", "--search-latency", "0"])
+    return load_api(args, str(tmp_path_factory.mktemp("api")))
+
+
+def _request(query: str, **extra) -> dict:
+    return {"query": query, "max_iterations": 1, **API_CREDENTIALS, **extra}
+
+
+def _sse_events(body: str) -> list:
+    """(evento, dados) de cada bloco "event: ...\\ndata: ..." do stream"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _stream(api, query: str) -> list:
+    client = TestClient(api.app)
+    with client.stream("POST", "/research/stream", json=_request(query)) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return _sse_events("".join(response.iter_text()))
+
+
+def test_grace_window_reuses_completed_runs_but_not_failures(api, monkeypatch):
+    """Requisições idênticas em sequência, dentro da janela, executam o grafo uma vez; falhas não são reaproveitadas"""
+    monkeypatch.setattr(api, "research_flights", SingleFlight(grace=60))
+    runs = []
+    aresearch = api.agent.aresearch
+
+    async def counted(query, max_iterations, client_key, routing_profile=None):
+        runs.append(query)
+        if query.startswith("falha"):
+            client_key = "expirada"  # Credenciais fora do pool: a execução termina com erro
+        return await aresearch(query=query, max_iterations=max_iterations, client_key=client_key, routing_profile=routing_profile)
+
+    monkeypatch.setattr(api.agent, "aresearch", counted)
+    client = TestClient(api.app)
+
+    first = client.post("/research", json=_request("consulta repetida"))
+    second = client.post("/research", json=_request("Consulta  repetida"))
+    assert first.status_code == second.status_code == 200
+    assert not first.json()["full_state"].get("error")
+    assert second.json()["report"] == first.json()["report"]
+    assert runs == ["consulta repetida"]
+
+    failed = [client.post("/research", json=_request("falha na execução")).json() for _ in range(2)]
+    assert all(f["full_state"]["error"] for f in failed)
+    assert runs == ["consulta repetida", "falha na execução", "falha na execução"]
+    assert api.research_flights.stats()["grace_hits"] == 1
+
+
+def test_stream_emits_start_progress_tokens_and_done(api):
+    """O SSE abre com start, transmite nós e tokens do relatório e fecha com done"""
+    events = _stream(api, "consulta transmitida")
+    names = [name for name, _ in events]
+
+    assert names[0] == "start" and names[-1] == "done"
+    assert set(names[1:-1]) <= {"node", "claim", "token"}
+    assert names.index("node") < names.index("token")
+    assert [data["node"] for name, data in events if name == "node"][0] == "plan_research"
+
+    tokens = "".join(data["content"] for name, data in events if name == "token")
+    result = events[-1][1]["result"]
+    assert tokens.startswith("# Relatório")
+    assert result["query"] == "consulta transmitida" and result["report"]
+
+
+def test_stream_reports_failures_as_error_event(api, monkeypatch):
+    """Uma execução que falha termina o stream com o evento error e o resultado de erro"""
+    astream_research = api.agent.astream_research
+
+    def failing(query, max_iterations, client_key, routing_profile=None):
+        # Credenciais fora do pool: o primeiro nó falha
+        return astream_research(query, max_iterations, "expirada", routing_profile=routing_profile)
+
+    monkeypatch.setattr(api.agent, "astream_research", failing)
+    events = _stream(api, "consulta com falha")
+
+    assert [name for name, _ in events] == ["start", "error"]
+    error = events[-1][1]
+    assert error["type"] == "RuntimeError"
+    assert error["result"]["full_state"]["error"] and error["result"]["query"] == "consulta com falha"
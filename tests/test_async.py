@@ -0,0 +1,49 @@
+"""
+Paridade entre os caminhos síncrono (invoke) e assíncrono (ainvoke/astream) do grafo
+"""
+from benchmarks.run import build_agent, parse_args
+import asyncio
+
+
+def _summary(result):
+    state = result["full_state"]
+    return {
+        "report": result["report"],
+        "confidence": result["confidence"],
+        "references": result["references"],
+        "iterations": result["iterations"],
+        "search_queries": state["search_queries"],
+        "executed_queries": state["executed_queries"],
+        "sources": [r.source if hasattr(r, "source") else r["source"] for r in state["search_results"]],
+        "claims": [v.claim if hasattr(v, "claim") else v["claim"] for v in state["validations"]],
+        "decisions": [(m["decision"], m["reason"]) for m in state["iteration_metrics"]]
+    }
+
+
+def test_async_graph_matches_sync_graph():
+    """ainvoke e astream percorrem os mesmos nós e chegam ao mesmo resultado que invoke"""
+    # Duas iterações: exercita também refine_queries e o laço de decisão
+    args = parse_args(["--iterations", "2", "--llm-latency", "0", "--search-latency", "0"])
+    agent = build_agent(args)
+    agent.nodes.llm.claims_per_validation = 1  # Poucas afirmações: força a iteração extra
+    query = "Como funciona o consenso em sistemas distribuídos?"
+
+    sync_result = agent.research(query)
+
+    async def run():
+        result = await agent.aresearch(query)
+        events = [event async for event in agent.astream_research(query)]
+        return result, events
+
+    async_result, events = asyncio.run(run())
+    streamed = events[-1]
+
+    assert not sync_result["full_state"].get("error")
+    assert sync_result["iterations"] >= 1 and "refine_queries" in sync_result["timings"]["nodes"]
+    assert _summary(async_result) == _summary(sync_result)
+
+    assert streamed["event"] == "done"
+    assert _summary(streamed["result"]) == _summary(sync_result)
+    nodes = [e["node"] for e in events if e["event"] == "node"]
+    assert nodes[0] == "plan_research" and nodes[-1] == "synthesize_report"
+    assert set(nodes) == set(sync_result["timings"]["nodes"])
@@ -0,0 +1,69 @@
+"""
+Testes do lote de pesquisas com buscas compartilhadas
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agent import ResearchAgent
+from src.search import SharedSearches
+from src.states import SearchResult
+import asyncio
+
+
+class CountingSearch:
+    """Backend de busca que conta chamadas e a concorrência máxima"""
+    search_depth = "basic"
+    max_results = 1
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    async def asearch(self, query):
+        self.calls.append(query)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return [SearchResult(source=f"https://exemplo.com/{query.replace(' ', '-')}", title=query, content=f"conteúdo sobre {query}")]
+
+
+def test_shared_searches_run_each_distinct_query_once():
+    backend = CountingSearch()
+    shared = SharedSearches(max_concurrency=2)
+
+    async def run():
+        return await asyncio.gather(
+            shared.asearch_many(backend, ["raft", "paxos", "zab"]),
+            shared.asearch_many(backend, ["Raft ", "consenso"])
+        )
+
+    first, second = asyncio.run(run())
+
+    assert sorted(backend.calls) == ["consenso", "paxos", "raft", "zab"]
+    assert backend.peak <= 2
+    assert [o.shared for o in second] == [True, False]
+    assert second[0].query == "Raft " and second[0].results == first[0].results
+    assert shared.stats() == {"requested": 5, "executed": 4, "shared": 1}
+
+
+def test_batch_dedupes_questions_and_searches():
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0)
+    agent.nodes.llm = FakeListChatModel(responses=["busca comum\nbusca extra"])
+    backend = CountingSearch()
+    agent.nodes._search_client = backend
+    agent.nodes._tavily_available = True
+
+    async def run():
+        return [e async for e in agent.abatch_research(["Pergunta A", "pergunta  a", "Pergunta B"], concurrency=2)]
+
+    events = asyncio.run(run())
+    results = [e for e in events if e["event"] == "result"]
+    summary = events[-1]
+
+    assert sorted(e["index"] for e in results) == [0, 1, 2]
+    assert all(not e["result"]["full_state"].get("error") for e in results)
+    assert summary["event"] == "summary" and summary["runs"] == 2
+    # Duas pesquisas planejaram as mesmas duas buscas: cada uma rodou uma vez
+    assert sorted(backend.calls) == ["busca comum", "busca extra"]
+    assert summary["searches"] == {"requested": 4, "executed": 2, "shared": 2}
@@ -0,0 +1,34 @@
+"""
+Testes da suíte de benchmarks offline (backends falsos, sem acesso à rede)
+"""
+from benchmarks.fakes import FakeSearch, generate_text
+from benchmarks.run import parse_args, percentile, run_agent, build_agent, run_level
+
+
+def test_fakes_are_deterministic_and_sized():
+    assert generate_text("semente", 500) == generate_text("semente", 500)
+    assert len(generate_text("semente", 500)) == 500
+
+    results = FakeSearch(latency=0, results_per_query=4, content_chars=300).search("query")
+    assert len(results) == 4
+    assert all(len(r.content) == 300 for r in results)
+
+
+def test_percentile_interpolates():
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([], 90) == 0.0
+
+
+def test_agent_level_reports_latency_nodes_and_memory():
+    """Um nível pequeno roda o grafo inteiro com os falsos, sem erros"""
+    args = parse_args(["--min-runs", "3", "--llm-latency", "0", "--search-latency", "0"])
+    agent = build_agent(args)
+
+    report = run_level("agent", lambda queries, c: run_agent(agent, queries, c), 2, args)
+
+    assert report["runs"] == 3
+    assert report["errors"] == 0
+    assert report["latency_seconds"]["p50"] <= report["latency_seconds"]["max"]
+    assert set(report["node_seconds"]) == {"plan_research", "search_web", "validate_information", "decide_next_step", "synthesize_report"}
+    assert report["peak_memory_mb"] > 0
@@ -0,0 +1,165 @@
+"""
+Testes dos caches de busca e de respostas do LLM (sem acesso à rede)
+"""
+import asyncio
+import threading
+import time
+from langchain_core.messages import HumanMessage, SystemMessage
+from benchmarks.fakes import FakeSearch
+from src.cache import LLMCache, LRUStore, SearchCache, SQLiteStore
+from src.search import SharedSearches, asearch_many
+from src.states import SearchResult
+
+
+def _results():
+    return [
+        SearchResult(source="https://exemplo.com/a", title="A", content="conteúdo A", relevance_score=0.9),
+        SearchResult(source="https://exemplo.com/b", title="B", content="conteúdo B", relevance_score=0.4)
+    ]
+
+
+def test_lru_evicts_least_recently_used():
+    """O LRU descarta a entrada menos usada ao passar do limite"""
+    store = LRUStore(max_entries=2)
+    store.set("a", "1")
+    store.set("b", "2")
+    store.get("a")
+    store.set("c", "3")
+
+    assert store.get("a") == "1"
+    assert store.get("b") is None
+    assert store.get("c") == "3"
+
+
+def test_search_cache_normalizes_query_and_persists(tmp_path):
+    """Queries equivalentes compartilham a entrada, que sobrevive a um novo processo"""
+    path = str(tmp_path / "search.db")
+    cache = SearchCache(path)
+    cache.set_results("O que é LangGraph?", "basic", 3, _results())
+
+    assert cache.get_results("  o que é   langgraph? ", "basic", 3)[0].source == "https://exemplo.com/a"
+    assert cache.get_results("O que é LangGraph?", "advanced", 3) is None
+
+    reopened = SearchCache(path)
+    results = reopened.get_results("O que é LangGraph?", "basic", 3)
+    assert [r.relevance_score for r in results] == [0.9, 0.4]
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_search_cache_ttl_expires_entries(tmp_path):
+    """Entradas expiradas viram miss na memória e no disco"""
+    cache = SearchCache(str(tmp_path / "search.db"), ttl=0.05)
+    cache.set_results("query", "basic", 3, _results())
+    time.sleep(0.1)
+
+    assert cache.get_results("query", "basic", 3) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_disk_tier_ttl_survives_restart_only_until_expiry(tmp_path):
+    """Uma entrada expirada no SQLite é miss após reabrir e some na próxima escrita"""
+    path = str(tmp_path / "search.db")
+    SearchCache(path, ttl=0.05).set_results("query", "basic", 3, _results())
+    time.sleep(0.1)
+
+    reopened = SearchCache(path, ttl=0.05)
+    assert reopened.get_results("query", "basic", 3) is None
+    assert reopened.stats()["disk_hits"] == 0
+
+    reopened.set_results("outra", "basic", 3, _results())
+    assert reopened.disk._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] == 1
+
+
+def test_disk_hits_are_promoted_to_the_memory_lru(tmp_path):
+    """Hit no disco promove a entrada para a memória, respeitando o limite do LRU"""
+    path = str(tmp_path / "search.db")
+    writer = SearchCache(path)
+    for query in ("a", "b", "c"):
+        writer.set_results(query, "basic", 3, _results())
+
+    cache = SearchCache(path, max_memory_entries=2)
+    for query in ("a", "b", "a", "c"):
+        assert cache.get_results(query, "basic", 3) is not None
+
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["memory_entries"]) == (3, 1, 2)
+    # "b" foi o menos usado: saiu da memória, mas continua no disco
+    assert cache.memory.get(SearchCache.make_key("b", "basic", 3)) is None
+    assert cache.get_results("b", "basic", 3) is not None
+    assert cache.stats()["disk_hits"] == 4
+
+
+def test_sqlite_evicts_least_recently_accessed_to_fit_max_bytes(tmp_path):
+    """Acima de max_bytes, saem as entradas acessadas há mais tempo"""
+    store = SQLiteStore(str(tmp_path / "cache.db"), max_bytes=25)
+    store.set("a", "x" * 10)
+    time.sleep(0.01)
+    store.set("b", "y" * 10)
+    time.sleep(0.01)
+    assert store.get("a") == "x" * 10  # "a" passa a ser a mais recente
+
+    store.set("c", "z" * 10)
+
+    keys = {row[0] for row in store._conn.execute("SELECT key FROM cache")}
+    assert keys == {"a", "c"}
+    assert store._conn.execute("SELECT SUM(size) FROM cache").fetchone()[0] <= 25
+
+
+def test_llm_cache_key_and_node_stats():
+    """A chave depende de modelo, temperatura e mensagens; stats são por nó"""
+    messages = [SystemMessage(content="sistema"), HumanMessage(content="pergunta")]
+    key = LLMCache.make_key("claude", 0.3, messages)
+
+    assert key == LLMCache.make_key("claude", 0.3, list(messages))
+    assert key != LLMCache.make_key("claude", 0.7, messages)
+    assert key != LLMCache.make_key("claude", 0.3, messages[1:])
+
+    cache = LLMCache()
+    assert cache.lookup("plan_research", key) is None
+    cache.set(key, "resposta")
+    assert cache.lookup("plan_research", key) == "resposta"
+
+    stats = cache.stats()["nodes"]["plan_research"]
+    assert stats == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_sqlite_reads_batch_access_time_writes(tmp_path):
+    """Hits não gravam no banco; os horários de acesso vão junto com a próxima escrita"""
+    store = SQLiteStore(str(tmp_path / "cache.db"))
+    store.set("a", "1")
+    changes = store._conn.total_changes
+
+    assert store.get("a") == "1" and store.get("a") == "1"
+    assert store._conn.total_changes == changes
+
+    store.set("b", "2")
+    accessed = dict(store._conn.execute("SELECT key, accessed_at FROM cache").fetchall())
+    assert accessed["a"] > 0 and not store._accessed
+
+
+def test_async_search_runs_disk_cache_off_the_event_loop(tmp_path):
+    """Com a camada SQLite, o caminho assíncrono consulta e grava o cache numa thread"""
+    threads = []
+
+    class TrackingCache(SearchCache):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value):
+            threads.append(threading.get_ident())
+            super().set(key, value)
+
+    cache = TrackingCache(str(tmp_path / "search.db"))
+    backend = FakeSearch(latency=0, jitter=0)
+
+    async def run():
+        first = await asearch_many(backend, ["q1", "q2"], cache=cache)
+        second = await SharedSearches().asearch_many(backend, ["q1", "q3"], cache=cache)
+        return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(run())
+
+    assert [o.cached for o in first] == [False, False]
+    assert [o.cached for o in second] == [True, False]
+    assert threads and loop_thread not in threads
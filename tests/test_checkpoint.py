@@ -0,0 +1,68 @@
+"""
+Testes dos checkpoints do grafo (modelo falso, sem acesso à rede)
+"""
+import json
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agent import ResearchAgent
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+VALIDATION = json.dumps({
+    "validations": [
+        {"claim": f"afirmação {i}", "is_validated": True, "confidence": 0.8, "supporting_sources": []}
+        for i in range(3)
+    ],
+    "conflicts_detected": False
+})
+
+
+class FakeLLM(FakeListChatModel):
+    """Responde JSON de validação quando pedido e texto fixo nos demais nós"""
+
+    calls: int = 0
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return VALIDATION if "JSON" in messages[-1].content else "resposta"
+
+
+def _agent(tmp_path):
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=1, checkpoint_path=str(tmp_path / "checkpoints.db"))
+    agent.nodes.llm = FakeLLM(responses=["resposta"])
+    agent.nodes._tavily_available = False
+    return agent
+
+
+def test_finished_run_is_loadable_without_reexecution(tmp_path):
+    """O estado final fica salvo sob o thread_id da execução"""
+    agent = _agent(tmp_path)
+    result = agent.research("pergunta")
+    assert result["thread_id"]
+
+    reopened = _agent(tmp_path)
+    loaded = reopened.get_run(result["thread_id"])
+    assert loaded["pending_nodes"] == []
+    assert loaded["report"] == result["report"]
+    assert reopened.nodes.llm.calls == 0
+    assert reopened.get_run("inexistente") is None
+
+
+def test_interrupted_run_resumes_from_last_node(tmp_path):
+    """Uma execução parada antes da síntese retoma apenas o que falta"""
+    agent = _agent(tmp_path)
+    config = agent._run_config(None, "thread-1")
+    agent.graph.invoke(agent._initial_state("pergunta"), config, interrupt_before=["synthesize_report"])
+    assert agent.get_run("thread-1")["pending_nodes"] == ["synthesize_report"]
+
+    reopened = _agent(tmp_path)
+    result = reopened.resume("thread-1")
+    assert result["report"] == "resposta"
+    assert result["search_results_count"] > 0
+    assert reopened.get_run("thread-1")["pending_nodes"] == []
+
+
+def test_checkpoint_methods_require_checkpoint_path():
+    agent = ResearchAgent(anthropic_api_key="teste")
+    with pytest.raises(RuntimeError):
+        agent.get_run("thread")
@@ -0,0 +1,79 @@
+"""
+Testes da coalescência de requisições idênticas (single-flight)
+"""
+import asyncio
+from backend.coalesce import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Chamadas simultâneas com a mesma chave executam uma única vez"""
+    flights = SingleFlight()
+    calls = []
+
+    async def work(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return {"report": key}
+
+    async def run():
+        return await asyncio.gather(
+            *(flights.run("a", lambda: work("a")) for _ in range(5)),
+            flights.run("b", lambda: work("b"))
+        )
+
+    results = asyncio.run(run())
+    assert calls == ["a", "b"]
+    assert [shared for _, shared in results] == [False, True, True, True, True, False]
+    assert results[0][0] is results[1][0]
+    assert flights.stats()["coalesced"] == 4
+
+
+def test_grace_window_reuses_recent_results():
+    """Com janela de graça, um resultado recém-concluído é reaproveitado"""
+    flights = SingleFlight(grace=0.1)
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        first = await flights.run("a", work)
+        second = await flights.run("a", work)
+        await asyncio.sleep(0.15)
+        third = await flights.run("a", work)
+        return first, second, third
+
+    assert asyncio.run(run()) == ((1, False), (1, True), (2, False))
+    assert flights.stats()["grace_hits"] == 1
+
+
+def test_failures_are_shared_but_not_reused():
+    """Erros chegam a todos os participantes, mas não ficam na janela de graça"""
+    flights = SingleFlight(grace=10)
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        first = await asyncio.gather(flights.run("a", failing), flights.run("a", failing), return_exceptions=True)
+        retry = await asyncio.gather(flights.run("a", failing), return_exceptions=True)
+        return first + retry
+
+    errors = asyncio.run(run())
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert len(calls) == 2
+
+
+def test_non_reusable_results_skip_grace_window():
+    """reusable=False mantém o resultado fora da janela de graça"""
+    flights = SingleFlight(grace=10)
+
+    async def run():
+        await flights.run("a", lambda: asyncio.sleep(0, result="erro"), reusable=lambda r: r != "erro")
+        return await flights.run("a", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(run()) == ("ok", False)
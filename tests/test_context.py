@@ -0,0 +1,44 @@
+"""
+Testes do empacotamento de contexto por orçamento de tokens
+"""
+from src.context import chunk_text, estimate_tokens, pack_context
+from src.states import SearchResult
+
+
+def test_chunk_text_respects_size():
+    """Nenhum trecho passa muito do tamanho pedido"""
+    text = " ".join(f"Frase número {i} sobre grafos de estado." for i in range(200))
+    chunks = chunk_text(text, chunk_tokens=50)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 51 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_pack_context_prefers_relevant_chunks_within_budget():
+    """Trechos que casam com a pergunta entram primeiro e o orçamento é respeitado"""
+    filler = " ".join("Texto genérico sobre culinária e receitas de bolo." for _ in range(60))
+    results = [
+        SearchResult(source="a", title="A", content=filler, relevance_score=0.9),
+        SearchResult(
+            source="b", title="B",
+            content=filler + " O algoritmo Raft elege um líder para replicar o log de consenso.",
+            relevance_score=0.5
+        )
+    ]
+
+    packed = pack_context("como o Raft elege um líder no consenso", results, token_budget=60, chunk_tokens=30)
+
+    assert sum(estimate_tokens(p.text) for p in packed) <= 60
+    assert any("Raft elege um líder" in p.text for p in packed)
+    assert all(p.truncated for p in packed)
+
+
+def test_pack_context_without_budget_keeps_everything():
+    """Sem orçamento, o conteúdo completo é mantido"""
+    results = [SearchResult(source="a", title="A", content="conteúdo completo")]
+
+    packed = pack_context("qualquer", results, token_budget=None)
+
+    assert packed[0].text == "conteúdo completo"
+    assert not packed[0].truncated
@@ -0,0 +1,114 @@
+"""
+Testes do corpus local (índice BM25 em disco)
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agent import ResearchAgent
+from src.corpus import CorpusIndex, LocalCorpusSearch
+from src.pool import ClientPool
+import os
+import time
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Garante mtime diferente em sistemas de arquivos com baixa resolução
+    stamp = time.time() + write.bump
+    write.bump += 1
+    os.utime(path, (stamp, stamp))
+
+
+write.bump = 0
+
+
+def make_corpus(root):
+    write(os.path.join(root, "raft.md"), "# Consenso Raft\n\nO Raft elege um líder por termo e replica o log nos seguidores.")
+    write(os.path.join(root, "sub", "paxos.html"),
+          "<html><head><title>Paxos</title><style>.x{}</style></head>"
+          "<body><p>Paxos usa propostas numeradas e quóruns de aceitadores.</p></body></html>")
+    write(os.path.join(root, "notas.txt"), "Receitas de bolo de cenoura com cobertura de chocolate.")
+    write(os.path.join(root, "imagem.png"), "binário ignorado")
+
+
+def test_index_ranks_chunks_and_survives_reopen(tmp_path):
+    root, index_dir = str(tmp_path / "docs"), str(tmp_path / "index")
+    make_corpus(root)
+
+    backend = LocalCorpusSearch(root, index_dir=index_dir, max_results=2)
+    results = backend.search("como o raft elege um líder")
+
+    assert [r.source for r in results] == ["raft.md#1"]
+    assert results[0].title == "Consenso Raft" and "replica o log" in results[0].content
+    assert 0 < results[0].relevance_score < 1
+
+    html = backend.search("quóruns de aceitadores")[0]
+    assert html.source == "sub/paxos.html#1" and html.title == "Paxos" and "<p>" not in html.content
+
+    # Índice reaberto do disco: nada a reindexar e mesmos resultados
+    reopened = CorpusIndex(root, index_dir=index_dir)
+    assert reopened.update() == {"added": 0, "updated": 0, "removed": 0, "unchanged": 3, "chunks": 0}
+    assert [h.path for h in reopened.search("raft líder")] == ["raft.md"]
+    assert reopened.stats()["files"] == 3
+    backend.close()
+    reopened.close()
+
+
+def test_incremental_update_and_compaction(tmp_path):
+    root, index_dir = str(tmp_path / "docs"), str(tmp_path / "index")
+    make_corpus(root)
+    index = CorpusIndex(root, index_dir=index_dir, max_segments=2, max_dead_ratio=1.0)
+    index.update()
+
+    write(os.path.join(root, "raft.md"), "# Raft\n\nSnapshots compactam o log do Raft.")
+    write(os.path.join(root, "gossip.md"), "# Gossip\n\nProtocolos epidêmicos espalham estado entre nós.")
+    os.remove(os.path.join(root, "notas.txt"))
+
+    changes = index.update()
+
+    assert (changes["added"], changes["updated"], changes["removed"], changes["unchanged"]) == (1, 1, 1, 1)
+    assert [h.text for h in index.search("líder")] == []  # versão antiga do raft.md não aparece
+    assert index.search("snapshots")[0].path == "raft.md"
+    assert index.search("bolo cenoura") == []
+    assert index.search("epidêmicos")[0].path == "gossip.md"
+    assert (index.stats()["segments"], index.stats()["dead_chunks"]) == (2, 2)
+
+    # Mais segmentos que max_segments: compacta num só, mantendo os trechos vivos
+    write(os.path.join(root, "gossip.md"), "# Gossip\n\nAnti-entropia repara réplicas divergentes.")
+    index.update()
+    stats = index.stats()
+    assert stats["segments"] == 1 and stats["dead_chunks"] == 0 and stats["chunks"] == 3
+    assert index.search("anti entropia réplicas")[0].path == "gossip.md"
+    assert len([f for f in os.listdir(index_dir) if f.endswith(".idx")]) == 1
+    index.close()
+
+
+def test_agent_searches_local_corpus(tmp_path):
+    root = str(tmp_path / "docs")
+    make_corpus(root)
+    backend = LocalCorpusSearch(root, index_dir=str(tmp_path / "index"))
+
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0, search_backend=backend)
+    agent.nodes.llm = FakeListChatModel(responses=["eleição de líder no raft\npropostas paxos"])
+
+    result = agent.research("Como funciona consenso?")
+    sources = {r["source"] if isinstance(r, dict) else r.source for r in result["full_state"]["search_results"]}
+
+    assert sources == {"raft.md#1", "sub/paxos.html#1"}
+    assert any("corpus local" in m for m in result["full_state"]["messages"])
+
+
+def test_pool_eviction_does_not_close_shared_corpus(tmp_path):
+    root = str(tmp_path / "docs")
+    make_corpus(root)
+    backend = LocalCorpusSearch(root, index_dir=str(tmp_path / "index"))
+    agent = ResearchAgent(anthropic_api_key="teste", search_backend=backend, client_pool=ClientPool(idle_ttl=-1))
+
+    key = agent.register_credentials("sk-outra")
+    assert agent.nodes.client_pool.get(key).search is backend
+    backend.search("raft")
+    opened = dict(backend.index._segments)
+
+    assert agent.nodes.client_pool.evict_idle() == 1
+    assert backend.index._segments == opened  # mmaps do corpus continuam abertos
+    backend.close()
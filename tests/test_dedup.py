@@ -0,0 +1,101 @@
+"""
+Testes da deduplicação de resultados de busca
+"""
+import pytest
+from src import dedup
+from src.dedup import canonicalize_url, deduplicate_results
+from src.nodes import ResearchNodes
+from src.sources import SourceStore
+from src.states import SearchResult, merge_search_results
+
+TEXTO = (
+    "LangGraph é uma biblioteca para construir aplicações com múltiplos atores "
+    "usando LLMs, modelando fluxos como grafos com estado compartilhado entre os nós"
+)
+
+
+def _result(source, content=TEXTO, score=0.5):
+    return SearchResult(source=source, title="t", content=content, relevance_score=score)
+
+
+def test_canonicalize_url():
+    """URLs equivalentes têm a mesma forma canônica"""
+    assert canonicalize_url("HTTPS://www.Exemplo.com/artigo/?utm_source=x&b=2&a=1#topo") == \
+        "https://exemplo.com/artigo?a=1&b=2"
+    assert canonicalize_url("fonte-simulada-42.com") == "fonte-simulada-42.com"
+
+
+def test_url_duplicates_keep_best_score():
+    """Mesma URL canônica vira um único resultado com o maior score"""
+    results = [
+        _result("https://exemplo.com/a", score=0.4),
+        _result("https://www.exemplo.com/a/?utm_medium=email", content="outro texto", score=0.9)
+    ]
+
+    unique, stats = deduplicate_results(results)
+
+    assert len(unique) == 1
+    assert unique[0].source == "https://exemplo.com/a"
+    assert unique[0].relevance_score == 0.9
+    assert stats.url_duplicates == 1
+
+
+def test_near_duplicate_content_is_merged():
+    """Cópias sindicadas com pequenas diferenças são detectadas pelo SimHash"""
+    syndicated = TEXTO.replace("compartilhado", "compartilhado.") + " (via agência)"
+    results = [
+        _result("https://site-a.com/noticia"),
+        _result("https://site-b.com/copia", content=syndicated),
+        _result("https://site-c.com/outro", content="Raft é um algoritmo de consenso para replicar logs em sistemas distribuídos tolerantes a falhas")
+    ]
+
+    unique, stats = deduplicate_results(results)
+
+    assert [r.source for r in unique] == ["https://site-a.com/noticia", "https://site-c.com/outro"]
+    assert stats.near_duplicates == 1
+
+
+def test_duplicates_of_existing_results_update_state():
+    """Duplicatas de resultados já no estado só voltam se melhorarem o score"""
+    existing = [_result("https://exemplo.com/a", score=0.5)]
+
+    unique, _ = deduplicate_results([_result("https://exemplo.com/a", score=0.3)], existing=existing)
+    assert unique == []
+
+    unique, _ = deduplicate_results([_result("https://exemplo.com/a#secao", score=0.8)], existing=existing)
+    merged = merge_search_results(existing, unique)
+    assert len(merged) == 1
+    assert merged[0].relevance_score == 0.8
+
+
+def test_simulated_sources_are_stable_and_distinct():
+    """Fontes simuladas: mesma query → mesma fonte (em qualquer processo); queries diferentes não colidem"""
+    queries = [f"consulta {i}" for i in range(2000)]
+    sources = [ResearchNodes._simulated_result(q, "conteúdo").source for q in queries]
+
+    assert len(set(sources)) == len(queries)
+    assert ResearchNodes._simulated_result("consulta 0", "outro").source == sources[0]
+    assert sources[0] == "fonte-simulada-485fd4c1b5f8.com"
+
+
+def test_known_sources_are_not_rehashed_each_round(monkeypatch):
+    """Fontes já no estado usam o fingerprint em cache: só os resultados novos são hasheados"""
+    nodes = ResearchNodes(api_key="teste")
+    store = SourceStore()
+    first, _ = nodes._deduplicate(
+        [_result("https://site-a.com/a"), _result("https://site-b.com/b", content="outro texto " * 5)],
+        {}, store, []
+    )
+
+    hashed = []
+    original = dedup.simhash
+    monkeypatch.setattr(dedup, "simhash", lambda text: hashed.append(text) or original(text))
+    monkeypatch.setattr(store, "content", lambda handle: pytest.fail("conteúdo resolvido de novo"))
+
+    new = _result("https://site-c.com/c", content="um texto completamente diferente " * 3, score=0.4)
+    better = _result("https://www.site-a.com/a/", score=0.9)
+    handles, stats = nodes._deduplicate([new, better], {"search_results": first}, store, [])
+
+    assert hashed == [new.content]
+    assert stats.kept == 1 and stats.url_duplicates == 1
+    assert [(h.source, h.relevance_score) for h in handles] == [("https://site-a.com/a", 0.9), ("https://site-c.com/c", 0.4)]
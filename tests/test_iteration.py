@@ -0,0 +1,64 @@
+"""
+Testes do controle de iterações (orçamento e parada antecipada)
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agent import ResearchAgent
+from src.iteration import IterationPolicy, assess_iteration
+from src.states import ValidationResult
+
+
+def _validations(n, confidence=0.8):
+    return [ValidationResult(claim=f"afirmação {i}", is_validated=True, confidence=confidence) for i in range(n)]
+
+
+def _state(iteration, validations, fetched, new, previous=None, conflicts=False, max_iterations=3):
+    return {
+        "current_iteration": iteration,
+        "max_iterations": max_iterations,
+        "validations": validations,
+        "latest_search": {"queries": 2, "fetched": fetched, "new": new},
+        "conflicts_detected": conflicts,
+        "iteration_metrics": [previous] if previous else []
+    }
+
+
+def test_first_round_follows_budget_and_coverage():
+    assert assess_iteration(_state(0, _validations(1), 6, 6))["decision"] == "research_more"
+    assert assess_iteration(_state(0, _validations(4), 6, 6))["decision"] == "synthesize"
+    assert assess_iteration(_state(0, _validations(4), 6, 6, conflicts=True))["decision"] == "research_more"
+
+    exhausted = assess_iteration(_state(0, _validations(1), 6, 6, max_iterations=0))
+    assert (exhausted["decision"], exhausted["reason"]) == ("synthesize", "orçamento de iterações esgotado")
+
+
+def test_refinement_round_with_little_gain_stops_early():
+    previous = assess_iteration(_state(0, _validations(2), 6, 6, conflicts=True))
+
+    duplicated = assess_iteration(_state(1, _validations(3), 10, 1, previous, conflicts=True))
+    assert duplicated["decision"] == "synthesize"
+    assert duplicated["duplicate_ratio"] == 0.9
+
+    stale = assess_iteration(_state(1, _validations(2), 6, 4, previous, conflicts=True))
+    assert stale["decision"] == "synthesize"
+    assert stale["new_claims"] == 0
+
+    productive = assess_iteration(_state(1, _validations(2, confidence=0.5), 6, 4, previous, conflicts=True))
+    assert productive["confidence_delta"] == -0.3
+    assert productive["decision"] == "research_more"
+
+    lenient = IterationPolicy(min_new_claims=0)
+    assert assess_iteration(_state(1, _validations(2), 6, 4, previous, conflicts=True), lenient)["decision"] == "research_more"
+
+
+def test_loop_advances_iteration_and_records_decisions():
+    """Sem fontes novas no refinamento o laço para, em vez de girar até o limite de recursão"""
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=3)
+    agent.nodes.llm = FakeListChatModel(responses=["resposta"])
+    agent.nodes._tavily_available = False
+
+    result = agent.research("pergunta")
+
+    metrics = result["full_state"]["iteration_metrics"]
+    assert result["iterations"] == 1
+    assert [m["decision"] for m in metrics] == ["research_more", "synthesize"]
+    assert metrics[-1]["reason"] == "nenhuma fonte nova na última iteração"
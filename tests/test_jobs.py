@@ -0,0 +1,168 @@
+"""
+Testes dos jobs de pesquisa em segundo plano (agente falso, sem acesso à rede)
+"""
+import asyncio
+import threading
+from src.pool import ClientBundle, ClientPool
+from backend.jobs import CANCELLED, COMPLETED, FAILED, QUEUED, JobManager, JobQueueFull, JobStore
+
+
+class FakeAgent:
+    """Emite os mesmos eventos de ResearchAgent.astream_research"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+
+    async def astream_research(self, query, max_iterations=None, client_key=None, routing_profile=None):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            yield {"event": "start", "query": query}
+            await asyncio.sleep(self.delay)
+            yield {"event": "node", "node": "plan_research", "messages": ["ok"], "counts": {"search_queries": 3}}
+            if query == "falha":
+                raise RuntimeError("boom")
+            if query == "evento de erro":
+                yield {"event": "error", "error": "grafo falhou", "type": "RuntimeError", "result": {"report": "# Erro"}}
+                return
+            yield {"event": "done", "result": {"report": f"# {query}", "references": []}}
+        finally:
+            self.running -= 1
+
+
+def test_store_persists_jobs_across_instances(tmp_path):
+    """Jobs concluídos sobrevivem ao reinício; jobs ativos viram interrompidos"""
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    done = store.create("pergunta", 1)
+    store.update(done["job_id"], status=COMPLETED, progress={"node": "synthesize_report"}, result={"report": "ok"})
+    active = store.create("outra", 2)
+
+    reopened = JobStore(path)
+    assert reopened.get(done["job_id"])["result"] == {"report": "ok"}
+    assert reopened.get(active["job_id"])["status"] == QUEUED
+
+    assert reopened.mark_interrupted() == 1
+    assert reopened.get(active["job_id"])["status"] == FAILED
+    assert reopened.get(done["job_id"])["status"] == COMPLETED
+
+
+def test_manager_runs_jobs_with_bounded_workers(tmp_path):
+    """No máximo max_workers pesquisas rodam ao mesmo tempo"""
+    agent = FakeAgent(delay=0.05)
+    manager = JobManager(agent, JobStore(str(tmp_path / "jobs.db")), max_workers=2)
+
+    async def run():
+        jobs = [manager.submit(f"pergunta {i}", 1) for i in range(5)]
+        assert all(job["status"] == QUEUED for job in jobs)
+        await asyncio.gather(*list(manager._tasks.values()))
+        return [manager.get(job["job_id"]) for job in jobs]
+
+    finished = asyncio.run(run())
+    assert agent.peak == 2
+    assert all(job["status"] == COMPLETED for job in finished)
+    assert finished[0]["result"]["report"] == "# pergunta 0"
+    assert finished[0]["progress"]["node"] == "plan_research"
+
+
+def test_manager_records_failures_and_cancellation(tmp_path):
+    """Erros viram status failed; DELETE cancela jobs ativos"""
+    manager = JobManager(FakeAgent(delay=0.2), JobStore(str(tmp_path / "jobs.db")), max_workers=1)
+
+    async def run():
+        failing = manager.submit("falha", 1)
+        waiting = manager.submit("espera", 1)
+        await asyncio.sleep(0.05)
+        cancelled = await manager.cancel(waiting["job_id"])
+        await asyncio.gather(*list(manager._tasks.values()), return_exceptions=True)
+        return manager.get(failing["job_id"]), cancelled, manager.get(waiting["job_id"])
+
+    failing, cancelled, waiting = asyncio.run(run())
+    assert failing["status"] == FAILED and "boom" in failing["error"]
+    assert cancelled["status"] == CANCELLED
+    assert waiting["status"] == CANCELLED and waiting["result"] is None
+
+
+def test_manager_rejects_when_queue_is_full(tmp_path):
+    """Acima de max_pending jobs ativos, novos envios são recusados"""
+    manager = JobManager(FakeAgent(delay=0.1), JobStore(str(tmp_path / "jobs.db")), max_workers=1, max_pending=1)
+
+    async def run():
+        manager.submit("primeira", 1)
+        try:
+            manager.submit("segunda", 1)
+        except JobQueueFull:
+            rejected = True
+        else:
+            rejected = False
+        await manager.shutdown()
+        return rejected
+
+    assert asyncio.run(run())
+
+
+def test_queued_job_keeps_credentials_past_idle_ttl(tmp_path):
+    """O bundle de um job na fila não expira enquanto ele espera vaga"""
+    pool = ClientPool(idle_ttl=0.05)
+    key = ClientPool.credentials_key("chave-do-job")
+    pool.acquire(key, lambda: ClientBundle(llm=None))
+
+    class PoolAgent(FakeAgent):
+        async def astream_research(self, query, max_iterations=None, client_key=None, routing_profile=None):
+            if client_key is not None and pool.get(client_key) is None:
+                raise RuntimeError("Credenciais não encontradas no pool de clientes (expiradas?)")
+            async for event in super().astream_research(query, max_iterations, client_key, routing_profile):
+                yield event
+
+    manager = JobManager(PoolAgent(delay=0.2), JobStore(str(tmp_path / "jobs.db")), max_workers=1, client_pool=pool)
+
+    async def run():
+        first = manager.submit("primeira", 1)
+        queued = manager.submit("na fila", 1, client_key=key)
+        await asyncio.sleep(0.1)
+        # Outra requisição passa pelo pool depois do idle_ttl e dispara o descarte
+        pool.acquire(ClientPool.credentials_key("outra"), lambda: ClientBundle(llm=None))
+        await asyncio.gather(*list(manager._tasks.values()))
+        return manager.get(first["job_id"]), manager.get(queued["job_id"])
+
+    first, queued = asyncio.run(run())
+    assert first["status"] == COMPLETED
+    assert queued["status"] == COMPLETED, queued["error"]
+    assert pool.get(key).pins == 0  # liberado ao terminar
+
+
+def test_error_event_marks_job_failed(tmp_path):
+    """O evento error do streaming (falha dentro do grafo) também vira failed"""
+    manager = JobManager(FakeAgent(), JobStore(str(tmp_path / "jobs.db")))
+
+    async def run():
+        job = manager.submit("evento de erro", 1)
+        await asyncio.gather(*list(manager._tasks.values()))
+        return manager.get(job["job_id"])
+
+    job = asyncio.run(run())
+    assert job["status"] == FAILED and job["error"] == "RuntimeError: grafo falhou"
+
+
+def test_store_writes_run_off_the_event_loop(tmp_path):
+    """Status e progresso são gravados fora da thread do event loop, na ordem em que ocorreram"""
+    writes = []
+
+    class RecordingStore(JobStore):
+        def update(self, job_id, **fields):
+            writes.append((threading.get_ident(), fields.get("status")))
+            super().update(job_id, **fields)
+
+    manager = JobManager(FakeAgent(), RecordingStore(str(tmp_path / "jobs.db")))
+
+    async def run():
+        job = manager.submit("pergunta", 1)
+        await asyncio.gather(*list(manager._tasks.values()))
+        return threading.get_ident(), manager.get(job["job_id"])
+
+    loop_thread, job = asyncio.run(run())
+    assert job["status"] == COMPLETED
+    assert [status for _, status in writes] == ["running", None, COMPLETED]
+    assert loop_thread not in {thread for thread, _ in writes}
@@ -0,0 +1,143 @@
+"""
+Testes da instrumentação (registro Prometheus e callbacks de métricas)
+"""
+from types import SimpleNamespace
+from uuid import uuid4
+import asyncio
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from benchmarks.fakes import FakeSearch
+from src.agent import ResearchAgent
+from src.ratelimit import RateLimiter, RetryPolicy
+from src.metrics import SEARCH_EVENT, MetricsCallbackHandler, MetricsRegistry, estimate_cost
+
+
+def test_registry_renders_prometheus_text():
+    """Contadores e histogramas saem no formato texto do Prometheus"""
+    registry = MetricsRegistry()
+    registry.runs.inc(status="completed")
+    registry.node_duration.observe(0.3, node="search_web")
+    registry.node_duration.observe(3.0, node="search_web")
+
+    text = registry.render()
+    assert '# TYPE research_runs_total counter' in text
+    assert 'research_runs_total{status="completed"} 1' in text
+    assert 'research_node_duration_seconds_bucket{node="search_web",le="0.25"} 0' in text
+    assert 'research_node_duration_seconds_bucket{node="search_web",le="0.5"} 1' in text
+    assert 'research_node_duration_seconds_bucket{node="search_web",le="+Inf"} 2' in text
+    assert 'research_node_duration_seconds_count{node="search_web"} 2' in text
+
+
+def test_handler_records_llm_tokens_cost_and_searches():
+    """Tokens vêm de usage_metadata; buscas chegam como evento customizado"""
+    registry = MetricsRegistry()
+    handler = MetricsCallbackHandler(registry)
+    run_id = uuid4()
+    metadata = {"langgraph_node": "validate_information", "ls_model_name": "claude-3-haiku-20240307"}
+
+    handler.on_chat_model_start({}, [[]], run_id=run_id, metadata=metadata)
+    message = AIMessage(content="ok", usage_metadata={"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200})
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+    handler.on_custom_event(SEARCH_EVENT, {"outcomes": [
+        {"elapsed": 0.2, "cached": False, "error": False},
+        {"elapsed": 0.0, "cached": True, "error": False},
+        {"elapsed": 0.1, "cached": False, "error": True}
+    ]}, run_id=uuid4())
+
+    timings = handler.finish("completed")
+    assert timings["llm"]["input_tokens"] == 1000
+    assert timings["llm"]["cost_usd"] == round(estimate_cost("claude-3-haiku-20240307", 1000, 200), 6)
+    assert timings["search"] == {"calls": 3, "seconds": 0.3, "cached": 1, "errors": 1, "retries": 0}
+    assert registry.llm_tokens.value(node="validate_information", direction="output") == 200
+    assert registry.searches.value(result="cached") == 1
+    assert registry.runs.value(status="completed") == 1
+
+
+def test_research_result_includes_timing_breakdown():
+    """Cada execução traz o tempo por nó e alimenta o registro do agente"""
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0)
+    agent.nodes.llm = FakeListChatModel(responses=["resposta"])
+    agent.nodes._tavily_available = False
+
+    result = agent.research("pergunta")
+
+    nodes = result["timings"]["nodes"]
+    assert list(nodes) == ["plan_research", "search_web", "validate_information", "decide_next_step", "synthesize_report"]
+    assert all(stats["calls"] == 1 for stats in nodes.values())
+    assert result["timings"]["llm"]["calls"] >= 4
+    assert agent.metrics.node_duration.count(node="search_web") == 1
+
+
+
+def test_stream_failure_emits_error_event_and_records_error_run():
+    """Falha no meio do streaming vira evento error e execução com status error"""
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0)
+    agent.nodes.llm = FakeListChatModel(responses=["resposta"])
+    agent.nodes._tavily_available = False
+
+    async def run():
+        # Credenciais descartadas do pool: o primeiro nó falha
+        return [event async for event in agent.astream_research("pergunta", client_key="expirada")]
+
+    events = asyncio.run(run())
+
+    assert [e["event"] for e in events] == ["start", "error"]
+    assert events[-1]["type"] == "RuntimeError" and "pool de clientes" in events[-1]["error"]
+    assert events[-1]["result"]["full_state"]["error"] == events[-1]["error"]
+    assert agent.metrics.runs.value(status="error") == 1
+    assert agent.metrics.runs.value(status="completed") == 0
+
+
+class RateLimited(Exception):
+    """Erro 429 no formato dos SDKs"""
+
+    def __init__(self):
+        super().__init__("rate limited")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": "0.01"})
+
+
+class FlakyChatModel(FakeListChatModel):
+    """Responde 429 na primeira chamada"""
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise RateLimited()
+        return super()._call(*args, **kwargs)
+
+
+class FlakySearch(FakeSearch):
+    """Busca atrás do limitador da key, com 429 na primeira chamada"""
+
+    def __init__(self, limiter):
+        super().__init__(latency=0, jitter=0)
+        self.limiter = limiter
+        self.calls = 0
+
+    def _flaky(self, query):
+        self.calls += 1
+        if self.calls == 1:
+            raise RateLimited()
+        return self._results(query)
+
+    def search(self, query):
+        return self.limiter.call(lambda: self._flaky(query))
+
+
+def test_rate_limit_retries_are_counted_for_llm_and_search():
+    """Novas tentativas do limitador (429) chegam ao resumo da execução e ao registro"""
+    rate_limiter = RateLimiter(retry=RetryPolicy(base_delay=0.001))
+    search = FlakySearch(rate_limiter.limiter("tavily", "chave-tavily"))
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0, rate_limiter=rate_limiter, search_backend=search)
+    agent.nodes.llm = FlakyChatModel(responses=["resposta"])
+
+    result = agent.research("pergunta")
+
+    assert result["timings"]["llm"]["retries"] == 1
+    assert result["timings"]["search"]["retries"] == 1
+    assert agent.metrics.llm_retries.value(node="plan_research", error="RateLimited") == 1
+    assert agent.metrics.search_retries.value(node="search_web", error="RateLimited") == 1
+    assert "research_search_retries_total" in agent.metrics.render()
@@ -0,0 +1,76 @@
+"""
+Testes do formato das respostas (projeção, paginação e compressão)
+"""
+import asyncio
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from backend.payload import CompressionMiddleware, dumps, negotiate_encoding, shape_result
+from src.states import SearchResult
+
+RESULT = {
+    "report": "relatório",
+    "references": [{"title": f"ref {i}"} for i in range(5)],
+    "full_state": {
+        "query": "pergunta",
+        "messages": ["a", "b"],
+        "search_results": [SearchResult(source=f"s{i}", title="t", content="x") for i in range(4)]
+    }
+}
+
+
+def test_full_state_can_be_omitted_or_projected():
+    assert shape_result(RESULT, include_full_state=False)["full_state"] is None
+
+    projected = shape_result(RESULT, include_full_state=False, state_fields=["messages", "inexistente"])
+    assert projected["full_state"] == {"messages": ["a", "b"]}
+    assert projected["pagination"] is None
+    assert RESULT["full_state"]["query"] == "pergunta"  # original intacto
+
+
+def test_references_and_search_results_are_paginated():
+    shaped = shape_result(RESULT, references_offset=1, references_limit=2, search_results_limit=3)
+    assert [r["title"] for r in shaped["references"]] == ["ref 1", "ref 2"]
+    assert len(shaped["full_state"]["search_results"]) == 3
+    assert shaped["pagination"] == {
+        "references": {"offset": 1, "limit": 2, "total": 5},
+        "search_results": {"offset": 0, "limit": 3, "total": 4}
+    }
+    assert len(RESULT["references"]) == 5
+
+
+def test_dumps_serializes_pydantic_models():
+    assert '"source":"s0"' in dumps(RESULT).replace(" ", "")
+
+
+def test_encoding_negotiation():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding("") is None
+
+
+def test_middleware_compresses_large_bodies_only():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/grande")
+    async def grande():
+        return PlainTextResponse("dados " * 1000)
+
+    @app.get("/pequeno")
+    async def pequeno():
+        return PlainTextResponse("ok")
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://teste") as client:
+            headers = {"Accept-Encoding": "gzip"}
+            big = await client.get("/grande", headers=headers)
+            small = await client.get("/pequeno", headers=headers)
+            return big, small
+
+    big, small = asyncio.run(run())
+    assert big.headers["content-encoding"] == "gzip"
+    assert int(big.headers["content-length"]) < 6000
+    assert big.text == "dados " * 1000  # httpx descomprime
+    assert "content-encoding" not in small.headers
@@ -0,0 +1,89 @@
+"""
+Testes do pool de clientes por credencial
+"""
+import time
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from benchmarks.fakes import FakeSearch
+from src.agent import ResearchAgent
+from src.pool import ClientBundle, ClientPool
+
+
+class _Search:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_same_credentials_reuse_bundle():
+    """Credenciais iguais reaproveitam os clientes; diferentes criam outros"""
+    pool = ClientPool()
+    created = []
+
+    def factory():
+        created.append(1)
+        return ClientBundle(llm=object())
+
+    key = ClientPool.credentials_key("sk-ant-1", None)
+    first = pool.acquire(key, factory)
+    second = pool.acquire(ClientPool.credentials_key("sk-ant-1", None), factory)
+    pool.acquire(ClientPool.credentials_key("sk-ant-2", None), factory)
+
+    assert first is second
+    assert len(created) == 2
+    assert "sk-ant-1" not in key
+
+
+def test_idle_bundles_are_evicted_and_closed():
+    """Bundles ociosos são removidos e têm o cliente de busca fechado"""
+    pool = ClientPool(idle_ttl=0.05)
+    search = _Search()
+    pool.acquire("a", lambda: ClientBundle(llm=object(), search=search))
+    time.sleep(0.1)
+
+    assert pool.evict_idle() == 1
+    assert pool.get("a") is None
+    assert search.closed
+
+
+def test_max_size_evicts_least_recently_used():
+    pool = ClientPool(max_size=2)
+    for key in ("a", "b"):
+        pool.acquire(key, lambda: ClientBundle(llm=object()))
+    pool.get("a")
+    pool.acquire("c", lambda: ClientBundle(llm=object()))
+
+    assert pool.get("b") is None
+    assert pool.get("a") is not None and pool.get("c") is not None
+
+
+class _CrowdingSearch(FakeSearch):
+    """Busca que, no meio da execução, registra outra credencial no pool cheio"""
+
+    def __init__(self, pool: ClientPool):
+        super().__init__(latency=0, jitter=0)
+        self.pool = pool
+
+    def search(self, query):
+        self.pool.acquire(f"outra:{query}", lambda: ClientBundle(llm=object()))
+        return super().search(query)
+
+
+def test_bundle_in_use_survives_size_eviction_during_run():
+    """Credenciais novas enchendo o pool não derrubam o bundle de uma execução em andamento"""
+    pool = ClientPool(max_size=1)
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0, client_pool=pool)
+    key = ClientPool.credentials_key("sk-ant-em-uso", None)
+    pool.acquire(key, lambda: ClientBundle(
+        llm=FakeListChatModel(responses=["resposta"]), search=_CrowdingSearch(pool), tavily_configured=True
+    ))
+
+    with agent.credentials("sk-ant-em-uso") as client_key:
+        assert client_key == key
+        result = agent.research("pergunta", client_key=client_key)
+        assert pool.get(key) is not None
+
+    assert not result["full_state"].get("error")
+    assert result["report"]
+    pool.acquire("depois", lambda: ClientBundle(llm=object()))
+    assert pool.get(key) is None  # Solto no fim do bloco: volta a ser descartável
@@ -0,0 +1,103 @@
+"""
+Testes do limitador de taxa e das novas tentativas com backoff
+"""
+from types import SimpleNamespace
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agent import ResearchAgent
+from src.ratelimit import ProviderLimiter, RateLimit, RateLimiter, RetryPolicy, is_retryable, retry_after
+import asyncio
+import pytest
+
+FAST_RETRY = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+
+
+class RateLimited(Exception):
+    """Erro no formato dos SDKs: status_code e response.headers"""
+
+    def __init__(self, headers=None, status_code=429):
+        super().__init__("rate limited")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def test_bucket_spaces_requests_and_tokens_per_key():
+    limiter = ProviderLimiter("anthropic", RateLimit(requests_per_minute=60, tokens_per_minute=600), FAST_RETRY)
+
+    assert [limiter.reserve() for _ in range(60)] == [0.0] * 60
+    assert limiter.reserve() == pytest.approx(1.0, abs=0.05)  # 61ª requisição espera 1s
+
+    tokens = ProviderLimiter("anthropic", RateLimit(tokens_per_minute=600), FAST_RETRY)
+    assert tokens.reserve(500) == 0.0
+    assert tokens.reserve(200) == pytest.approx(10.0, abs=0.1)  # 100 tokens de dívida a 10/s
+
+    registry = RateLimiter({"anthropic": RateLimit(requests_per_minute=10)})
+    assert registry.limiter("anthropic", "key-a") is registry.limiter("anthropic", "key-a")
+    assert registry.limiter("anthropic", "key-a") is not registry.limiter("anthropic", "key-b")
+    registry.configure("anthropic", RateLimit(requests_per_minute=1000), api_key="key-b")
+    assert registry.limiter("anthropic", "key-b").limit.requests_per_minute == 1000
+    assert all("key" not in name for name in registry.stats())  # keys só aparecem como hash
+
+
+def test_retry_classification_and_retry_after():
+    assert is_retryable(RateLimited())
+    assert is_retryable(RateLimited(status_code=529))
+    assert not is_retryable(RateLimited(status_code=400))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(ValueError("json inválido"))
+
+    assert retry_after(RateLimited({"retry-after": "3"})) == 3.0
+    assert retry_after(RateLimited({"retry-after-ms": "250"})) == 0.25
+    assert retry_after(RateLimited({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after(RateLimited()) is None
+    assert RetryPolicy(max_retry_after=5).delay(0, RateLimited({"retry-after": "120"})) == 5
+
+
+def test_call_retries_transient_errors_and_honours_retry_after():
+    limiter = ProviderLimiter("tavily", RateLimit(), FAST_RETRY)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited({"retry-after": "0.01"})
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    stats = limiter.stats()
+    assert (stats["retries"], stats["rate_limited"]) == (2, 2)
+    assert limiter.reserve() == 0.0  # pausa do Retry-After já passou
+
+    with pytest.raises(ValueError):
+        limiter.call(lambda: (_ for _ in ()).throw(ValueError("não transitório")))
+
+    async def always_overloaded():
+        raise RateLimited(status_code=529)
+
+    with pytest.raises(RateLimited):
+        asyncio.run(limiter.acall(always_overloaded))
+    assert limiter.stats()["failures"] == 2
+
+
+class FlakyChatModel(FakeListChatModel):
+    """Modelo que responde 429 na primeira chamada"""
+    failures: int = 1
+
+    def _call(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RateLimited({"retry-after": "0"})
+        return super()._call(*args, **kwargs)
+
+
+def test_nodes_retry_llm_calls_through_the_limiter():
+    limiter = RateLimiter(retry=FAST_RETRY)
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0, rate_limiter=limiter)
+    agent.nodes.llm = FlakyChatModel(responses=["resposta"])
+    agent.nodes._tavily_available = False
+
+    result = agent.research("pergunta")
+
+    assert not result["full_state"].get("error")
+    stats = limiter.stats()
+    assert len(stats) == 1
+    assert next(iter(stats.values()))["retries"] == 1
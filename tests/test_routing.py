@@ -0,0 +1,139 @@
+"""
+Testes do roteamento de modelos por nó (perfis e fallback)
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from src.agent import ResearchAgent
+from src.cache import LLMCache
+from src.ratelimit import ProviderLimiter, RateLimit, RetryPolicy
+from src.routing import ModelRoute, ModelSpec, RoutingProfile, build_route, resolve_profile
+from types import SimpleNamespace
+import pytest
+
+
+class RateLimited(Exception):
+    """Erro 429 no formato dos SDKs (status_code e response.headers)"""
+
+    def __init__(self, headers=None):
+        super().__init__("rate limited")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers=headers or {})
+
+
+class OverloadedChatModel(FakeListChatModel):
+    """Modelo que sempre falha, como uma API sobrecarregada"""
+
+    def _call(self, *args, **kwargs):
+        raise RuntimeError("overloaded_error")
+
+
+def test_resolve_profile_by_name_and_unknown():
+    assert resolve_profile(None) is None
+    assert resolve_profile("balanced").route("synthesize_report").primary.model != \
+        resolve_profile("balanced").route("plan_research").primary.model
+
+    custom = RoutingProfile("custom", default=ModelRoute(ModelSpec("modelo-a")))
+    assert resolve_profile(custom) is custom
+
+    with pytest.raises(ValueError):
+        resolve_profile("inexistente")
+    with pytest.raises(ValueError):
+        ResearchAgent(anthropic_api_key="teste", routing="inexistente")
+
+
+def test_route_falls_back_when_primary_fails():
+    models = {"principal": OverloadedChatModel(responses=["x"]), "reserva": FakeListChatModel(responses=["da reserva"])}
+    route = ModelRoute(ModelSpec("principal"), (ModelSpec("reserva"),))
+
+    llm = build_route(route, lambda spec: models[spec.model])
+
+    assert llm.invoke("pergunta").content == "da reserva"
+
+
+def test_each_node_uses_the_model_of_its_route():
+    profile = RoutingProfile("teste", default=ModelRoute(ModelSpec("rapido")), nodes={
+        "synthesize_report": ModelRoute(ModelSpec("grande"))
+    })
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0, routing=profile)
+    agent.nodes._tavily_available = False
+
+    built = []
+
+    def build_model(spec, api_key):
+        built.append(spec.model)
+        return FakeListChatModel(responses=[f"resposta do {spec.model}"])
+
+    agent.nodes._build_model = build_model
+
+    result = agent.research("pergunta")
+
+    assert result["report"] == "resposta do grande"
+    assert result["full_state"]["search_queries"]  # plano veio do modelo rápido
+    assert sorted(built) == ["grande", "rapido"]  # um cliente por rota, reutilizado entre nós
+
+    # Perfil por execução substitui o do agente (e "None" mantém o padrão)
+    assert agent.model_config("fast")["routing_profile"] == "fast"
+    assert agent.model_config()["routing_profile"] == "teste"
+
+
+
+class RateLimitedChatModel(FakeListChatModel):
+    """Modelo que responde 429 com Retry-After nas primeiras chamadas"""
+    failures: int = 1
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimited({"retry-after": "0.01"})
+        return f"do {self.responses[0]}"
+
+
+def test_rate_limit_reaches_the_limiter_only_when_every_model_fails():
+    route = ModelRoute(ModelSpec("principal"), (ModelSpec("reserva"),))
+    limiter = ProviderLimiter("anthropic", RateLimit(), RetryPolicy(max_attempts=3, base_delay=0.001))
+
+    # 429 só no principal: o fallback responde e o limitador nem vê o erro
+    models = {"principal": RateLimitedChatModel(responses=["principal"]), "reserva": FakeListChatModel(responses=["da reserva"])}
+    llm = build_route(route, lambda spec: models[spec.model])
+    assert limiter.call(lambda: llm.invoke("pergunta")).content == "da reserva"
+    assert limiter.stats()["rate_limited"] == 0
+
+    # 429 em todos: o limitador pausa a key pelo Retry-After e repete a rota inteira
+    models = {name: RateLimitedChatModel(responses=[name]) for name in ("principal", "reserva")}
+    llm = build_route(route, lambda spec: models[spec.model])
+    assert limiter.call(lambda: llm.invoke("pergunta")).content == "do principal"
+    assert limiter.stats()["rate_limited"] == 1
+
+
+class ReportingChatModel(FakeListChatModel):
+    """Informa em response_metadata o modelo que respondeu (como a API da Anthropic); falha nas primeiras chamadas"""
+    model: str
+    failures: int = 0
+    calls: int = 0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("overloaded_error")
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        result.generations[0].message.response_metadata = {"model_name": self.model}
+        return result
+
+
+def test_llm_cache_skips_responses_from_the_fallback():
+    """A chave é a do modelo principal: só as respostas dele são reaproveitadas"""
+    models = {
+        "principal": ReportingChatModel(model="principal", failures=1, responses=["do principal"]),
+        "reserva": ReportingChatModel(model="reserva", responses=["da reserva"])
+    }
+    profile = RoutingProfile("teste", default=ModelRoute(ModelSpec("principal"), (ModelSpec("reserva"),)))
+    agent = ResearchAgent(anthropic_api_key="teste", routing=profile, llm_cache=LLMCache())
+    agent.nodes._build_model = lambda spec, api_key: models[spec.model]
+    messages = [HumanMessage(content="pergunta")]
+
+    answers = [agent.nodes._invoke_llm("plan_research", messages).content for _ in range(3)]
+
+    # 1ª: principal sobrecarregado, responde a reserva (fora do cache); 2ª: principal; 3ª: cache
+    assert answers == ["da reserva", "do principal", "do principal"]
+    assert (models["principal"].calls, models["reserva"].calls) == (2, 1)
@@ -0,0 +1,161 @@
+"""
+Testes da execução concorrente de buscas (backends falsos, sem acesso à rede)
+"""
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from benchmarks.fakes import FakeSearch
+from src.nodes import ResearchNodes
+from src.search import asearch_many, pending_queries, search_many
+import asyncio
+import threading
+
+
+class TrackingSearch(FakeSearch):
+    """FakeSearch que mede a concorrência máxima e falha nas queries pedidas"""
+
+    def __init__(self, failing=(), **kwargs):
+        super().__init__(**kwargs)
+        self.failing = set(failing)
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def _exit(self):
+        with self._lock:
+            self.running -= 1
+
+    def search(self, query):
+        self._enter()
+        try:
+            results = super().search(query)
+        finally:
+            self._exit()
+        if query in self.failing:
+            raise RuntimeError(f"falha em {query}")
+        return results
+
+    async def asearch(self, query):
+        self._enter()
+        try:
+            results = await super().asearch(query)
+        finally:
+            self._exit()
+        if query in self.failing:
+            raise RuntimeError(f"falha em {query}")
+        return results
+
+
+QUERIES = [f"consulta {i}" for i in range(8)]
+
+
+def _check_outcomes(outcomes, backend):
+    assert [o.query for o in outcomes] == QUERIES
+    assert 1 < backend.peak <= 3
+    failed = [o for o in outcomes if o.error is not None]
+    assert [o.query for o in failed] == ["consulta 5"] and failed[0].results == []
+    for outcome in outcomes:
+        if outcome.error is None:
+            assert outcome.results == backend._results(outcome.query)
+
+
+def test_search_many_keeps_order_bounds_concurrency_and_isolates_failures():
+    backend = TrackingSearch(failing={"consulta 5"}, latency=0.02, jitter=0.5)
+    _check_outcomes(search_many(backend, QUERIES, max_concurrency=3), backend)
+
+
+def test_asearch_many_keeps_order_bounds_concurrency_and_isolates_failures():
+    backend = TrackingSearch(failing={"consulta 5"}, latency=0.02, jitter=0.5)
+    _check_outcomes(asyncio.run(asearch_many(backend, QUERIES, max_concurrency=3)), backend)
+
+
+def _search_nodes(backend):
+    nodes = ResearchNodes(api_key="teste", search_concurrency=2)
+    nodes.llm = FakeListChatModel(responses=["conteúdo simulado da busca que falhou"])
+    nodes._search_client = backend
+    nodes._tavily_available = True
+    return nodes
+
+
+def _check_node_update(update, backend):
+    sources = [r.source for r in update["search_results"]]
+    expected = [r.source for q in ["a", "c"] for r in backend._results(q)]
+    assert sources[:len(expected)] == expected
+    # A query que falhou cai na simulação, sem derrubar as outras
+    assert sources[len(expected):] == [ResearchNodes._simulated_result("b", "").source]
+    assert update["executed_queries"] == ["a", "b", "c"]
+    assert any("Erro na busca 'b'" in m for m in update["messages"])
+    assert backend.peak <= 2
+
+
+def test_search_web_nodes_fall_back_only_for_failed_queries():
+    state = {"search_queries": ["a", "b", "c"], "executed_queries": [], "search_results": []}
+
+    backend = TrackingSearch(failing={"b"}, latency=0.01, content_chars=400)
+    _check_node_update(_search_nodes(backend).search_web(state), backend)
+
+    backend = TrackingSearch(failing={"b"}, latency=0.01, content_chars=400)
+    _check_node_update(asyncio.run(_search_nodes(backend).asearch_web(state)), backend)
+
+
+class EchoChatModel(FakeListChatModel):
+    """Ecoa a query entre aspas do prompt de simulação"""
+
+    def _call(self, messages, *args, **kwargs):
+        query = str(messages[-1].content).split('"')[1]
+        return f"simulação de {query}"
+
+
+def test_simulated_searches_go_out_in_one_batch_and_map_back_to_queries():
+    nodes = ResearchNodes(api_key="teste", simulation_concurrency=3)
+    nodes.llm = EchoChatModel(responses=["x"])
+    batches = []
+    batch_llm, abatch_llm = nodes._batch_llm, nodes._abatch_llm
+
+    def spy(node, batch, *args):
+        batches.append((node, len(batch)))
+        return batch_llm(node, batch, *args)
+
+    async def aspy(node, batch, *args):
+        batches.append((node, len(batch)))
+        return await abatch_llm(node, batch, *args)
+
+    nodes._batch_llm, nodes._abatch_llm = spy, aspy
+
+    for results in (nodes._simulate_searches(QUERIES[:5]), asyncio.run(nodes._asimulate_searches(QUERIES[:5]))):
+        assert [r.content for r in results] == [f"simulação de {q}" for q in QUERIES[:5]]
+        assert [r.source for r in results] == [ResearchNodes._simulated_result(q, "").source for q in QUERIES[:5]]
+
+    assert batches == [("search_web", 5), ("search_web", 5)]
+
+
+def test_pending_queries_skips_executed_and_repeated_after_normalization():
+    executed = ["Consenso Raft", "paxos"]
+    queries = ["consenso  raft", "Gossip", "PAXOS ", "gossip", "", "Zab"]
+
+    assert pending_queries(queries, executed) == ["Gossip", "Zab"]
+    assert pending_queries(queries, []) == ["consenso  raft", "Gossip", "PAXOS ", "Zab"]
+
+
+def test_refine_and_search_run_only_new_queries():
+    nodes = _search_nodes(TrackingSearch(latency=0, content_chars=400))
+    nodes.llm = FakeListChatModel(responses=["Consenso Raft\nnova consulta\n  NOVA consulta\npaxos"])
+    state = {
+        "query": "consenso distribuído",
+        "executed_queries": ["consenso raft", "Paxos"],
+        "latest_validations": [],
+        "search_results": []
+    }
+
+    update = nodes.refine_queries(state)
+    assert update["search_queries"] == ["nova consulta"]
+
+    # search_queries acumula todas as iterações; só a nova vai ao backend
+    backend = nodes._search_client
+    state["search_queries"] = ["consenso raft", "Paxos"] + update["search_queries"]
+    searched = nodes.search_web(state)
+    assert searched["executed_queries"] == ["nova consulta"]
+    assert {r.source for r in searched["search_results"]} == {r.source for r in backend._results("nova consulta")}
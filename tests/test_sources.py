@@ -0,0 +1,86 @@
+"""
+Testes do repositório de fontes endereçado por conteúdo
+"""
+import asyncio
+import sqlite3
+import threading
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.nodes import ResearchNodes
+from src.sources import SQLiteSourceStore, SourceStore
+from src.states import SearchResult, SourceHandle
+
+
+def _result(source, content, score=0.5):
+    return SearchResult(source=source, title="t", content=content, relevance_score=score)
+
+
+def test_identical_content_shares_one_slot():
+    store = SourceStore()
+    a = store.put(_result("https://a.com", "mesmo texto"))
+    b = store.put(_result("https://b.com", "mesmo texto", score=0.9))
+    c = store.put(_result("https://c.com", "outro texto"))
+
+    assert a.slot == b.slot != c.slot
+    assert len(store) == 2
+    assert store.resolve(b) == _result("https://b.com", "mesmo texto", score=0.9)
+    assert "content" not in SourceHandle.model_fields
+
+    with pytest.raises(KeyError):
+        SourceStore().content(a)
+
+
+def test_sqlite_store_reloads_contents_lazily(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "fontes.db"))
+    SQLiteSourceStore.setup(conn)
+    handle = SQLiteSourceStore(conn, "run-1").put(_result("https://a.com", "conteúdo salvo"))
+
+    reopened = SQLiteSourceStore(conn, "run-1")
+    assert reopened.stats() == {"sources": 1, "loaded": 0, "chars": 0}
+    assert reopened.content(handle) == "conteúdo salvo"
+    assert len(SQLiteSourceStore(conn, "run-2")) == 0
+
+
+def test_search_web_puts_handles_in_state():
+    """O estado recebe handles; o texto fica no repositório da execução"""
+    nodes = ResearchNodes(api_key="teste")
+    nodes.llm = FakeListChatModel(responses=["conteúdo simulado sobre o tema da pergunta"])
+    nodes._tavily_available = False
+    store = SourceStore()
+    config = {"configurable": {"sources": store}}
+
+    update = nodes.search_web({"query": "pergunta", "search_queries": ["q1"], "executed_queries": []}, config)
+
+    [handle] = update["search_results"]
+    assert isinstance(handle, SourceHandle)
+    assert store.content(handle) == "conteúdo simulado sobre o tema da pergunta"
+    assert len(nodes.sources) == 0
+
+
+def test_async_search_keeps_sqlite_writes_off_the_event_loop(tmp_path):
+    """Os nós assíncronos gravam no SQLite numa thread, sem bloquear o loop"""
+    threads = []
+
+    class TrackingStore(SQLiteSourceStore):
+        def _store(self, digest, content):
+            threads.append(threading.get_ident())
+            return super()._store(digest, content)
+
+    conn = sqlite3.connect(str(tmp_path / "fontes.db"), check_same_thread=False)
+    SQLiteSourceStore.setup(conn)
+    store = TrackingStore(conn, "run-1")
+    nodes = ResearchNodes(api_key="teste")
+    nodes.llm = FakeListChatModel(responses=["conteúdo simulado sobre o tema da pergunta"])
+    nodes._tavily_available = False
+    config = {"configurable": {"sources": store}}
+
+    async def run():
+        update = await nodes.asearch_web(
+            {"query": "pergunta", "search_queries": ["q1"], "executed_queries": []}, config
+        )
+        return update, threading.get_ident()
+
+    update, loop_thread = asyncio.run(run())
+
+    assert threads and loop_thread not in threads
+    assert store.content(update["search_results"][0]) == "conteúdo simulado sobre o tema da pergunta"
@@ -0,0 +1,23 @@
+"""
+Testes dos reducers do estado do grafo
+"""
+from src.states import ValidationResult, merge_validations
+
+
+def test_merge_validations_updates_existing_claims():
+    """Afirmações repetidas atualizam a confiança e unem as fontes"""
+    left = [
+        ValidationResult(claim="LangGraph usa grafos.", is_validated=True, confidence=0.6, supporting_sources=["a"]),
+        ValidationResult(claim="Raft usa líder", is_validated=True, confidence=0.9, supporting_sources=["b"])
+    ]
+    right = [
+        ValidationResult(claim="langgraph usa  grafos", is_validated=True, confidence=0.85, supporting_sources=["c", "a"]),
+        ValidationResult(claim="Paxos é mais antigo", is_validated=False, confidence=0.4)
+    ]
+
+    merged = merge_validations(left, right)
+
+    assert [v.claim for v in merged] == ["LangGraph usa grafos.", "Raft usa líder", "Paxos é mais antigo"]
+    assert merged[0].confidence == 0.85
+    assert merged[0].supporting_sources == ["a", "c"]
+    assert merged[1] is left[1]
@@ -0,0 +1,161 @@
+"""
+Testes do parsing de validações e da etapa reduce da validação em fragmentos
+"""
+from typing import Any, List
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from src.agent import ResearchAgent
+from src.nodes import ResearchNodes
+from src.sources import SourceStore
+from src.states import SearchResult, ValidationResult
+from src.validation import ValidationStreamParser, extract_validation_data, reduce_shard_validations, shard
+import asyncio
+import json
+import pytest
+
+
+REPORT = json.dumps({
+    "validations": [
+        {"claim": "Raft elege um líder", "is_validated": True, "confidence": 0.9, "supporting_sources": ["a"]},
+        {"claim": "Paxos é de 1989", "is_validated": True, "confidence": 0.7, "reasoning": "linha 1\nlinha 2"},
+        {"claim": "Zab é usado no ZooKeeper", "is_validated": True, "confidence": 0.8}
+    ],
+    "conflicts_detected": False,
+    "summary": "ok"
+}, ensure_ascii=False)
+
+
+class ToolStreamingModel(BaseChatModel):
+    """Modelo com tool calling que transmite os argumentos da tool em pedaços"""
+    payload: str = REPORT
+    tools: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "tool-streaming"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.model_copy(update={"tools": [t.__name__ for t in tools]})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="consulta"))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        if not self.tools:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="consulta"))
+            return
+        for i in range(0, len(self.payload), 7):
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": self.tools[0] if i == 0 else None, "args": self.payload[i:i + 7], "id": None, "index": 0}
+            ]))
+
+
+def test_extract_validation_data_strips_fences_and_control_chars():
+    """JSON dentro de bloco ```json e com caracteres de controle é aceito"""
+    raw = '```json\n{"validations": [], "summary": "ok\x07"}\n```'
+
+    assert extract_validation_data(raw) == {"validations": [], "summary": "ok"}
+
+    with pytest.raises(json.JSONDecodeError):
+        extract_validation_data("sem json aqui")
+
+
+def test_shard_splits_in_order():
+    assert shard(list(range(7)), 3) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_reduce_merges_duplicate_claims_and_flags_disagreement():
+    """Afirmações em comum são fundidas; discordância vira conflito"""
+    shards = [
+        [
+            ValidationResult(claim="Raft elege um líder", is_validated=True, confidence=0.9, supporting_sources=["a"]),
+            ValidationResult(claim="Paxos é de 1989", is_validated=True, confidence=0.7, supporting_sources=["a"])
+        ],
+        [
+            ValidationResult(claim="raft elege um líder.", is_validated=True, confidence=0.7, supporting_sources=["b"]),
+            ValidationResult(claim="Paxos é de 1989", is_validated=False, confidence=0.3, supporting_sources=["c"])
+        ]
+    ]
+
+    merged, disagreement = reduce_shard_validations(shards)
+
+    assert disagreement
+    assert len(merged) == 2
+    raft, paxos = merged
+    assert raft.is_validated and raft.confidence == pytest.approx(0.8)
+    assert raft.supporting_sources == ["a", "b"]
+    assert not paxos.is_validated
+    assert "divergem" in paxos.conflicting_info
+
+
+def test_reduce_without_disagreement():
+    shards = [[ValidationResult(claim="x", is_validated=True, confidence=0.5)], []]
+
+    merged, disagreement = reduce_shard_validations(shards)
+
+    assert not disagreement
+    assert merged == shards[0]
+
+
+def test_stream_parser_yields_each_claim_once_it_closes():
+    parser = ValidationStreamParser()
+    arrivals = []
+    for i, char in enumerate("```json\n" + REPORT + "\n```"):
+        arrivals.extend((i, v.claim) for v in parser.feed(char))
+
+    assert [claim for _, claim in arrivals] == ["Raft elege um líder", "Paxos é de 1989", "Zab é usado no ZooKeeper"]
+    assert arrivals[0][0] < len(REPORT) // 2  # primeira afirmação disponível bem antes do fim
+    data = parser.finish()
+    assert data["complete"] and data["summary"] == "ok"
+
+    truncated = ValidationStreamParser()
+    truncated.feed(REPORT[:REPORT.index("Zab") + 5])
+    data = truncated.finish()
+    assert [v.claim for v in data["validations"]] == ["Raft elege um líder", "Paxos é de 1989"]
+    assert not data["complete"] and not data["conflicts_detected"]
+
+
+def test_structured_validation_streams_claims_and_survives_truncation():
+    agent = ResearchAgent(anthropic_api_key="teste", max_iterations=0)
+    agent.nodes.llm = ToolStreamingModel(payload=REPORT[:REPORT.index("Zab") + 5])
+    agent.nodes._tavily_available = False
+
+    async def run():
+        return [event async for event in agent.astream_research("pergunta")]
+
+    events = asyncio.run(run())
+    claims = [e["claim"]["claim"] for e in events if e["event"] == "claim"]
+    result = events[-1]["result"]
+
+    assert claims == ["Raft elege um líder", "Paxos é de 1989"]
+    assert [v.claim for v in result["full_state"]["validations"]] == claims
+    assert any("truncada" in m for m in result["full_state"]["messages"])
+
+
+def test_sources_cut_by_the_token_budget_are_validated_next_round(monkeypatch):
+    """Fonte que não coube no orçamento não é marcada como validada e volta na passada seguinte"""
+    nodes = ResearchNodes(api_key="teste", validation_token_budget=40, validation_shard_size=None)
+    nodes.llm = FakeListChatModel(responses=[REPORT, REPORT])
+    store = SourceStore()
+    handles = store.add([
+        SearchResult(source="https://a.com", title="a", content="O Raft elege um líder por votação.", relevance_score=0.9),
+        SearchResult(source="https://b.com", title="b", content="Texto longo sobre outro assunto. " * 4, relevance_score=0.1)
+    ])
+    config = {"configurable": {"sources": store}}
+
+    prompts = []
+    build = nodes._validation_messages
+    monkeypatch.setattr(nodes, "_validation_messages", lambda state, packed, structured=False: (
+        prompts.append([p.result.source for p in packed]) or build(state, packed, structured)
+    ))
+
+    state = {"query": "como o Raft elege um líder", "search_results": handles, "validations": [], "validated_sources": []}
+    first = nodes.validate_information(state, config)
+    assert first["validated_sources"] == ["https://a.com"]
+
+    state = {**state, "validations": first["validations"], "validated_sources": first["validated_sources"]}
+    second = nodes.validate_information(state, config)
+    assert prompts == [["https://a.com"], ["https://b.com"]]
+    assert second["validated_sources"] == ["https://b.com"]